@@ -0,0 +1,267 @@
+"""
+Push synthetic RTM traffic through `TodayIDidBot.parse_messages` and time it.
+
+    python -m benchmarks.bench_pipeline --messages 2000 --notify-patterns 200
+    python -m benchmarks.bench_pipeline --save-baseline benchmarks/baseline.json
+    python -m benchmarks.bench_pipeline --baseline benchmarks/baseline.json
+
+The traffic is a seeded mix of commands directed at the bot, plain chatter,
+messages with attachments and direct messages, so it exercises the parser,
+notify matching, reports, sessions and the files they're saved to. Nothing
+talks to Slack; anything the bot would send is thrown away.
+
+With `--baseline`, the run is compared against a saved one and the exit code
+is non-zero if any kind of message got slower than the tolerance allows.
+"""
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+from slack_today_i_did.bot_file import TodayIDidBot
+from slack_today_i_did.instrumentation import format_summary, percentile
+from slack_today_i_did.reports import Report
+
+
+BOT_ID = 'UBENCHBOT'
+
+COMMANDS = [
+    'help',
+    'list',
+    'help elm-progress',
+    'who-do-you-know',
+    'know-me bench-name',
+    'possible-funcs elm',
+    'when-you-hear deploy',
+    'func-that-return ChannelMessages',
+    'tokens-status',
+    'stats',
+    'responses',
+    'halp',
+]
+
+WORDS = (
+    'the deploy is done and the build went green but staging looks slow '
+    'can someone look at the elm files for the signup page before lunch'
+).split()
+
+
+class OfflineBot(TodayIDidBot):
+    """ a bot that knows some made up users and never talks to Slack """
+
+    def __init__(self, *args, users: List[str] = None, **kwargs):
+        TodayIDidBot.__init__(self, *args, **kwargs)
+        self.known_users = {name: f'U{index:05}' for (index, name) in enumerate(users or [])}
+        self.known_users[self.name] = BOT_ID
+        self.sent = 0
+
+    def set_known_users(self):
+        pass
+
+    def open_chat(self, name: str) -> str:
+        return f'D{self.known_users.get(name, name)}'
+
+    def send_to_websocket(self, data):
+        self.sent += 1
+
+
+def synthetic_traffic(rng: random.Random, count: int, users: List[str], channels: List[str]) -> List[dict]:
+    """ a mix of commands, chatter, attachments and direct messages, tagged with their kind """
+    messages = []
+
+    for _ in range(count):
+        user = rng.choice(users)
+        user_id = f'U{users.index(user):05}'
+        channel = rng.choice(channels)
+        chatter = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 25)))
+        roll = rng.random()
+
+        if roll < 0.25:
+            kind = 'command'
+            message = {'type': 'message', 'user': user_id, 'channel': channel,
+                       'text': f'<@{BOT_ID}> {rng.choice(COMMANDS)}'}
+        elif roll < 0.70:
+            kind = 'chatter'
+            message = {'type': 'message', 'user': user_id, 'channel': channel, 'text': chatter}
+        elif roll < 0.85:
+            kind = 'attachment'
+            message = {
+                'type': 'message', 'user': user_id, 'channel': channel, 'text': '',
+                'attachments': [{
+                    'title': 'Build failed',
+                    'text': chatter,
+                    'fields': [{'title': 'branch', 'value': rng.choice(WORDS)}]
+                }]
+            }
+        else:
+            kind = 'dm'
+            message = {'type': 'message', 'user': user_id, 'channel': f'D{user_id}', 'text': chatter}
+
+        messages.append((kind, message))
+
+    return messages
+
+
+def make_bot(folder: str, args, rng: random.Random, users: List[str], channels: List[str]) -> OfflineBot:
+    bot = OfflineBot(
+        '',
+        users=users,
+        reports_dir=folder,
+        known_names_file=f'{folder}/names.json',
+        notify_file=f'{folder}/notify.json',
+        session_file=f'{folder}/sessions.json',
+        command_history_file=f'{folder}/command_history.json',
+        profiles_dir=f'{folder}/profiles'
+    )
+
+    for index in range(args.notify_patterns):
+        bot.notify.add_pattern(rng.choice(users), f'{rng.choice(WORDS)}.*{index}|{rng.choice(WORDS)}{index}')
+
+    for index in range(args.reports):
+        report = Report(
+            rng.choice(channels), f'report-{index}', (9, 0), rng.sample(users, min(5, len(users))), (0, 30),
+            reports_dir=folder
+        )
+        bot.add_report(report)
+
+    for user in rng.sample(users, min(args.sessions, len(users))):
+        bot.sessions.start_session(f'U{users.index(user):05}', rng.choice(channels))
+
+    help_command = bot.known_functions()['help']
+    for index in range(args.history):
+        bot.command_history.add_command(rng.choice(channels), help_command, [])
+
+    return bot
+
+
+def run(args) -> Dict[str, Dict[str, float]]:
+    rng = random.Random(args.seed)
+    users = [f'user{index}' for index in range(args.users)]
+    channels = [f'C{index:05}' for index in range(args.channels)]
+
+    with tempfile.TemporaryDirectory() as folder:
+        bot = make_bot(folder, args, rng, users, channels)
+        traffic = synthetic_traffic(rng, args.messages, users, channels)
+        latencies = defaultdict(list)
+
+        # fill caches like the suggestion index and compiled notify patterns first
+        bot.parse_messages([message for (_, message) in traffic[:args.warmup]])
+
+        started = time.perf_counter()
+
+        for (kind, message) in traffic:
+            before = time.perf_counter()
+            bot.parse_messages([message])
+            latencies[kind].append(time.perf_counter() - before)
+
+        elapsed = time.perf_counter() - started
+
+        if args.stages:
+            print(format_summary(bot.instrumentation.summary(), bot.instrumentation.counters))
+
+    results = {}
+    every_latency = []
+
+    for (kind, samples) in sorted(latencies.items()):
+        every_latency.extend(samples)
+        results[kind] = summarise(samples)
+
+    results['all'] = summarise(every_latency)
+    results['all']['throughput'] = len(traffic) / elapsed
+
+    return results
+
+
+def summarise(samples: List[float]) -> Dict[str, float]:
+    samples = sorted(samples)
+
+    return {
+        'count': len(samples),
+        'p50': percentile(samples, 0.5),
+        'p95': percentile(samples, 0.95),
+        'p99': percentile(samples, 0.99),
+    }
+
+
+def report(results: Dict[str, Dict[str, float]]) -> None:
+    print(f'{"kind":<12} {"count":>7} {"p50":>10} {"p95":>10} {"p99":>10}')
+
+    for (kind, summary) in results.items():
+        print(
+            f'{kind:<12} {summary["count"]:>7} '
+            f'{summary["p50"] * 1e6:>8.1f}us {summary["p95"] * 1e6:>8.1f}us {summary["p99"] * 1e6:>8.1f}us'
+        )
+
+    print(f'throughput: {results["all"]["throughput"]:.0f} messages/s')
+
+
+def regressions(results, baseline, tolerance: float) -> List[str]:
+    """ every percentile that got slower, or throughput that dropped, by more than `tolerance` """
+    problems = []
+
+    for (kind, summary) in results.items():
+        if kind not in baseline:
+            continue
+
+        for key in ('p50', 'p95', 'p99'):
+            before = baseline[kind][key]
+
+            if before > 0 and summary[key] > before * (1 + tolerance):
+                problems.append(f'{kind} {key}: {before * 1e6:.1f}us -> {summary[key] * 1e6:.1f}us')
+
+    before = baseline.get('all', {}).get('throughput', 0)
+    after = results['all']['throughput']
+
+    if before > 0 and after < before / (1 + tolerance):
+        problems.append(f'throughput: {before:.0f}/s -> {after:.0f}/s')
+
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the message processing pipeline')
+    parser.add_argument('--messages', type=int, default=2000)
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--channels', type=int, default=10)
+    parser.add_argument('--notify-patterns', type=int, default=100)
+    parser.add_argument('--reports', type=int, default=5)
+    parser.add_argument('--sessions', type=int, default=10)
+    parser.add_argument('--history', type=int, default=500, help='commands already in the history')
+    parser.add_argument('--seed', type=int, default=39)
+    parser.add_argument('--stages', action='store_true', help='also show the time spent in each stage')
+    parser.add_argument('--baseline', help='compare against a saved baseline')
+    parser.add_argument('--save-baseline', help='save the results as a baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='how much slower is allowed, 0.25 = 25%%')
+
+    args = parser.parse_args(argv)
+    results = run(args)
+    report(results)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(results, f, indent=4)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+        problems = regressions(results, baseline, args.tolerance)
+
+        if len(problems) > 0:
+            print('Slower than the baseline:')
+            print('\n'.join(problems))
+            return 1
+
+        print('No regressions against the baseline')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
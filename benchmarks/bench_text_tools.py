@@ -0,0 +1,46 @@
+"""
+Compare the Levenshtein implementations in text_tools.
+
+    python -m benchmarks.bench_text_tools
+"""
+
+import random
+import timeit
+
+import slack_today_i_did.text_tools as text_tools
+
+
+def random_words(rng, count, max_length):
+    return [
+        ''.join(rng.choice('abcdefghij-') for _ in range(rng.randint(1, max_length)))
+        for _ in range(count)
+    ]
+
+
+def bench(name, func, pairs, repeat=3):
+    runs = timeit.repeat(lambda: [func(a, b) for (a, b) in pairs], number=1, repeat=repeat)
+    best = min(runs)
+    print(f'{name:<40} {best * 1000:8.2f}ms  {best / len(pairs) * 1e6:8.2f}us per pair')
+    return best
+
+
+def main():
+    rng = random.Random(34)
+
+    for max_length in (8, 20, 60):
+        words = random_words(rng, 400, max_length)
+        pairs = list(zip(words, reversed(words)))
+
+        print(f'--- {len(pairs)} pairs of words up to {max_length} characters')
+        baseline = bench('dynamic_levenshtein', text_tools.dynamic_levenshtein, pairs)
+        fast = bench('bounded_levenshtein', text_tools.bounded_levenshtein, pairs)
+        bounded = bench(
+            'bounded_levenshtein, max_distance=4',
+            lambda a, b: text_tools.bounded_levenshtein(a, b, 4),
+            pairs
+        )
+        print(f'speedup: {baseline / fast:.1f}x, {baseline / bounded:.1f}x with a bound\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+"""
+Load test the whole bot, websocket and all, against a fake Slack.
+
+    python -m benchmarks.load_slack --channels 10 --users 50 --rates 20,50,100,200,400
+
+For each rate, a fresh bot connects to a `FakeSlack`, which posts messages as
+made up users at that many messages a second. Some of the messages are
+commands for the bot. The time from posting a command to the bot's reply
+arriving back at the server is the reply latency. Rates are tried in order
+until the bot can't keep up: either too many commands go unanswered, or the
+95th percentile latency goes over `--max-p95`.
+
+Messages are posted on a fixed schedule, however far behind the bot is, so a
+slow bot shows up as growing latency instead of a lower send rate.
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict, deque
+from typing import Any, Dict, List, NamedTuple
+
+from slack_today_i_did.bot_file import TodayIDidBot
+from slack_today_i_did.fake_slack import FakeSlack
+from slack_today_i_did.instrumentation import percentile
+
+
+# each of these gets exactly one message back
+COMMANDS = ['list', 'help list', 'help help', 'possible-funcs elm']
+
+WORDS = 'the deploy is done and the build went green but staging looks slow today'.split()
+
+LoadResult = NamedTuple(
+    'LoadResult',
+    [('rate', float), ('sent', int), ('commands', int), ('answered', int),
+     ('latencies', List[float]), ('elapsed', float)])
+
+
+class ReplyTracker(object):
+    """ match the bot's replies up with the commands sent to each channel, oldest first """
+    def __init__(self):
+        self.waiting = defaultdict(deque)
+        self.latencies = []
+
+    def expect(self, channel: str) -> None:
+        self.waiting[channel].append(time.perf_counter())
+
+    def on_bot_message(self, frame: Dict[str, Any]) -> None:
+        waiting = self.waiting.get(frame.get('channel'))
+
+        if waiting:
+            self.latencies.append(time.perf_counter() - waiting.popleft())
+
+    @property
+    def outstanding(self) -> int:
+        return sum(len(waiting) for waiting in self.waiting.values())
+
+
+async def generate_load(slack: FakeSlack, tracker: ReplyTracker, args, rate: float) -> int:
+    rng = random.Random(args.seed)
+    channels = [f'C{index:05}' for index in range(args.channels)]
+    users = [f'user{index}' for index in range(args.users)]
+
+    interval = 1 / rate
+    started = time.monotonic()
+    sent = 0
+
+    while True:
+        due = sent * interval
+        now = time.monotonic() - started
+
+        if due >= args.duration:
+            return sent
+
+        if due > now:
+            await asyncio.sleep(due - now)
+
+        channel = rng.choice(channels)
+        user = rng.choice(users)
+
+        if rng.random() < args.command_ratio:
+            tracker.expect(channel)
+            await slack.post(channel, user, f'<@{slack.bot_id}> {rng.choice(COMMANDS)}')
+        else:
+            await slack.post(channel, user, ' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 20))))
+
+        sent += 1
+
+
+def run_at_rate(args, rate: float) -> LoadResult:
+    users = [f'user{index}' for index in range(args.users)]
+    tracker = ReplyTracker()
+
+    with tempfile.TemporaryDirectory() as folder, FakeSlack(users=users) as slack:
+        slack.listeners.append(tracker.on_bot_message)
+
+        bot = TodayIDidBot(
+            '',
+            api_base_url=slack.api_base_url,
+            reports_dir=folder,
+            known_names_file=f'{folder}/names.json',
+            notify_file=f'{folder}/notify.json',
+            session_file=f'{folder}/sessions.json',
+            command_history_file=f'{folder}/command_history.json',
+            profiles_dir=f'{folder}/profiles'
+        )
+
+        async def drive():
+            bot_task = asyncio.ensure_future(bot.main_loop())
+
+            try:
+                await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(slack.wait_for_bot(), slack.loop))
+
+                started = time.perf_counter()
+                load = asyncio.run_coroutine_threadsafe(generate_load(slack, tracker, args, rate), slack.loop)
+                sent = await asyncio.wrap_future(load)
+
+                # give the bot a little while to catch up
+                deadline = time.monotonic() + args.drain
+                while tracker.outstanding > 0 and time.monotonic() < deadline:
+                    await asyncio.sleep(0.05)
+
+                return (sent, time.perf_counter() - started)
+            finally:
+                bot_task.cancel()
+
+                # let the bot close its websocket
+                try:
+                    await bot_task
+                except (asyncio.CancelledError, Exception):
+                    pass
+
+        loop = asyncio.new_event_loop()
+
+        try:
+            (sent, elapsed) = loop.run_until_complete(drive())
+        finally:
+            loop.close()
+
+    latencies = list(tracker.latencies)
+    commands = len(latencies) + tracker.outstanding
+
+    return LoadResult(rate, sent, commands, len(latencies), latencies, elapsed)
+
+
+def is_saturated(result: LoadResult, args) -> bool:
+    if result.commands == 0:
+        return False
+
+    if result.answered < result.commands * args.min_answered:
+        return True
+
+    return percentile(sorted(result.latencies), 0.95) * 1000 > args.max_p95
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test the bot against a fake Slack')
+    parser.add_argument('--channels', type=int, default=10)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--rates', default='20,50,100,200,400', help='messages a second to try, in order')
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds to post messages for, at each rate')
+    parser.add_argument('--drain', type=float, default=5.0, help='seconds to wait for late replies')
+    parser.add_argument('--command-ratio', type=float, default=0.3, help='how many messages are commands')
+    parser.add_argument('--max-p95', type=float, default=250.0, help='p95 reply latency in ms before giving up')
+    parser.add_argument('--min-answered', type=float, default=0.99, help='share of commands that must get a reply')
+    parser.add_argument('--seed', type=int, default=41)
+
+    args = parser.parse_args(argv)
+
+    print(f'{"rate":>8} {"sent":>7} {"commands":>9} {"answered":>9} {"p50":>10} {"p95":>10} {"p99":>10}')
+
+    for rate in [float(rate) for rate in args.rates.split(',')]:
+        result = run_at_rate(args, rate)
+        latencies = sorted(result.latencies)
+
+        print(
+            f'{rate:>8.0f} {result.sent:>7} {result.commands:>9} {result.answered:>9} '
+            f'{percentile(latencies, 0.5) * 1000:>8.1f}ms '
+            f'{percentile(latencies, 0.95) * 1000:>8.1f}ms '
+            f'{percentile(latencies, 0.99) * 1000:>8.1f}ms'
+        )
+
+        if is_saturated(result, args):
+            print(f'The bot can\'t keep up at {rate:.0f} messages a second')
+            return 0
+
+    print('The bot kept up with every rate tried')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
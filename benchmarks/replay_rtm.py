@@ -0,0 +1,73 @@
+"""
+Replay an RTM log recorded with `main.py --record` through a fresh bot.
+
+    python -m benchmarks.replay_rtm rtm.log.gz
+    python -m benchmarks.replay_rtm rtm.log.gz --speed 1 --stages
+    python -m benchmarks.replay_rtm rtm.log.gz --profile replay.prof
+
+The bot's state files live in a temporary folder unless `--state-dir` is given,
+so replaying never touches the real ones.
+"""
+
+import argparse
+import asyncio
+import cProfile
+import sys
+import tempfile
+
+from slack_today_i_did.bot_file import TodayIDidBot
+from slack_today_i_did.instrumentation import format_summary
+from slack_today_i_did.replay import replay
+
+
+def make_bot(folder: str) -> TodayIDidBot:
+    return TodayIDidBot(
+        '',
+        reports_dir=folder,
+        known_names_file=f'{folder}/names.json',
+        notify_file=f'{folder}/notify.json',
+        session_file=f'{folder}/sessions.json',
+        command_history_file=f'{folder}/command_history.json',
+        profiles_dir=f'{folder}/profiles'
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay a recorded RTM log')
+    parser.add_argument('log', help='a log written by `main.py --record`')
+    parser.add_argument('--speed', type=float, default=0.0, help='1 is real time, 0 is as fast as possible')
+    parser.add_argument('--state-dir', help='where the bot keeps its files, a temporary folder by default')
+    parser.add_argument('--stages', action='store_true', help='show the time spent in each stage')
+    parser.add_argument('--profile', help='write a cProfile of the replay to this file')
+
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as folder:
+        bot = make_bot(args.state_dir or folder)
+        profiler = cProfile.Profile() if args.profile else None
+        loop = asyncio.new_event_loop()
+
+        if profiler is not None:
+            profiler.enable()
+
+        try:
+            result = loop.run_until_complete(replay(bot, args.log, speed=args.speed))
+        finally:
+            loop.close()
+
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+
+    rate = result.frames / max(result.elapsed, 1e-9)
+    print(f'replayed {result.frames} frames in {result.elapsed:.2f}s ({rate:.0f}/s)')
+    print(f'the bot sent {result.sent} frames and made these API calls: {result.api_calls}')
+
+    if args.stages:
+        print(format_summary(bot.instrumentation.summary(), bot.instrumentation.counters))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,8 +1,6 @@
 import json
 import asyncio
-from slack_today_i_did.bot_file import TodayIDidBot
-from slack_today_i_did.bot_repl import ReplBot
-from slack_today_i_did.our_repo import ElmRepo
+from slack_today_i_did.instrumentation import PhaseTimer
 import os
 import argparse
 
@@ -23,6 +21,8 @@ def setup():
     os.makedirs('reports', exist_ok=True)
 
     if config_found:
+        from slack_today_i_did.our_repo import ElmRepo
+
         os.makedirs('repos', exist_ok=True)
         github_data = data['github']
         repo = ElmRepo(github_data['folder'], github_data['token'], github_data['org'], github_data['repo'])
@@ -32,20 +32,51 @@ def setup():
     return (data, repo)
 
 
-def setup_slack(data, repo):
-    return TodayIDidBot(
-        data.get('token', ''),
-        rollbar_token=data.get('rollbar-token', None),
-        elm_repo=repo
-    )
+# the bots are only imported once we know which one is wanted,
+# so that the slack bot never pays for prompt_toolkit
+def setup_slack(data, repo, startup, metrics_port=None, record_to=None, workers=0):
+    with startup.phase('import bot'):
+        from slack_today_i_did.bot_file import TodayIDidBot
 
+    with startup.phase('create bot'):
+        bot = TodayIDidBot(
+            data.get('token', ''),
+            rollbar_token=data.get('rollbar-token', None),
+            elm_repo=repo,
+            metrics_port=metrics_port,
+            record_to=record_to,
+            startup=startup
+        )
 
-def setup_cli(data, repo):
-    return ReplBot(
-        data.get('token', ''),
-        rollbar_token=data.get('rollbar-token', None),
-        elm_repo=repo
-    )
+    if workers > 0:
+        with startup.phase('start workers'):
+            from slack_today_i_did.workers import WorkerPool
+
+            bot.workers = WorkerPool(bot, processes=workers)
+            bot.workers.warm_up()
+
+    return bot
+
+
+def setup_workspaces(data, repo, startup):
+    with startup.phase('import supervisor'):
+        from slack_today_i_did.supervisor import Supervisor, workspaces_from_config
+
+    with startup.phase('create bots'):
+        return Supervisor(workspaces_from_config(data), elm_repo=repo)
+
+
+def setup_cli(data, repo, startup):
+    with startup.phase('import repl'):
+        from slack_today_i_did.bot_repl import ReplBot
+
+    with startup.phase('create repl'):
+        return ReplBot(
+            data.get('token', ''),
+            rollbar_token=data.get('rollbar-token', None),
+            elm_repo=repo,
+            startup=startup
+        )
 
 
 def main():
@@ -66,23 +97,70 @@ def main():
         default=False
     )
 
+    parser.add_argument(
+        '--metrics-port',
+        type=int,
+        help='serve Prometheus metrics on this port',
+        default=None
+    )
+
+    parser.add_argument(
+        '--record',
+        help='record everything that comes in over the websocket to this gzipped file',
+        default=None
+    )
+
+    parser.add_argument(
+        '--workers',
+        type=int,
+        help='evaluate slow commands in this many worker processes',
+        default=0
+    )
+
     args = parser.parse_args()
 
     if args.repl and args.slack:
         print('Please only start the repl or the slack bot!')
         exit(-1)
 
-    (data, repo) = setup()
+    startup = PhaseTimer()
+
+    with startup.phase('read config'):
+        (data, repo) = setup()
 
     if args.repl:
         print('starting repl..')
-        client = setup_cli(data, repo)
+        client = setup_cli(data, repo, startup)
+    elif 'workspaces' in data:
+        unsupported = [
+            flag for (flag, given) in [
+                ('--workers', args.workers > 0),
+                ('--metrics-port', args.metrics_port is not None),
+                ('--record', args.record is not None),
+            ]
+            if given
+        ]
+
+        if len(unsupported) > 0:
+            print(f'{", ".join(unsupported)} can\'t be used when priv.json lists workspaces')
+            exit(-1)
+
+        print(f'starting slack clients for {len(data["workspaces"])} workspaces..')
+        supervisor = setup_workspaces(data, repo, startup)
+
+        loop = asyncio.get_event_loop()
+        loop.run_until_complete(supervisor.run())
+        return
     elif args.slack:
         print('starting slack client..')
-        client = setup_slack(data, repo)
+        client = setup_slack(
+            data, repo, startup, metrics_port=args.metrics_port, record_to=args.record, workers=args.workers
+        )
     else:
         print('starting slack client..')
-        client = setup_slack(data, repo)
+        client = setup_slack(
+            data, repo, startup, metrics_port=args.metrics_port, record_to=args.record, workers=args.workers
+        )
 
     loop = asyncio.get_event_loop()
     loop.run_until_complete(client.main_loop())
@@ -8,6 +8,9 @@ import asyncio
 import ssl
 import json
 
+from slack_today_i_did.instrumentation import PhaseTimer
+from slack_today_i_did.rtm_log import RtmRecorder
+
 ssl_context = ssl.SSLContext(ssl.PROTOCOL_SSLv23)
 
 # os x is dumb so this fixes the openssl cert import
@@ -26,19 +29,75 @@ class SlackConnectionError(Exception):
     pass
 
 
+SLACK_API_URL = 'https://slack.com/api'
+
+
+class SlackApiRequester(object):
+    """ does the same as slackclient's requester, but against any base url,
+        and through a `requests.Session` if given one so that connections get reused
+    """
+
+    def __init__(self, base_url: str, session=None):
+        self.base_url = base_url.rstrip('/')
+        self.session = session
+
+    def do(self, token, request='?', post_data=None, domain=None):
+        if self.session is None:
+            import requests
+            post = requests.post
+        else:
+            post = self.session.post
+
+        post_data = dict(post_data or {})
+
+        for (k, v) in post_data.items():
+            if not isinstance(v, str):
+                post_data[k] = json.dumps(v)
+
+        post_data['token'] = token
+
+        return post(f'{self.base_url}/{request}', data=post_data)
+
+
 class BetterSlack(SlackClient):
     """ a better slack client with async/await support """
 
     def __init__(self, *args, **kwargs):
+        record_to = kwargs.pop('record_to', None)
+        api_base_url = kwargs.pop('api_base_url', None)
+        http_session = kwargs.pop('http_session', None)
+        self.startup = kwargs.pop('startup', None) or PhaseTimer()
+
         SlackClient.__init__(self, *args, **kwargs)
+
+        # talk to something other than slack.com, like a fake Slack for testing,
+        # or share a pool of connections with other bots in the same process
+        if api_base_url is not None or http_session is not None:
+            self.server.api_requester = SlackApiRequester(api_base_url or SLACK_API_URL, session=http_session)
+
+        self.recorder = None if record_to is None else RtmRecorder(record_to)
         self.known_users = {}
+        self.dm_channels = {}
+        self.self_id = None
+        self.warm_up = None
         self._conn = None
+        self.websocket = None
         self.message_queue = []
         self._should_reconnect = False
         self._in_count = 0
 
     async def __aenter__(self):
-        reply = self.server.api_requester.do(self.token, "rtm.start")
+        """ connect to Slack, with everything that doesn't need the websocket
+            happening alongside the handshake. We're ready as soon as the
+            websocket is open; the warm ups carry on in `self.warm_up`
+        """
+        loop = asyncio.get_event_loop()
+
+        # state on disk doesn't need Slack at all, so start on it straight away
+        state = loop.run_in_executor(None, self._warm_up_in_phase, 'state warm up', self.warm_up_state)
+
+        with self.startup.phase('rtm.start'):
+            reply = await loop.run_in_executor(None, self.server.api_requester.do, self.token, "rtm.start")
 
         if reply.status_code != 200:
             raise SlackConnectionError
@@ -47,42 +106,108 @@ class BetterSlack(SlackClient):
 
             if login_data["ok"]:
                 self.ws_url = login_data['url']
+                self.self_id = login_data.get('self', {}).get('id')
+                if self.recorder is not None:
+                    self.recorder.record_login(login_data)
                 if not self._should_reconnect:
                     self.server.parse_slack_login_data(login_data)
-                self._conn = websockets.connect(self.ws_url, ssl=ssl_context)
+                if self.ws_url.startswith('wss://'):
+                    self._conn = websockets.connect(self.ws_url, ssl=ssl_context)
+                else:
+                    self._conn = websockets.connect(self.ws_url)
             else:
                 raise SlackLoginError
 
-        self.websocket = await self._conn.__aenter__()
+        directory = loop.run_in_executor(
+            None, self._warm_up_in_phase, 'directory warm up', lambda: self.warm_up_directory(login_data)
+        )
+
+        with self.startup.phase('websocket connect'):
+            self.websocket = await self._conn.__aenter__()
+
+        self.warm_up = asyncio.gather(state, directory)
+
         return self
 
+    def _warm_up_in_phase(self, name, warm_up):
+        try:
+            with self.startup.phase(name):
+                warm_up()
+        except Exception as e:
+            # the bot works without a warm up, it's just slower the first time
+            print(f'Error in {name}: {e}')
+
+    def warm_up_state(self):
+        """ load whatever the bot keeps on disk. Runs in a thread """
+        pass
+
+    def warm_up_directory(self, login_data):
+        """ learn the users and direct message channels from the login, so
+            the first messages don't have to ask Slack. Runs in a thread
+        """
+        if 'users' in login_data:
+            known_users = {member['name']: member['id'] for member in login_data['users']}
+            self.known_users = {**known_users, **self.known_users}
+        else:
+            self.set_known_users()
+
+        ims = login_data.get('ims')
+
+        if ims is None:
+            response = self.api_call('im.list')
+            ims = response.get('ims', []) if response.get('ok') else []
+
+        self.dm_channels.update({im['user']: im['id'] for im in ims if 'user' in im})
+
     async def __aexit__(self, *args, **kwargs):
+        if self.recorder is not None:
+            self.recorder.flush()
+
         await self._conn.__aexit__(*args, **kwargs)
 
     async def main_loop(self, parser=None, on_tick=None):
         async with self as self:
-            while True:
-                while len(self.message_queue) > 0:
-                    await self.websocket.send(self.message_queue.pop(0))
-
-                if parser is not None:
-                    incoming = await self.get_message()
-                    try:
-                        parser(incoming)
-                    except Exception as e:
-                        print(f'Error: {e}')
-                if on_tick() is not None:
-                    on_tick()
-                self._in_count += 1
-
-                if self._in_count > (0.5 * 60 * 3):
-                    self.ping()
-                    self._in_count = 0
-
-                asyncio.sleep(0.5)
+            await self.run_loop(parser=parser, on_tick=on_tick)
+
+    async def run_loop(self, parser=None, on_tick=None):
+        """ read and handle messages from `self.websocket` until it closes """
+        while True:
+            await self.flush_messages()
+
+            if parser is not None:
+                incoming = await self.get_message()
+                try:
+                    parser(incoming)
+                except Exception as e:
+                    print(f'Error: {e}')
+            if on_tick() is not None:
+                on_tick()
+            self._in_count += 1
+
+            if self._in_count > (0.5 * 60 * 3):
+                self.ping()
+                self._in_count = 0
+
+            asyncio.sleep(0.5)
+
+    async def flush_messages(self):
+        """ send everything waiting in the message queue """
+        while len(self.message_queue) > 0:
+            await self.websocket.send(self.message_queue.pop(0))
+
+    def flush_soon(self) -> None:
+        """ send the message queue in the background, for messages that
+            weren't prompted by anything coming in
+        """
+        if self.websocket is not None:
+            asyncio.ensure_future(self.flush_messages())
 
     async def get_message(self):
         incoming = await self.websocket.recv()
+
+        if self.recorder is not None:
+            self.recorder.record(incoming)
+
         json_data = ""
         json_data += "{0}\n".format(incoming)
         json_data = json_data.rstrip()
@@ -133,9 +258,12 @@ class BetterSlack(SlackClient):
             self.set_known_users()
 
         person = self.known_users[name]
-        response = self.api_call('im.open', user=person)
 
-        return response['channel']['id']
+        if person not in self.dm_channels:
+            response = self.api_call('im.open', user=person)
+            self.dm_channels[person] = response['channel']['id']
+
+        return self.dm_channels[person]
 
     def send_message(self, name: str, message: str) -> None:
         id = self.open_chat(name)
@@ -147,6 +275,16 @@ class BetterSlack(SlackClient):
         json = {"type": "message", "channel": channel, "text": message}
         self.send_to_websocket(json)
 
+    def upload_snippet(self, channel: str, content: str, filename: str, title: str = None) -> bool:
+        """ post something too long for a message as a snippet instead.
+            Blocks, so commands should use `in_thread`
+        """
+        response = self.api_call(
+            'files.upload', channels=channel, content=content, filename=filename, title=title or filename
+        )
+
+        return response.get('ok', False)
+
     def connected_user(self, username: str) -> str:
         if username not in self.known_users:
             self.set_known_users()
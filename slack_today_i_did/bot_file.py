@@ -8,8 +8,9 @@ To add a new function:
 
 """
 
-from typing import Dict, Any
+from typing import Dict, Any, List
 
+from slack_today_i_did.command_history import CommandHistory
 from slack_today_i_did.rollbar import Rollbar
 
 from slack_today_i_did.extensions import (
@@ -41,11 +42,12 @@ class TodayIDidBot(Extensions, GenericSlackBot):
         self.reports = {}
         self.name = 'today-i-did'
 
-        self._setup_known_names()
-        self._setup_notify()
-        self._setup_sessions()
-        self._setup_command_history()
-        self._setup_enabled_tokens()
+        # names, notify, sessions and command history are loaded from disk
+        # the first time they're used, see `lazy_state`
+        with self.startup.phase('set up extensions'):
+            self._setup_enabled_tokens()
+            self._setup_profiling()
+            self._setup_rollbar_watch()
 
     def _setup_from_kwargs_and_remove_fields(self, **kwargs: Dict[str, Any]) -> Dict[str, Any]:
         rollbar_token = kwargs.pop('rollbar_token', None)
@@ -56,6 +58,7 @@ class TodayIDidBot(Extensions, GenericSlackBot):
 
         self.repo = kwargs.pop('elm_repo', None)
         self.reports_dir = kwargs.pop('reports_dir', 'reports')
+        self.profiles_dir = kwargs.pop('profiles_dir', 'profiles')
         self.known_names_file = kwargs.pop('known_names_file', 'names.json')
         self.notify_file = kwargs.pop('notify_file', 'notify.json')
         self.session_file = kwargs.pop('session_file', 'sessions.json')
@@ -63,8 +66,18 @@ class TodayIDidBot(Extensions, GenericSlackBot):
         return kwargs
 
     def _setup_command_history(self) -> None:
+        command_history = CommandHistory()
+
         known_functions = {action.__name__: action for action in self.known_functions().values()}
-        self.command_history.load_from_file(known_functions, (ChannelMessages,), self.command_history_file)
+        command_history.load_from_file(known_functions, (ChannelMessages,), self.command_history_file)
+        self.command_history = command_history
+
+    def warm_up_state(self) -> None:
+        """ load everything `lazy_state` would load on first use """
+        self.known_names
+        self.notify
+        self.sessions
+        self.command_history
 
     @property
     def features_enabled(self):
@@ -74,6 +87,9 @@ class TodayIDidBot(Extensions, GenericSlackBot):
         }
 
     def _actually_parse_message(self, message):
+        # only count messages that arrived after profiling started
+        profile_session = self._profile_session
+
         GenericSlackBot._actually_parse_message(self, message)
 
         strings = []
@@ -85,16 +101,23 @@ class TodayIDidBot(Extensions, GenericSlackBot):
 
         people_who_want_notification = []
 
-        for string in strings:
-            people_who_want_notification.extend(self.notify.who_wants_it(string))
+        with self.instrumentation.timer('notify'):
+            for string in strings:
+                people_who_want_notification.extend(self.notify.who_wants_it(string))
 
         people_who_want_notification = set(people_who_want_notification)
+        self.instrumentation.increment('notifications', len(people_who_want_notification))
 
         for person in people_who_want_notification:
             self.ping_person(message['channel'], person)
 
         if self.command_history.needs_save:
-            self.command_history.save_to_file(self.command_history_file)
+            with self.instrumentation.timer('history-save'):
+                self.command_history.save_to_file(self.command_history_file)
+
+        if profile_session is not None:
+            profile_session.message_seen()
+            self._check_profiling()
 
     def parse_direct_message(self, message):
         user = message['user']
@@ -116,6 +139,8 @@ class TodayIDidBot(Extensions, GenericSlackBot):
             self.sessions.save_to_file(self.session_file)
 
     def on_tick(self):
+        self._check_profiling()
+
         for (channel, reports) in self.reports.items():
             for report in reports.values():
                 if report.is_time_to_bother_people():
@@ -123,6 +148,12 @@ class TodayIDidBot(Extensions, GenericSlackBot):
                 elif report.is_time_to_end():
                     self.single_report_responses(channel, report)
 
+    def background_tasks(self) -> List[Any]:
+        if self.rollbar is None:
+            return []
+
+        return [self._watch_rollbar()]
+
     def known_statements(self):
         return {
             'FOR': self.for_statement,
@@ -143,20 +174,31 @@ class TodayIDidBot(Extensions, GenericSlackBot):
             'func-that-return': self.functions_that_return,
             'error-help': self.error_help,
             'help': self.help,
+            'possible-funcs': self.possible_funcs,
             'list': self.list,
 
             'reload-funcs': self.reload_functions,
             'reload': self.reload_branch,
             'status': self.status,
+            'stats': self.stats,
+            'startup-report': self.startup_report,
 
             'house-party': self.party,
 
             'rollbar-item': self.rollbar_item,
+            'rollbar-items': self.rollbar_items,
+            'rollbar-watch': self.rollbar_watch,
+            'rollbar-unwatch': self.rollbar_unwatch,
 
             'elm-progress': self.elm_progress,
             'elm-progress-on': self.elm_progress_on,
             'find-017-matches': self.find_elm_017_matches,
+            'elm-progress-at': self.elm_progress_at,
+            'elm-trend': self.elm_trend,
             'how-hard-to-port': self.how_hard_to_port,
+            'how-hard-to-port-at': self.how_hard_to_port_at,
+            'what-depends-on': self.what_depends_on,
+            'elm-cache-stats': self.elm_cache_stats,
 
             'who-do-you-know': self.get_known_names,
             'know-me': self.add_known_name,
@@ -174,14 +216,20 @@ class TodayIDidBot(Extensions, GenericSlackBot):
             'known-ext': self.known_extensions,
             'disable-ext': self.disable_extension,
             'enable-ext': self.enable_extension,
-            'load-ext': self.load_extension
+            'load-ext': self.load_extension,
+
+            'profile-for': self.profile_for,
+            'profile-messages': self.profile_messages,
+            'profile-stop': self.profile_stop
         }
 
-    def reload_branch(self, channel: str, branch: str = None) -> ChannelMessages:
-        """ reload a branch and trigger a restart """
+    async def reload_branch(self, channel: str, branch: str = None) -> ChannelMessages:
+        """ check out a branch and reload the bot's code from it, restarting
+            if some of what changed can't be reloaded
+        """
 
         if branch is None:
-            branch = self_aware.git_current_version()
+            branch = await self.in_thread(self_aware.git_current_version)
             if branch.startswith('HEAD DETACHED'):
                 return []
 
@@ -190,15 +238,28 @@ class TodayIDidBot(Extensions, GenericSlackBot):
             if branch.startswith(on_branch_message):
                 branch = branch[len(on_branch_message):]
 
-        self_aware.git_checkout(branch)
-        self_aware.restart_program()
+        old_head = await self_aware.git_head_async()
+        await self_aware.git_checkout_async(branch)
+        changed_files = await self_aware.git_changed_files_async(old_head)
+
+        if self_aware.can_hot_reload(self, changed_files):
+            return self.reload_functions(channel)
+
+        self.send_channel_message(channel, 'Some of the changes can\'t be reloaded, so I\'m restarting')
 
+        if self.websocket is not None:
+            await self.flush_messages()
+
+        if self.workers is not None:
+            self.workers.close()
+
+        self_aware.restart_program()
         return []
 
-    def status(self, channel: str, show_all: str = None) -> ChannelMessages:
+    async def status(self, channel: str, show_all: str = None) -> ChannelMessages:
         """ provides meta information about the bot """
 
-        current_version = self_aware.git_current_version()
+        current_version = await self.in_thread(self_aware.git_current_version)
 
         message = f"I am running on {current_version}\n"
 
@@ -210,8 +271,8 @@ class TodayIDidBot(Extensions, GenericSlackBot):
             )
             message += '\n-------------\n'
 
-            message += f'Python version: {self_aware.python_version()}\n'
-            message += f'Ruby version: {self_aware.ruby_version()}\n'
+            message += f'Python version: {await self.in_thread(self_aware.python_version)}\n'
+            message += f'Ruby version: {await self.in_thread(self_aware.ruby_version)}\n'
 
         return ChannelMessage(channel, message)
 
@@ -84,6 +84,10 @@ class ReplBot(TodayIDidBot):
         json = {"type": "message", "channel": channel, "text": message}
         self.send_to_websocket(json)
 
+    def upload_snippet(self, channel: str, content: str, filename: str, title: str = None) -> bool:
+        print(content)
+        return True
+
     def connected_user(self, username: str) -> str:
         return username
 
@@ -0,0 +1,84 @@
+"""
+A thread safe least-recently-used cache that keeps track of how useful it is.
+Entries can be given a time to live, after which they count as missing.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class BoundedCache(object):
+    def __init__(self, max_size: int = 4096, clock: Callable[[], float] = time.monotonic):
+        self.max_size = max_size
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, key: Hashable) -> Tuple[bool, Any]:
+        """ whether a key is stored, and its value if it is """
+        with self._lock:
+            if key in self._entries:
+                (value, expires) = self._entries[key]
+
+                if expires is None or expires > self.clock():
+                    self.hits += 1
+                    self._entries.move_to_end(key)
+                    return (True, value)
+
+                del self._entries[key]
+
+            self.misses += 1
+            return (False, None)
+
+    def put(self, key: Hashable, value: Any, ttl: float = None) -> None:
+        """ store a value, forever or for `ttl` seconds """
+        expires = None if ttl is None else self.clock() + ttl
+
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any], ttl: float = None) -> Any:
+        """ return the value stored for a key, or compute it, store it then return it
+        """
+        (found, value) = self.lookup(key)
+
+        if found:
+            return value
+
+        value = compute()
+        self.put(key, value, ttl=ttl)
+
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+
+        if lookups == 0:
+            return 0.0
+
+        return self.hits / lookups
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,6 +1,3 @@
-from slack_today_i_did.type_aware import json
-
-
 def makes_state_change(f):
     def wrapper(self, *args, **kwargs):
         f(self, *args, **kwargs)
@@ -33,6 +30,17 @@ class CommandHistory(object):
             return None
         return self.history[channel][-1]
 
+    def rebind_actions(self, owner) -> None:
+        """ point every command at the method of the same name on `owner`,
+            so that reloaded code is used by `!!`
+        """
+        for commands in self.history.values():
+            for command in commands:
+                name = getattr(command['action'], '__name__', None)
+
+                if name is not None:
+                    command['action'] = getattr(owner, name, command['action'])
+
     def __eq__(self, other):
         if not isinstance(other, self.__class__):
             return False
@@ -49,6 +57,8 @@ class CommandHistory(object):
     @saves_state
     def load_from_file(self, known_tokens, known_types, filename: str) -> None:
         """ Load command history from a file """
+        from slack_today_i_did.type_aware import json
+
         try:
             with open(filename) as f:
                 as_json = json.load(f, known_types=known_types)
@@ -66,6 +76,8 @@ class CommandHistory(object):
     @saves_state
     def save_to_file(self, filename: str) -> None:
         """ save command history to a file """
+        from slack_today_i_did.type_aware import json
+
         channels = {
             'channels': {
                 channel: [self._command_entry_to_json(command) for command in commands]
@@ -0,0 +1,186 @@
+"""
+Helpers for pulling meta info out of the contents of Elm files.
+
+Porting hardness is worked out in a single pass over a buffer, so big files
+can be mapped into memory and scanned without being copied into a string.
+Version and import info only ever need the module header, so only
+the header is read.
+"""
+
+import io
+import mmap
+import re
+from collections import defaultdict
+from contextlib import contextmanager
+from enum import Enum
+from typing import Dict, Iterable, Iterator, List
+
+
+class ElmVersion(Enum):
+    unknown = -1
+    v_016 = 0
+    v_017 = 1
+
+
+# each marker is a group, so `match.lastindex` tells us which one we hit
+HARDNESS_MARKERS = re.compile(rb'(\nport)|(Signal)|(import Native)|( Html)')
+PORT, SIGNAL, NATIVE, HTML = 1, 2, 3, 4
+
+
+def count_markers(buffer) -> Dict[int, int]:
+    """ count every hardness marker in a bytes-like buffer in one pass
+
+        >>> count_markers(b'import Native.X\\nport a : Signal Int')[NATIVE]
+        1
+    """
+    counts = defaultdict(int)
+
+    for match in HARDNESS_MARKERS.finditer(buffer):
+        counts[match.lastindex] += 1
+
+    return counts
+
+
+def hardness_from_counts(counts: Dict[int, int]) -> Dict[str, int]:
+    """ turn marker counts into a breakdown of how hard a file is to port """
+    breakdown = {}
+
+    if counts[PORT] or counts[SIGNAL]:
+        breakdown['Ports and signals'] = (counts[PORT] + counts[SIGNAL]) * 3
+
+    if counts[NATIVE]:
+        breakdown['Native modules imported'] = counts[NATIVE] * 2
+
+    if counts[HTML]:
+        breakdown['Html stuff'] = counts[HTML]
+
+    return breakdown
+
+
+def how_hard_to_port(buffer) -> Dict[str, int]:
+    """ returns a breakdown of how hard some Elm source is to port 0.16 -> 0.17
+
+        >>> how_hard_to_port(b'module A where\\nport a : Signal Int')
+        {'Ports and signals': 6}
+        >>> how_hard_to_port(b'')
+        {}
+    """
+    return hardness_from_counts(count_markers(buffer))
+
+
+@contextmanager
+def mapped_file(filename: str):
+    """ map a file into memory read-only. Empty files can't be mapped,
+        so they give back an empty bytes object instead
+    """
+    with open(filename, 'rb') as f:
+        try:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            yield b''
+            return
+
+        try:
+            yield buffer
+        finally:
+            buffer.close()
+
+
+def how_hard_to_port_file(filename: str) -> Dict[str, int]:
+    with mapped_file(filename) as buffer:
+        return how_hard_to_port(buffer)
+
+
+def header_lines(lines: Iterable[str]) -> Iterator[str]:
+    """ yield the lines that make up the module declaration and imports,
+        stopping at the first line of actual code
+
+        >>> list(header_lines(['module A where', '', 'import B', 'a = 1', 'import C']))
+        ['module A where', '', 'import B']
+    """
+    in_comment = False
+
+    for line in lines:
+        stripped = line.strip()
+
+        if in_comment:
+            if stripped.endswith('-}'):
+                in_comment = False
+        elif stripped.startswith('{-'):
+            in_comment = not stripped.endswith('-}')
+        elif not (
+            stripped == '' or
+            stripped.startswith('--') or
+            line.startswith(' ') or
+            line.startswith('import ') or
+            line.startswith('module') or
+            line.startswith('port module') or
+            line.startswith('effect module')
+        ):
+            # we're past the imports
+            return
+
+        yield line
+
+
+def read_header(filename: str) -> List[str]:
+    """ read just the header of an Elm file """
+    with open(filename) as f:
+        return list(header_lines(f))
+
+
+def buffer_header(buffer: bytes) -> List[str]:
+    """ read just the header out of some Elm source held in memory
+
+        >>> buffer_header(b'module A where\\nimport B\\na = 1\\n')
+        ['module A where\\n', 'import B\\n']
+    """
+    lines = (line.decode('utf-8', 'replace') for line in io.BytesIO(buffer))
+    return list(header_lines(lines))
+
+
+def version_from_header(lines: Iterable[str]) -> ElmVersion:
+    """ 0.17 modules expose things, 0.16 modules use `where`
+
+        >>> version_from_header(['module A exposing (..)'])
+        <ElmVersion.v_017: 1>
+        >>> version_from_header(['module A (..) where'])
+        <ElmVersion.v_016: 0>
+    """
+    for line in lines:
+        if line.strip():
+            if 'exposing' in line:
+                return ElmVersion.v_017
+            if 'where' in line:
+                return ElmVersion.v_016
+
+    return ElmVersion.unknown
+
+
+def imports_from_header(lines: Iterable[str]) -> List[str]:
+    """ everything after `import ` on each import line
+
+        >>> imports_from_header(['module A where', 'import B', 'import C as D'])
+        ['B', 'C as D']
+    """
+    return [
+        'import '.join(line.split('import ')[1:]).strip()
+        for line in lines if line.startswith('import ')
+    ]
+
+
+def pattern_regex(pattern: str):
+    """ a regex that matches paths the same way globbing for `**/{pattern}.elm` does,
+        where a dot in the pattern means a folder
+
+        >>> bool(pattern_regex('Foo.*').match('src/Foo/Bar.elm'))
+        True
+        >>> bool(pattern_regex('*').match('src/Foo/Bar.elm'))
+        True
+        >>> bool(pattern_regex('Bar').match('src/FooBar.elm'))
+        False
+    """
+    escaped = re.escape(pattern.replace('.', '/'))
+    escaped = escaped.replace(r'\*', '[^/]*').replace(r'\?', '[^/]')
+
+    return re.compile(f'(.*/)?{escaped}\\.elm$')
@@ -1,37 +1,45 @@
+import asyncio
 import datetime
 from typing import List
-import json
 import re
 from collections import defaultdict
 import importlib
 import types
 
 from slack_today_i_did.reports import Report
-from slack_today_i_did.generic_bot import BotExtension, ChannelMessage, ChannelMessages
+from slack_today_i_did.generic_bot import BotExtension, ChannelMessage, ChannelMessages, lazy_state
 from slack_today_i_did.reports import Sessions
 from slack_today_i_did.known_names import KnownNames
 from slack_today_i_did.notify import Notification
+from slack_today_i_did.our_repo import ElmVersion, RefError
+from slack_today_i_did.rollbar_watch import OccurrenceWatcher
 import slack_today_i_did.parser as parser
+import slack_today_i_did.json_tools as json_tools
 import slack_today_i_did.text_tools as text_tools
 
 
 class BasicStatements(BotExtension):
+    @parser.worker_safe
     def for_statement(self, text: str) -> List[str]:
         """ enter usernames seperated by commas """
         return [blob.strip() for blob in text.split(',')]
 
+    @parser.worker_safe
     def at_statement(self, text: str) -> datetime.datetime:
         """ enter a time in the format HH:MM """
         return datetime.datetime.strptime(text.strip(), '%H:%M')
 
+    @parser.worker_safe
     def wait_statement(self, text: str) -> datetime.datetime:
         """ enter how much time to wait in the format HH:MM """
         return datetime.datetime.strptime(text.strip(), '%H:%M')
 
+    @parser.worker_safe
     def now_statement(self) -> datetime.datetime:
         """ return the current time """
         return datetime.datetime.utcnow()
 
+    @parser.worker_safe
     def num_statement(self, text: str) -> int:
         """ return a number value """
         try:
@@ -48,6 +56,10 @@ class ExtensionExtensions(BotExtension):
         self._disabled_tokens = {}
         self._disabled_extensions = []
 
+    def _setup_profiling(self) -> None:
+        self._profile_session = None
+        self._profile_channel = None
+
     def _disabled_message(self, who: str, channel: str) -> ChannelMessages:
         # TODO: this function is currently evaluated in the wrong way by the evaluator
         # so we send the message by hand
@@ -168,12 +180,14 @@ class ExtensionExtensions(BotExtension):
         extension_names = dir(extensions)
         if extension_name is not None and extension_name.strip() != "":
             if extension_name not in extension_names:
-                suggestions = [
-                    (text_tools.levenshtein(extension_name, name), name) for name in extension_names
-                ]
+                index = text_tools.suggestion_index(tuple(sorted(extension_names)))
+                suggestions = index.closest(extension_name, max_distance=max(2, len(extension_name) // 2))
+
+                if len(suggestions) == 0:
+                    return ChannelMessage(channel, 'No such extension!')
 
                 message = 'No such extension! Maybe you meant one of these:\n'
-                message += ' | '.join(name for (_, name) in sorted(suggestions)[:5])
+                message += ' | '.join(suggestions)
                 return ChannelMessage(channel, message)
             else:
                 extension_names = [extension_name]
@@ -196,6 +210,8 @@ class ExtensionExtensions(BotExtension):
 
                 setattr(self, func_name, types.MethodType(func, self))
 
+        self._restart_workers()
+
         return []
 
     @parser.metafunc
@@ -215,12 +231,99 @@ class ExtensionExtensions(BotExtension):
 
         return []
 
+    def _start_profiling(self, channel: str, kind: str, seconds: int = None, messages: int = None) -> ChannelMessages:
+        if self._profile_session is not None:
+            return ChannelMessage(channel, 'Already profiling! Use `profile-stop` first')
+
+        # profiling pulls in cProfile, pstats and tracemalloc, so wait until we need them
+        from slack_today_i_did.profiling import ProfileSession, code_key
+
+        highlight = {}
+        for (name, func) in self.known_functions().items():
+            key = code_key(func)
+
+            if key is not None:
+                highlight[key] = name
+
+        try:
+            session = ProfileSession(
+                kind.strip(),
+                self.profiles_dir,
+                seconds=seconds,
+                messages=messages,
+                highlight=highlight,
+                highlight_files={parser.__file__}
+            )
+        except ValueError as e:
+            return ChannelMessage(channel, str(e))
+
+        self._profile_session = session
+        self._profile_channel = channel
+        session.start()
+
+        if seconds is not None:
+            self._stop_profiling_after(session, seconds)
+
+        return []
+
+    def _stop_profiling_after(self, session, seconds: float) -> None:
+        """ report on a timed profile as soon as its time is up, rather than on the next message """
+        try:
+            loop = asyncio.get_event_loop()
+        except RuntimeError:
+            return
+
+        if loop.is_running():
+            loop.call_later(seconds, self._profiling_timed_out, session)
+
+    def _profiling_timed_out(self, session) -> None:
+        # it might have been stopped early
+        if self._profile_session is not session:
+            return
+
+        self._check_profiling()
+        self.flush_soon()
+
+    def _check_profiling(self) -> None:
+        """ stop and report on the running profile once it's run for long enough """
+        if self._profile_session is None or not self._profile_session.is_done():
+            return
+
+        result = self._profile_session.stop()
+        self.send_channel_message(self._profile_channel, result.summary)
+
+        self._profile_session = None
+        self._profile_channel = None
+
+    def profile_for(self, channel: str, kind: str, seconds: int) -> ChannelMessages:
+        """ profile the bot for some seconds. `kind` is one of cpu, sample or memory """
+        return self._start_profiling(channel, kind, seconds=seconds)
+
+    def profile_messages(self, channel: str, kind: str, messages: int) -> ChannelMessages:
+        """ profile the bot for the next few messages. `kind` is one of cpu, sample or memory """
+        return self._start_profiling(channel, kind, messages=messages)
+
+    def profile_stop(self, channel: str) -> ChannelMessages:
+        """ stop profiling early and report what we found """
+        if self._profile_session is None:
+            return ChannelMessage(channel, 'Not profiling anything right now')
+
+        result = self._profile_session.stop()
+        self._profile_session = None
+        self._profile_channel = None
+
+        return ChannelMessage(channel, result.summary)
+
 
 class KnownNamesExtensions(BotExtension):
+    known_names = lazy_state('_setup_known_names', 'known_names_file')
+
     def _setup_known_names(self) -> None:
-        self.known_names = KnownNames()
-        self.known_names.load_from_file(self.known_names_file)
+        known_names = KnownNames()
+        known_names.load_from_file(self.known_names_file)
+        self.known_names = known_names
 
+    @parser.worker_safe
     def get_known_names(self, channel: str) -> ChannelMessages:
         """ Grabs the known names to this bot! """
         message = []
@@ -244,9 +347,12 @@ class KnownNamesExtensions(BotExtension):
 
 
 class NotifyExtensions(BotExtension):
+    notify = lazy_state('_setup_notify', 'notify_file')
+
     def _setup_notify(self) -> None:
-        self.notify = Notification()
-        self.notify.load_from_file(self.notify_file)
+        notify = Notification()
+        notify.load_from_file(self.notify_file)
+        self.notify = notify
 
     def when_you_hear(self, channel: str, pattern: str) -> ChannelMessages:
         """ notify the user when you see a pattern """
@@ -350,9 +456,12 @@ class ReportExtensions(BotExtension):
 
 
 class SessionExtensions(BotExtension):
+    sessions = lazy_state('_setup_sessions', 'session_file')
+
     def _setup_sessions(self) -> None:
-        self.sessions = Sessions()
-        self.sessions.load_from_file(self.session_file)
+        sessions = Sessions()
+        sessions.load_from_file(self.session_file)
+        self.sessions = sessions
 
     def start_session(self, channel: str) -> ChannelMessages:
         """ starts a session for a user """
@@ -384,80 +493,296 @@ Tell me `end-session` to finish the session and post it here!
 
 
 class RollbarExtensions(BotExtension):
-    def rollbar_item(self, channel: str, field: str, counter: int) -> ChannelMessages:
-        """ takes a counter, gets the rollbar info for that counter """
+    async def rollbar_item(self, channel: str, field: str, counter: int) -> ChannelMessages:
+        """ takes a counter, gets the rollbar info for that counter.
+            `field` can be a path, like `last_occurrence.body.trace.frames[0]`
+        """
 
-        rollbar_info = self.rollbar.get_item_by_counter(counter)
+        rollbar_info = await self.rollbar.get_item_by_counter_async(counter)
+
+        if rollbar_info is None:
+            return ChannelMessage(channel, f'Rollbar doesn\'t have an item with the counter {counter}')
 
         if field == '' or field == 'all':
-            pretty = json.dumps(rollbar_info, indent=4)
+            value = rollbar_info
         else:
-            pretty = rollbar_info.get(
-                field,
-                f'Could not find the field {field}'
-            )
+            try:
+                value = json_tools.project(rollbar_info, field)
+            except json_tools.PathError as e:
+                return ChannelMessage(channel, f'Could not find the field {field}: {e}')
+
+        (pretty, truncated) = json_tools.render(value)
+
+        if not truncated:
+            return ChannelMessage(channel, pretty)
+
+        # rather than filling the channel, show the start and attach the rest
+        uploaded = await self.in_thread(
+            self.upload_snippet,
+            channel,
+            json_tools.full_text(value),
+            f'rollbar-{counter}.json',
+            f'Rollbar item #{counter} {field}'.strip()
+        )
+
+        if uploaded:
+            return ChannelMessage(channel, f'{pretty[:500]}\n...the rest is in the snippet')
+
+        return ChannelMessage(channel, f'{pretty[:-100]}\n...and more, but it\'s too long to send')
+
+    async def rollbar_items(self, channel: str, field: str, counters: List[str]) -> ChannelMessages:
+        """ takes a field and some counters, like `title FOR 12,13`, and gets that field for each of them """
+
+        not_counters = [counter for counter in counters if not counter.isdigit()]
+
+        if len(not_counters) > 0:
+            return ChannelMessage(channel, f'These aren\'t counters: {", ".join(not_counters)}')
+
+        field = field.strip() or 'title'
+        items = await self.rollbar.get_items_by_counter([int(counter) for counter in counters])
+
+        lines = []
+
+        for (counter, item) in items.items():
+            if isinstance(item, Exception):
+                lines.append(f'#{counter}: I couldn\'t get it, {item}')
+            elif item is None:
+                lines.append(f'#{counter}: Rollbar doesn\'t have it')
+            else:
+                try:
+                    (pretty, _) = json_tools.render(json_tools.project(item, field), limit=200)
+                except json_tools.PathError:
+                    pretty = f'Could not find the field {field}'
+
+                lines.append(f'#{counter}: {pretty}')
+
+        return ChannelMessage(channel, '\n'.join(lines))
+
+    def _setup_rollbar_watch(self) -> None:
+        self._rollbar_watcher = None
+        self.rollbar_poll_every = 15
+
+    def rollbar_watch(self, channel: str) -> ChannelMessages:
+        """ post a digest of new Rollbar errors to this channel, once a minute at most """
+        if self.rollbar is None:
+            return ChannelMessage(channel, 'Rollbar isn\'t set up')
+
+        if self._rollbar_watcher is None:
+            self._rollbar_watcher = OccurrenceWatcher(self.rollbar)
+
+        self._rollbar_watcher.channels.add(channel)
+        return ChannelMessage(channel, 'I\'ll let you know when Rollbar sees new errors')
+
+    def rollbar_unwatch(self, channel: str) -> ChannelMessages:
+        """ stop posting Rollbar digests to this channel """
+        if self._rollbar_watcher is None or channel not in self._rollbar_watcher.channels:
+            return ChannelMessage(channel, 'This channel isn\'t watching Rollbar')
+
+        self._rollbar_watcher.channels.remove(channel)
+        return ChannelMessage(channel, 'I\'ll stop telling you about Rollbar errors')
+
+    async def _watch_rollbar(self) -> None:
+        """ poll Rollbar every so often, while anyone's watching """
+        while True:
+            await asyncio.sleep(self.rollbar_poll_every)
 
-        return ChannelMessage(channel, f'{pretty}')
+            watcher = self._rollbar_watcher
+
+            if watcher is not None and len(watcher.channels) > 0:
+                await self._poll_rollbar(watcher)
+
+    async def _poll_rollbar(self, watcher: OccurrenceWatcher) -> None:
+        try:
+            with self.instrumentation.timer('rollbar-poll'):
+                await self.in_thread(watcher.poll)
+
+            if not watcher.is_due:
+                return
+
+            digests = await self.in_thread(watcher.take_digests)
+        except Exception as e:
+            print(f'Couldn\'t poll Rollbar: {e}')
+            return
+
+        if len(digests) == 0:
+            return
+
+        message = watcher.format_digests(digests)
+
+        for channel in watcher.channels:
+            self.send_channel_message(channel, message)
+
+        if self.websocket is not None:
+            await self.flush_messages()
 
 
 class ElmExtensions(BotExtension):
-    def elm_progress(self, channel: str, version: str) -> ChannelMessages:
+    @parser.worker_safe
+    async def elm_progress(self, channel: str, version: str) -> ChannelMessages:
         """ give a version of elm to get me to tell you how many number files are on master """
 
         version = version.strip()
-        self.repo.get_ready()
+        await self.repo.get_ready_async()
         message = ""
 
+        counts = await self.in_thread(self.repo.version_counts)
+        num_016 = counts[ElmVersion.v_016]
+        num_017 = counts[ElmVersion.v_017]
+
         if version == '0.17':
-            message += f"There are {self.repo.number_of_016_files}"
+            message += f"There are {num_016}"
         elif version == '0.16':
-            message += f"There are {self.repo.number_of_017_files}"
+            message += f"There are {num_017}"
         else:
-            num_016 = self.repo.number_of_016_files
-            num_017 = self.repo.number_of_017_files
             message += f"There are {num_016} 0.16 files."
             message += f"\nThere are {num_017} 0.17 files."
             message += f"\nThat puts us at a total of {num_017 + num_016} Elm files."
 
         return ChannelMessage(channel, message)
 
-    def elm_progress_on(self, channel: str, branch_name: str) -> ChannelMessages:
+    async def elm_progress_on(self, channel: str, branch_name: str) -> ChannelMessages:
         """ give a version of elm to get me to tell you how many number files are on master """
 
-        self.repo.get_ready(branch_name)
         message = ""
+        counts = await self.in_thread(self._branch_version_counts, branch_name)
 
-        num_016 = self.repo.number_of_016_files
-        num_017 = self.repo.number_of_017_files
+        num_016 = counts[ElmVersion.v_016]
+        num_017 = counts[ElmVersion.v_017]
         message += f"There are {num_016} 0.16 files."
         message += f"\nThere are {num_017} 0.17 files."
         message += f"\nThat puts us at a total of {num_017 + num_016} Elm files."  # noqa: E501
 
         return ChannelMessage(channel, message)
 
-    def find_elm_017_matches(self, channel: str, filename_pattern: str) -> ChannelMessages:  # noqa: E501
+    @parser.worker_safe
+    async def elm_progress_at(self, channel: str, ref: str) -> ChannelMessages:
+        """ give a branch or commit to get me to tell you how many files of each version it has,
+            without checking it out
+        """
+
+        try:
+            sha = await self.in_thread(self.repo.resolve_ref, ref)
+        except RefError as e:
+            return ChannelMessage(channel, str(e))
+
+        counts = await self.in_thread(self.repo.version_counts_at, sha)
+        num_016 = counts[ElmVersion.v_016]
+        num_017 = counts[ElmVersion.v_017]
+
+        message = f"At {ref.strip()} ({sha[:8]}):"
+        message += f"\nThere are {num_016} 0.16 files."
+        message += f"\nThere are {num_017} 0.17 files."
+        message += f"\nThat puts us at a total of {num_017 + num_016} Elm files."
+
+        return ChannelMessage(channel, message)
+
+    async def elm_trend(self, channel: str, branch_name: str, number_of_commits: int) -> ChannelMessages:
+        """ give a branch and a number of commits to get me to tell you how the
+            number of 0.16 and 0.17 files changed over those commits
+        """
+
+        if number_of_commits < 1:
+            return ChannelMessage(channel, 'Give me a number of commits that\'s at least 1')
+
+        trend = await self.in_thread(self.repo.version_trend, branch_name, number_of_commits)
+
+        if len(trend) == 0:
+            return ChannelMessage(channel, f'I couldn\'t find any commits on {branch_name}')
+
+        message = f'Over the last {len(trend)} commits on {branch_name.strip()}:'
+        last_counts = None
+
+        # only show the commits where something changed
+        for point in trend:
+            counts = (point.counts[ElmVersion.v_016], point.counts[ElmVersion.v_017])
+
+            if counts != last_counts or point is trend[-1]:
+                message += f'\n{point.date} {point.sha[:8]}: {counts[0]} 0.16 files, {counts[1]} 0.17 files'
+
+            last_counts = counts
+
+        return ChannelMessage(channel, message)
+
+    @parser.worker_safe
+    async def find_elm_017_matches(self, channel: str, filename_pattern: str) -> ChannelMessages:  # noqa: E501
         """ give a filename of elm to get me to tell you how it looks on master """  # noqa: E501
 
-        self.repo.get_ready()
+        await self.repo.get_ready_async()
         message = "We have found the following filenames:\n"
 
-        filenames = self.repo.get_files_for_017(filename_pattern)
+        filenames = await self.in_thread(self.repo.get_files_for_017, filename_pattern)
         message += " | ".join(filenames)
 
         return ChannelMessage(channel, message)
 
-    def how_hard_to_port(self, channel: str, filename_pattern: str) -> ChannelMessages:
+    @parser.worker_safe
+    async def what_depends_on(self, channel: str, module_pattern: str) -> ChannelMessages:
+        """ give a module name and I'll tell you which files on master import it """
+
+        await self.repo.get_ready_async()
+
+        dependents = await self.in_thread(self.repo.get_dependents, module_pattern.strip())
+
+        if len(dependents) == 0:
+            return ChannelMessage(channel, f'Nothing depends on {module_pattern}')
+
+        message = f'The following {len(dependents)} files depend on {module_pattern}:\n'
+        message += '\n'.join(dependents)
+
+        return ChannelMessage(channel, message)
+
+    def elm_cache_stats(self, channel: str) -> ChannelMessages:
+        """ tell you how well the cache of Elm file lookups is doing """
+
+        stats = self.repo.cache_stats()
+
+        message = f"The Elm file cache holds {stats['size']} of at most {stats['max_size']} lookups."
+        message += f"\nIt has had {stats['hits']} hits and {stats['misses']} misses"
+        message += f" for a hit rate of {stats['hit_rate']:.1%}."
+
+        return ChannelMessage(channel, message)
+
+    @parser.worker_safe
+    async def how_hard_to_port(self, channel: str, filename_pattern: str) -> ChannelMessages:
         """ give a filename of elm to get me to tell you how hard it is to port
             Things are hard if: contains ports, signals, native or html.
             Ports and signals are hardest, then native, then html.
         """
 
-        self.repo.get_ready()
-        message = "We have found the following filenames:\n"
+        await self.repo.get_ready_async()
+        files = await self.in_thread(self.repo.get_017_porting_breakdown, filename_pattern)
+
+        return ChannelMessage(channel, self._porting_breakdown_message(files))
+
+    @parser.worker_safe
+    async def how_hard_to_port_at(self, channel: str, ref_and_pattern: str) -> ChannelMessages:
+        """ give a branch or commit followed by a filename of elm to get me to tell you
+            how hard it is to port there, without checking it out
+        """
+
+        parts = ref_and_pattern.split()
+
+        if len(parts) != 2:
+            return ChannelMessage(channel, 'Give me a branch or commit, then a filename pattern')
 
-        with self.repo.cached_lookups():
-            files = self.repo.get_017_porting_breakdown(filename_pattern)
+        (ref, filename_pattern) = parts
 
+        try:
+            sha = await self.in_thread(self.repo.resolve_ref, ref)
+        except RefError as e:
+            return ChannelMessage(channel, str(e))
+
+        files = await self.in_thread(self.repo.porting_breakdown_at, sha, filename_pattern)
+
+        return ChannelMessage(channel, self._porting_breakdown_message(files))
+
+    def _branch_version_counts(self, branch_name: str):
+        # each branch gets its own worktree, so this doesn't fight over master's checkout
+        with self.repo.worktrees.branch(branch_name) as branch_repo:
+            return branch_repo.version_counts()
+
+    def _porting_breakdown_message(self, files) -> str:
+        message = "We have found the following filenames:\n"
         message += f'Here\'s the breakdown for the:'
 
         total_breakdowns = defaultdict(int)
@@ -478,4 +803,4 @@ class ElmExtensions(BotExtension):
             f'{name} : {value}' for (name, value) in total_breakdowns.items()
         )
 
-        return ChannelMessage(channel, message)
+        return message
@@ -0,0 +1,229 @@
+"""
+A small stand in for Slack, for load testing the bot without the real thing.
+
+It serves just enough of the Web API (`rtm.start`, `users.list`, `im.open`,
+`im.list`) over plain HTTP, and an RTM websocket that acks and echoes back
+whatever the bot says. Tests and load generators post messages as made up users and listen
+for what the bot sends.
+
+The server runs its own event loop in a background thread, so a bot that makes
+blocking Web API calls can still talk to it from the main thread:
+
+    with FakeSlack(users=['dave']) as slack:
+        bot = TodayIDidBot('', api_base_url=slack.api_base_url)
+        slack.call(slack.post('C1', 'dave', '<@UFAKEBOT> list'))
+"""
+
+import asyncio
+import json
+import threading
+import time
+from typing import Any, Dict, List
+from urllib.parse import parse_qs
+
+import websockets
+
+
+class FakeSlack(object):
+    def __init__(
+            self,
+            users: List[str] = None,
+            bot_id: str = 'UFAKEBOT',
+            bot_name: str = 'today-i-did',
+            host: str = '127.0.0.1'):
+        self.bot_id = bot_id
+        self.bot_name = bot_name
+        self.host = host
+        self.users = {f'U{index:05}': name for (index, name) in enumerate(users or [])}
+        self.users[bot_id] = bot_name
+
+        self.loop = None
+        self.http_port = None
+        self.ws_port = None
+        self.api_calls = []
+        self.listeners = []
+
+        self._sockets = set()
+        self._ts = 0
+        self._thread = None
+        self._ready = threading.Event()
+        self._stopped = None
+
+    def user_id(self, name: str) -> str:
+        for (user_id, user_name) in self.users.items():
+            if user_name == name:
+                return user_id
+
+        return None
+
+    @property
+    def api_base_url(self) -> str:
+        return f'http://{self.host}:{self.http_port}/api'
+
+    @property
+    def ws_url(self) -> str:
+        return f'ws://{self.host}:{self.ws_port}/'
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def __exit__(self, *args):
+        self.loop.call_soon_threadsafe(self._stopped.set)
+        self._thread.join()
+
+    def call(self, coroutine, timeout: float = None):
+        """ run a coroutine on the server's loop from another thread, and wait for it """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(timeout)
+
+    def _run(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+        try:
+            self.loop.run_until_complete(self._serve())
+        finally:
+            self.loop.close()
+
+    async def _serve(self) -> None:
+        self._stopped = asyncio.Event()
+
+        http_server = await asyncio.start_server(self._handle_http, self.host, 0)
+        ws_server = await websockets.serve(self._handle_socket, self.host, 0)
+
+        self.http_port = http_server.sockets[0].getsockname()[1]
+        self.ws_port = list(ws_server.sockets)[0].getsockname()[1]
+        self._ready.set()
+
+        await self._stopped.wait()
+
+        ws_server.close()
+        http_server.close()
+        await ws_server.wait_closed()
+        await http_server.wait_closed()
+
+    def _next_ts(self) -> str:
+        self._ts += 1
+        return f'{int(time.time())}.{self._ts:06}'
+
+    def api(self, method: str, params: Dict[str, str]) -> Dict[str, Any]:
+        """ answer a Web API call """
+        self.api_calls.append(method)
+        members = [{'id': user_id, 'name': name} for (user_id, name) in self.users.items()]
+
+        if method == 'rtm.start':
+            return {
+                'ok': True,
+                'url': self.ws_url,
+                'self': {'id': self.bot_id, 'name': self.bot_name},
+                'team': {'domain': 'fake'},
+                'users': members,
+                'channels': [],
+                'groups': [],
+                'ims': [],
+            }
+
+        if method == 'users.list':
+            return {'ok': True, 'members': members}
+
+        if method == 'im.list':
+            return {'ok': True, 'ims': []}
+
+        if method == 'files.upload':
+            return {'ok': True, 'file': {'id': f'F{self._next_ts()}', 'name': params.get('filename', '')}}
+
+        if method == 'im.open':
+            return {'ok': True, 'channel': {'id': f'D{params.get("user", "")}'}}
+
+        return {'ok': True}
+
+    async def _handle_http(self, reader, writer) -> None:
+        request_line = (await reader.readline()).decode()
+        headers = {}
+
+        while True:
+            line = (await reader.readline()).decode()
+            if line in ('\r\n', '\n', ''):
+                break
+
+            (key, value) = line.split(':', 1)
+            headers[key.strip().lower()] = value.strip()
+
+        body = await reader.readexactly(int(headers.get('content-length', 0)))
+        params = {key: values[0] for (key, values) in parse_qs(body.decode()).items()}
+
+        path = request_line.split()[1].split('?')[0]
+        method = path.rsplit('/', 1)[-1]
+
+        response = json.dumps(self.api(method, params)).encode()
+        writer.write(
+            b'HTTP/1.1 200 OK\r\n'
+            b'Content-Type: application/json\r\n'
+            b'Connection: close\r\n' +
+            f'Content-Length: {len(response)}\r\n\r\n'.encode() +
+            response
+        )
+        await writer.drain()
+        writer.close()
+
+    async def _handle_socket(self, websocket, path=None) -> None:
+        self._sockets.add(websocket)
+
+        try:
+            await websocket.send(json.dumps({'type': 'hello'}))
+
+            while True:
+                frame = json.loads(await websocket.recv())
+                await self._on_frame(websocket, frame)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self._sockets.discard(websocket)
+
+    async def _on_frame(self, websocket, frame: Dict[str, Any]) -> None:
+        if frame.get('type') == 'ping':
+            await websocket.send(json.dumps({'type': 'pong', 'reply_to': frame.get('id')}))
+            return
+
+        if frame.get('type') != 'message':
+            return
+
+        ts = self._next_ts()
+
+        if 'id' in frame:
+            await websocket.send(json.dumps({'ok': True, 'reply_to': frame['id'], 'ts': ts, 'text': frame['text']}))
+
+        for listener in self.listeners:
+            listener(frame)
+
+        # like Slack, let everyone see what the bot said
+        await self.broadcast({**frame, 'user': self.bot_id, 'ts': ts})
+
+    async def broadcast(self, event: Dict[str, Any]) -> None:
+        frame = json.dumps(event)
+
+        for websocket in list(self._sockets):
+            try:
+                await websocket.send(frame)
+            except websockets.ConnectionClosed:
+                self._sockets.discard(websocket)
+
+    async def post(self, channel: str, user: str, text: str) -> str:
+        """ post a message as a user, returning its timestamp """
+        ts = self._next_ts()
+        await self.broadcast({
+            'type': 'message', 'channel': channel, 'user': self.user_id(user), 'text': text, 'ts': ts
+        })
+        return ts
+
+    async def wait_for_bot(self, timeout: float = 5.0) -> None:
+        """ wait until a bot has connected to the websocket """
+        deadline = time.monotonic() + timeout
+
+        while len(self._sockets) == 0:
+            if time.monotonic() > deadline:
+                raise TimeoutError('No bot connected')
+
+            await asyncio.sleep(0.01)
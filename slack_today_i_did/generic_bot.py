@@ -8,12 +8,19 @@ To add a new function:
 
 """
 
+import asyncio
+import functools
 import html
+import inspect
+import threading
+import time
 
-from typing import List, Union, NamedTuple
+from typing import Any, List, Union, NamedTuple
 
 from slack_today_i_did.better_slack import BetterSlack
 from slack_today_i_did.command_history import CommandHistory
+from slack_today_i_did.instrumentation import Instrumentation, format_summary
+from slack_today_i_did.shared_files import file_version
 
 import slack_today_i_did.self_aware as self_aware
 
@@ -21,18 +28,108 @@ import slack_today_i_did.parser as parser
 import slack_today_i_did.text_tools as text_tools
 
 
-ChannelMessage = NamedTuple('ChannelMessage', [('channel', str), ('text', str)])
-ChannelMessages = Union[ChannelMessage, List[ChannelMessage]]
+# keep the same types when the module is hot reloaded, since
+# return types are compared against these when evaluating
+try:
+    ChannelMessage
+except NameError:
+    ChannelMessage = NamedTuple('ChannelMessage', [('channel', str), ('text', str)])
+    ChannelMessages = Union[ChannelMessage, List[ChannelMessage]]
+
+
+class lazy_state(object):
+    """ an attribute that's set up by its `_setup_` method the first time it's
+        used, rather than when the bot starts
+
+        class Bot(BotExtension):
+            notify = lazy_state('_setup_notify', 'notify_file')
+
+        State can be loaded from another thread while the bot is running, so
+        setup methods should only assign the attribute once it's fully loaded.
+        If the state comes from a file, name the attribute holding the filename,
+        and `forget_stale_state` will drop it once another process changes the file.
+    """
+    def __init__(self, setup_method_name: str, filename_attr: str = None):
+        self.setup_method_name = setup_method_name
+        self.filename_attr = filename_attr
+        self.name = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+
+        # the setup method assigns the attribute, which hides us from then on
+        with self.lock_for(instance):
+            if self.name not in instance.__dict__:
+                if self.filename_attr is not None:
+                    versions = instance.__dict__.setdefault('_state_versions', {})
+                    versions[self.name] = file_version(getattr(instance, self.filename_attr))
+
+                with instance.startup.phase(f'{self.name} (lazy)'):
+                    getattr(instance, self.setup_method_name)()
+
+        return instance.__dict__[self.name]
+
+    def lock_for(self, instance) -> threading.Lock:
+        """ each bot gets its own lock, so one bot loading its state doesn't hold up another """
+        locks = instance.__dict__.setdefault('_lazy_state_locks', {})
+
+        if self.name not in locks:
+            locks.setdefault(self.name, threading.Lock())
+
+        return locks[self.name]
+
+    def is_stale(self, instance) -> bool:
+        if self.filename_attr is None or self.name not in instance.__dict__:
+            return False
+
+        versions = instance.__dict__.get('_state_versions', {})
+        return versions.get(self.name) != file_version(getattr(instance, self.filename_attr))
+
+
+def forget_stale_state(instance) -> List[str]:
+    """ drop any lazy state whose file has changed since it was loaded,
+        so that it's loaded again next time. Returns the names dropped
+    """
+    forgotten = []
+    seen = set()
+
+    for cls in type(instance).__mro__:
+        for (name, value) in vars(cls).items():
+            # only the closest definition of a name counts
+            if name in seen:
+                continue
+
+            seen.add(name)
+
+            if isinstance(value, lazy_state):
+                with value.lock_for(instance):
+                    if value.is_stale(instance):
+                        del instance.__dict__[name]
+                        forgotten.append(name)
+
+    return forgotten
 
 
 class GenericSlackBot(BetterSlack):
     _user_id = None
     _last_sender = None
 
+    command_history = lazy_state('_setup_command_history')
+
     def __init__(self, *args, **kwargs):
+        self.instrumentation = kwargs.pop('instrumentation', None) or Instrumentation()
+        self.metrics_port = kwargs.pop('metrics_port', None)
+        # a `workers.WorkerPool` to evaluate commands in, if any
+        self.workers = None
+
         BetterSlack.__init__(self, *args, **kwargs)
         self.name = 'generic-slack-bot'
 
+    def _setup_command_history(self) -> None:
         self.command_history = CommandHistory()
 
     def is_direct_message(self, channel):
@@ -47,11 +144,26 @@ class GenericSlackBot(BetterSlack):
         self._actually_parse_message(message)
 
     async def main_loop(self):
-        await BetterSlack.main_loop(
-            self,
-            parser=self.parse_messages,
-            on_tick=self.on_tick
-        )
+        if self.metrics_port is not None:
+            await self.instrumentation.serve_metrics(port=self.metrics_port)
+
+        background = [asyncio.ensure_future(coroutine) for coroutine in self.background_tasks()]
+
+        try:
+            await BetterSlack.main_loop(
+                self,
+                parser=self.parse_messages,
+                on_tick=self.on_tick
+            )
+        finally:
+            for task in background:
+                task.cancel()
+
+    def background_tasks(self) -> List[Any]:
+        """ coroutines to run alongside the bot for as long as it's running,
+            for things that happen on a timer rather than when a message comes in
+        """
+        return []
 
     def known_tokens(self) -> List[str]:
         return list(self.known_functions().keys())
@@ -67,6 +179,8 @@ class GenericSlackBot(BetterSlack):
             'possible-funcs': self.possible_funcs,
             'list': self.list,
             'reload-funcs': self.reload_functions,
+            'stats': self.stats,
+            'startup-report': self.startup_report,
         }
 
     def known_statements(self):
@@ -77,11 +191,16 @@ class GenericSlackBot(BetterSlack):
     def on_tick(self):
         pass
 
+    async def in_thread(self, func, *args):
+        """ call something that blocks, like git or a web request, without holding up the bot """
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, functools.partial(func, *args))
+
     @property
     def user_id(self):
         if self._user_id is None:
-            data = self.connected_user(self.name)
-            self._user_id = data
+            # rtm.start tells us who we are, so only look ourselves up without it
+            self._user_id = self.self_id or self.connected_user(self.name)
 
         return self._user_id
 
@@ -98,45 +217,136 @@ class GenericSlackBot(BetterSlack):
         else:
             return None
 
-        tokens = parser.tokenize(text, self.known_tokens())
-        return parser.parse(tokens, self.known_functions())
+        known_functions = self.known_functions()
+        known_tokens = list(known_functions.keys())
+        fuzzy_index = text_tools.suggestion_index(tuple(sorted(known_tokens)))
+
+        with self.instrumentation.timer('tokenize'):
+            tokens = parser.tokenize(text, known_tokens, fuzzy_index=fuzzy_index)
+
+        leading_word = text.split(' ')[0]
+
+        if len(tokens) > 0 and tokens[0][0] == 0 and tokens[0][1] != leading_word:
+            self.send_channel_message(channel, f'I\'m guessing you meant `{tokens[0][1]}`')
+        elif len(tokens) == 0 and leading_word != '' and 'possible-funcs' in known_functions:
+            # when we can't guess for sure, offer some suggestions instead
+            tokens = [(0, 'possible-funcs', leading_word)]
+
+        with self.instrumentation.timer('parse'):
+            return parser.parse(tokens, known_functions)
 
     def _actually_parse_message(self, message):
         channel = message['channel']
         text = message['text']
 
+        self.instrumentation.increment('messages')
         stuff = self.parse(text, channel)
 
         if stuff is None:
             return
 
+        self.instrumentation.increment('commands')
+
         func_call = stuff.func_call
         evaluate = stuff.evaluate
+        known_functions = self.known_functions()
 
         # we always give the channel as the first arg
         default_args = [parser.Constant(channel, str)]
+
+        if self.workers is not None and self.workers.can_run(func_call, known_functions):
+            evaluating = self._evaluate_in_worker(channel, func_call, self._last_sender)
+            self._run_command(self._finish_command(channel, func_call, evaluating))
+            return
+
+        if parser.needs_await(func_call, known_functions):
+            evaluating = parser.evaluate_func_call_async(known_functions, func_call, default_args)
+            self._run_command(self._finish_command(channel, func_call, evaluating))
+            return
+
         try:
-            evaluation = evaluate(func_call, default_args)
+            # this covers evaluating the args as well as running the command itself
+            with self.instrumentation.timer('evaluate', func_call.func_name):
+                evaluation = evaluate(func_call, default_args)
 
-            # deal with exceptions running the command
-            if len(evaluation.errors) > 0:
-                self.send_channel_message(channel, '\n\n'.join(evaluation.errors))
+            # like `!!` running a command that needs awaiting
+            if inspect.isawaitable(evaluation.result):
+                self._run_command(self._finish_command(channel, func_call, self._await_result(func_call, evaluation)))
                 return
 
-            if func_call.return_type == ChannelMessages:
-                if isinstance(evaluation.result, ChannelMessage):
-                    messages = [evaluation.result]
-                else:
-                    messages = evaluation.result
+            self._reply_with(channel, func_call, evaluation)
+        except Exception as e:
+            self.instrumentation.increment('command-errors')
+            self.send_channel_message(channel, f'We got an error {e}!')
 
-                for message in messages:
-                    self.send_channel_message(message.channel, message.text)
+    def _run_command(self, coroutine) -> None:
+        """ run a command in the background on the bot's loop. When nothing is
+            running the loop, like in the tests, run it to the end straight away
+        """
+        try:
+            loop = asyncio.get_event_loop()
+        except RuntimeError:
+            loop = None
 
-            if evaluation.action != self.known_statements()['!!']:
-                self.command_history.add_command(channel, evaluation.action, evaluation.args)
+        if loop is not None and loop.is_running():
+            asyncio.ensure_future(coroutine)
+            return
+
+        loop = asyncio.new_event_loop()
+
+        try:
+            loop.run_until_complete(coroutine)
+        finally:
+            loop.close()
+
+    async def _finish_command(self, channel: str, func_call: parser.FuncCall, evaluating) -> None:
+        """ wait for a command to be evaluated somewhere else, then reply as if it had been done here """
+        try:
+            with self.instrumentation.timer('evaluate', func_call.func_name):
+                evaluation = await evaluating
+
+            self._reply_with(channel, func_call, evaluation)
         except Exception as e:
+            self.instrumentation.increment('command-errors')
             self.send_channel_message(channel, f'We got an error {e}!')
 
+        # the main loop only sends when something comes in, so don't wait for that
+        if self.websocket is not None:
+            await self.flush_messages()
+
+    async def _await_result(self, func_call: parser.FuncCall, evaluation: parser.FuncResult) -> parser.FuncResult:
+        try:
+            return evaluation._replace(result=await evaluation.result)
+        except Exception as e:
+            error_message = parser.exception_error_messages([(func_call.func_name, e)])
+            return parser.FuncResult(None, None, None, [], [error_message])
+
+    async def _evaluate_in_worker(self, channel: str, func_call: parser.FuncCall, sender: str) -> parser.FuncResult:
+        """ have a worker process evaluate a command, with our own version of the action """
+        evaluation = await self.workers.evaluate(func_call, channel, sender)
+        return evaluation._replace(action=self.known_functions()[func_call.func_name])
+
+    def _reply_with(self, channel: str, func_call: parser.FuncCall, evaluation: parser.FuncResult) -> None:
+        """ send the result of evaluating a command, and remember the command for `!!` """
+        # deal with exceptions running the command
+        if len(evaluation.errors) > 0:
+            self.instrumentation.increment('command-errors')
+            self.send_channel_message(channel, '\n\n'.join(evaluation.errors))
+            return
+
+        if func_call.return_type == ChannelMessages:
+            if isinstance(evaluation.result, ChannelMessage):
+                messages = [evaluation.result]
+            else:
+                messages = evaluation.result
+
+            with self.instrumentation.timer('reply', func_call.func_name):
+                for message in messages:
+                    self.send_channel_message(message.channel, message.text)
+
+        if evaluation.action != self.known_statements()['!!']:
+            self.command_history.add_command(channel, evaluation.action, evaluation.args)
+
     def parse_message(self, message):
         # if we don't have any of the useful data, return early
 
@@ -253,10 +463,35 @@ class GenericSlackBot(BetterSlack):
 
         return ChannelMessage(channel, message)
 
+    def stats(self, channel: str) -> ChannelMessages:
+        """ show how long each stage of handling messages has been taking """
+        if not self.instrumentation.enabled:
+            return ChannelMessage(channel, 'Instrumentation is turned off')
+
+        summary = format_summary(self.instrumentation.summary(), self.instrumentation.counters)
+        return ChannelMessage(channel, summary)
+
+    def startup_report(self, channel: str) -> ChannelMessages:
+        """ show how long each part of starting up took """
+        return ChannelMessage(channel, self.startup.report())
+
+    def _restart_workers(self) -> None:
+        # workers only import the code when they start, so they'd keep running the old code
+        if self.workers is not None:
+            self.workers.restart()
+
     def reload_functions(self, channel: str) -> ChannelMessages:
-        """ reload the functions a bot knows """
-        self_aware.restart_program()
-        return []
+        """ reload the functions a bot knows, without restarting """
+        started = time.perf_counter()
+
+        try:
+            self_aware.hot_reload(self)
+        except Exception as e:
+            return ChannelMessage(channel, f'Reloading failed, so I\'m still running the old code: {e}')
+
+        self._restart_workers()
+
+        return ChannelMessage(channel, f'Reloaded in {(time.perf_counter() - started) * 1000:.0f}ms')
 
     def functions_that_return(self, channel: str, text: str) -> ChannelMessages:
         """ give a type, return functions that return things of that type
@@ -278,15 +513,11 @@ class GenericSlackBot(BetterSlack):
 
 
 def possible_functions(known_functions, name, acceptable_score=5):
-    possibles = [
-        (text_tools.token_based_levenshtein(func_name, name), func_name) for func_name in known_functions
-    ]
-
-    possibles = [x for x in possibles if x[0] < acceptable_score]
-    possibles = sorted(possibles, key=lambda x: x[0])
-    possibles = [x[1] for x in possibles]
-
-    return possibles
+    """ known function names that are less than `acceptable_score` edits away from a name,
+        closest first
+    """
+    index = text_tools.suggestion_index(tuple(sorted(known_functions)))
+    return [func_name for (_, func_name) in index.search(name, max_distance=acceptable_score - 1)]
 
 
 class BotExtension(GenericSlackBot):
@@ -0,0 +1,70 @@
+"""
+Run git commands in a given directory, either blocking or on the event loop.
+
+Commands are always run with `cwd=` rather than by changing the working
+directory of the whole process, so several can be in flight at once.
+"""
+
+import asyncio
+import subprocess
+from typing import NamedTuple
+
+
+GitResult = NamedTuple(
+    'GitResult',
+    [('returncode', int), ('stdout', str), ('stderr', str)])
+
+
+class GitError(Exception):
+    pass
+
+
+def _check(args, result: GitResult, check: bool) -> GitResult:
+    if check and result.returncode != 0:
+        raise GitError(f'git {" ".join(args)} failed with: {result.stderr.strip()}')
+
+    return result
+
+
+def run_git(*args: str, cwd: str = None, check: bool = True) -> GitResult:
+    """ run a git command and wait for it to finish """
+    completed = subprocess.run(
+        ['git', *args],
+        cwd=cwd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+
+    result = GitResult(completed.returncode, completed.stdout.decode(), completed.stderr.decode())
+    return _check(args, result, check)
+
+
+async def run_git_async(*args: str, cwd: str = None, check: bool = True) -> GitResult:
+    """ run a git command without blocking the event loop """
+    process = await asyncio.create_subprocess_exec(
+        'git', *args,
+        cwd=cwd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+
+    (stdout, stderr) = await process.communicate()
+
+    result = GitResult(process.returncode, stdout.decode(), stderr.decode())
+    return _check(args, result, check)
+
+
+def first_sha(output: str) -> str:
+    """ the sha at the start of `git ls-remote` or `git rev-parse` output
+
+        >>> first_sha('abc123\\trefs/heads/master\\n')
+        'abc123'
+        >>> first_sha('') is None
+        True
+    """
+    parts = output.split()
+
+    if len(parts) == 0:
+        return None
+
+    return parts[0]
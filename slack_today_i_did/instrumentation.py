@@ -0,0 +1,238 @@
+"""
+Timing and counting for the stages a message goes through.
+
+Each (stage, command) pair gets a histogram of how long it took over the most
+recent samples, which can be shown in chat or scraped in Prometheus' text format.
+When disabled, timers are a shared do-nothing object so the cost is a single
+attribute check.
+"""
+
+import asyncio
+import math
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Dict, List, NamedTuple
+
+
+StageSummary = NamedTuple(
+    'StageSummary',
+    [('stage', str), ('command', str), ('count', int), ('total', float),
+     ('p50', float), ('p95', float), ('p99', float)])
+
+
+def percentile(sorted_samples: List[float], fraction: float) -> float:
+    """ nearest-rank percentile of already sorted samples
+
+        >>> percentile([1, 2, 3, 4], 0.5)
+        2
+        >>> percentile([1, 2, 3, 4], 0.99)
+        4
+        >>> percentile([], 0.5)
+        0.0
+    """
+    if len(sorted_samples) == 0:
+        return 0.0
+
+    rank = max(0, math.ceil(fraction * len(sorted_samples)) - 1)
+    return sorted_samples[min(rank, len(sorted_samples) - 1)]
+
+
+class Histogram(object):
+    """ keeps the most recent samples, plus a count and total of all of them """
+    def __init__(self, max_samples: int = 1024):
+        self.samples = deque(maxlen=max_samples)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, value: float) -> None:
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+
+    def percentiles(self, *fractions: float) -> List[float]:
+        sorted_samples = sorted(self.samples)
+        return [percentile(sorted_samples, fraction) for fraction in fractions]
+
+
+class _Timer(object):
+    __slots__ = ('instrumentation', 'stage', 'command', 'started')
+
+    def __init__(self, instrumentation, stage, command):
+        self.instrumentation = instrumentation
+        self.stage = stage
+        self.command = command
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.instrumentation.record(self.stage, self.command, time.perf_counter() - self.started)
+        return False
+
+
+class _NullTimer(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Instrumentation(object):
+    def __init__(self, enabled: bool = True, max_samples: int = 1024):
+        self.enabled = enabled
+        self.max_samples = max_samples
+        self.histograms = {}
+        self.counters = defaultdict(int)
+
+    def timer(self, stage: str, command: str = ''):
+        """ time a block of code as part of a stage
+
+            with instrumentation.timer('evaluate', 'help'):
+                do_the_thing()
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+
+        return _Timer(self, stage, command)
+
+    def record(self, stage: str, command: str, seconds: float) -> None:
+        key = (stage, command or '')
+
+        if key not in self.histograms:
+            self.histograms[key] = Histogram(self.max_samples)
+
+        self.histograms[key].add(seconds)
+
+    def increment(self, name: str, by: int = 1) -> None:
+        if self.enabled:
+            self.counters[name] += by
+
+    def reset(self) -> None:
+        self.histograms = {}
+        self.counters = defaultdict(int)
+
+    def summary(self) -> List[StageSummary]:
+        summaries = []
+
+        for ((stage, command), histogram) in sorted(self.histograms.items()):
+            (p50, p95, p99) = histogram.percentiles(0.5, 0.95, 0.99)
+            summaries.append(StageSummary(stage, command, histogram.count, histogram.total, p50, p95, p99))
+
+        return summaries
+
+    def prometheus_text(self, prefix: str = 'slack_bot') -> str:
+        """ the current stats in Prometheus' text exposition format """
+        lines = [
+            f'# HELP {prefix}_stage_seconds Time spent in each stage of handling a message',
+            f'# TYPE {prefix}_stage_seconds summary'
+        ]
+
+        for summary in self.summary():
+            labels = f'stage="{summary.stage}",command="{summary.command}"'
+
+            for (quantile, value) in (('0.5', summary.p50), ('0.95', summary.p95), ('0.99', summary.p99)):
+                lines.append(f'{prefix}_stage_seconds{{{labels},quantile="{quantile}"}} {value}')
+
+            lines.append(f'{prefix}_stage_seconds_sum{{{labels}}} {summary.total}')
+            lines.append(f'{prefix}_stage_seconds_count{{{labels}}} {summary.count}')
+
+        lines.append(f'# HELP {prefix}_events_total Things that have happened')
+        lines.append(f'# TYPE {prefix}_events_total counter')
+
+        for (name, value) in sorted(self.counters.items()):
+            lines.append(f'{prefix}_events_total{{name="{name}"}} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+    async def serve_metrics(self, host: str = '127.0.0.1', port: int = 9100):
+        """ serve `prometheus_text` over plain HTTP on every path """
+
+        async def handle(reader, writer):
+            # we don't care what was asked for, just read the request headers
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+
+            body = self.prometheus_text().encode()
+            writer.write(
+                b'HTTP/1.0 200 OK\r\n'
+                b'Content-Type: text/plain; version=0.0.4\r\n' +
+                f'Content-Length: {len(body)}\r\n\r\n'.encode() +
+                body
+            )
+            await writer.drain()
+            writer.close()
+
+        return await asyncio.start_server(handle, host, port)
+
+
+class PhaseTimer(object):
+    """ how long each named phase of something took, in the order they happened """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = []
+
+    @contextmanager
+    def phase(self, name: str):
+        before = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            self.phases.append((name, before - self.started, time.perf_counter() - before))
+
+    def report(self) -> str:
+        if len(self.phases) == 0:
+            return 'Nothing has been timed yet'
+
+        message = '```\n'
+        message += f'{"at":>10} {"took":>10}  phase\n'
+        message += '\n'.join(
+            f'{offset * 1000:>8.1f}ms {seconds * 1000:>8.1f}ms  {name}'
+            for (name, offset, seconds) in self.phases
+        )
+        message += '\n```'
+
+        return message
+
+
+def format_summary(summaries: List[StageSummary], counters: Dict[str, int]) -> str:
+    """ a chat friendly table of stats """
+    if len(summaries) == 0 and len(counters) == 0:
+        return 'Nothing has been timed yet'
+
+    rows = []
+
+    for summary in summaries:
+        name = summary.stage if not summary.command else f'{summary.stage} {summary.command}'
+        rows.append((
+            name,
+            str(summary.count),
+            f'{summary.p50 * 1000:.2f}ms',
+            f'{summary.p95 * 1000:.2f}ms',
+            f'{summary.p99 * 1000:.2f}ms'
+        ))
+
+    message = '```\n'
+    message += f'{"stage":<40} {"count":>7} {"p50":>10} {"p95":>10} {"p99":>10}\n'
+    message += '\n'.join(
+        f'{name:<40} {count:>7} {p50:>10} {p95:>10} {p99:>10}'
+        for (name, count, p50, p95, p99) in rows
+    )
+
+    if len(counters) > 0:
+        message += '\n\n'
+        message += '\n'.join(f'{name}: {value}' for (name, value) in sorted(counters.items()))
+
+    message += '\n```'
+
+    return message
@@ -0,0 +1,89 @@
+"""
+Pick bits out of big JSON documents, like Rollbar items, and render them for
+Slack without building more of the string than will fit in a message.
+"""
+
+import json
+import re
+from typing import Any, List, Tuple, Union
+
+
+# Slack cuts messages off after this many characters
+SLACK_MESSAGE_LIMIT = 4000
+
+_PATH = re.compile(r'(?:[^.\[\]]+|\[-?\d+\])(?:\.[^.\[\]]+|\[-?\d+\])*')
+_PATH_PART = re.compile(r'([^.\[\]]+)|\[(-?\d+)\]')
+
+
+class PathError(Exception):
+    pass
+
+
+def parse_path(path: str) -> List[Union[str, int]]:
+    ''' Split a path into the keys and indexes to follow
+
+        >>> parse_path('last_occurrence.body.trace.frames[0]')
+        ['last_occurrence', 'body', 'trace', 'frames', 0]
+        >>> parse_path('frames[-1].filename')
+        ['frames', -1, 'filename']
+    '''
+    path = path.strip()
+
+    if _PATH.fullmatch(path) is None:
+        raise PathError(f'`{path}` isn\'t a path like `body.trace.frames[0]`')
+
+    return [key if index == '' else int(index) for (key, index) in _PATH_PART.findall(path)]
+
+
+def project(data: Any, path: str) -> Any:
+    """ the part of `data` that `path` points at """
+    value = data
+    walked = ''
+
+    for part in parse_path(path):
+        if isinstance(part, int):
+            if not isinstance(value, list) or not -len(value) <= part < len(value):
+                raise PathError(f'{walked or "it"} doesn\'t have a [{part}]')
+
+            walked = f'{walked}[{part}]'
+        else:
+            if not isinstance(value, dict) or part not in value:
+                raise PathError(f'{walked or "it"} doesn\'t have a field {part}')
+
+            walked = f'{walked}.{part}' if walked else part
+
+        value = value[part]
+
+    return value
+
+
+def render(value: Any, limit: int = SLACK_MESSAGE_LIMIT) -> Tuple[str, bool]:
+    """ `value` as at most `limit` characters, and whether it had to be cut short.
+        Strings are shown as they are, and everything else as JSON, which is
+        only encoded as far as the limit
+    """
+    if isinstance(value, str):
+        chunks = iter([value])
+    else:
+        chunks = json.JSONEncoder(indent=2).iterencode(value)
+
+    pieces = []
+    length = 0
+
+    for chunk in chunks:
+        if length + len(chunk) > limit:
+            pieces.append(chunk[:limit - length])
+            return (''.join(pieces), True)
+
+        pieces.append(chunk)
+        length += len(chunk)
+
+    return (''.join(pieces), False)
+
+
+def full_text(value: Any) -> str:
+    """ all of `value`, as `render` would show it without a limit """
+    if isinstance(value, str):
+        return value
+
+    return json.dumps(value, indent=2)
@@ -1,6 +1,8 @@
 import json
 from typing import List
 
+from slack_today_i_did.shared_files import write_json
+
 
 class KnownNames(object):
     """ Alias a person to a group of names, with saving and loading from disk
@@ -28,5 +30,4 @@ class KnownNames(object):
             self.people[person] = names
 
     def save_to_file(self, filename: str) -> None:
-        with open(filename, 'w') as f:
-            json.dump({'people': self.people}, f)
+        write_json(filename, {'people': self.people})
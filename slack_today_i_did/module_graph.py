@@ -0,0 +1,103 @@
+"""
+A graph of which Elm files import which, built once from a list of files.
+
+Modules are looked up the same way that globbing for `**/Foo/Bar.elm` would
+find them: any file whose path ends in `Foo/Bar.elm` is a match for `Foo.Bar`.
+"""
+
+from collections import defaultdict
+from typing import Callable, List
+
+
+def module_name(import_: str) -> str:
+    """ get the module name out of an import line
+
+        >>> module_name('Html.Attributes as Attr exposing (class)')
+        'Html.Attributes'
+    """
+    parts = import_.split()
+
+    if len(parts) == 0:
+        return ''
+
+    return parts[0]
+
+
+def module_suffixes(root: str, filename: str) -> List[str]:
+    """ every module name that a file could be imported as
+
+        >>> module_suffixes('repo', 'repo/src/Foo/Bar.elm')
+        ['Bar', 'Foo.Bar', 'src.Foo.Bar']
+    """
+    relative = filename[len(root):].strip('/')
+
+    if relative.endswith('.elm'):
+        relative = relative[:-len('.elm')]
+
+    parts = relative.split('/')
+
+    return ['.'.join(parts[i:]) for i in range(len(parts) - 1, -1, -1)]
+
+
+class ModuleGraph(object):
+    def __init__(self, root: str, filenames: List[str], imports_of: Callable[[str], List[str]]):
+        self.root = root
+        self.filenames = list(filenames)
+        self._modules = defaultdict(list)
+        self._imports = {}
+        self._dependents = None
+
+        for filename in self.filenames:
+            for name in module_suffixes(root, filename):
+                self._modules[name].append(filename)
+
+        for filename in self.filenames:
+            self._imports[filename] = [
+                imported
+                for import_ in imports_of(filename)
+                for imported in self.files_for(module_name(import_))
+            ]
+
+    def files_for(self, module: str) -> List[str]:
+        """ the files that could be meant by a module name """
+        return self._modules.get(module, [])
+
+    def imports(self, filename: str) -> List[str]:
+        """ the files directly imported by a file """
+        return self._imports.get(filename, [])
+
+    def dependents(self, filename: str) -> List[str]:
+        """ the files that directly import a file """
+        if self._dependents is None:
+            self._dependents = defaultdict(list)
+
+            for (importer, imported) in self._imports.items():
+                for name in imported:
+                    self._dependents[name].append(importer)
+
+        return self._dependents.get(filename, [])
+
+    def transitive_imports(self, filename: str) -> List[str]:
+        """ a file along with everything it imports, directly or not """
+        return self._walk(filename, self.imports)
+
+    def transitive_dependents(self, filename: str) -> List[str]:
+        """ a file along with everything that imports it, directly or not """
+        return self._walk(filename, self.dependents)
+
+    def _walk(self, filename: str, edges: Callable[[str], List[str]]) -> List[str]:
+        seen = set()
+        found = []
+        to_visit = [filename]
+
+        while to_visit:
+            current = to_visit.pop()
+
+            if current in seen:
+                continue
+
+            seen.add(current)
+            found.append(current)
+            to_visit.extend(edges(current))
+
+        return found
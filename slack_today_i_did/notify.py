@@ -2,6 +2,8 @@ import json
 from typing import List
 import re
 
+from slack_today_i_did.shared_files import write_json
+
 
 class Notification(object):
     """ Allows you to register multiple regex patterns with a person
@@ -64,5 +66,4 @@ class Notification(object):
 
     def save_to_file(self, filename: str) -> None:
         """ save people:patterns to a file """
-        with open(filename, 'w') as f:
-            json.dump({'patterns': self.patterns}, f)
+        write_json(filename, {'patterns': self.patterns})
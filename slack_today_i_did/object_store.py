@@ -0,0 +1,85 @@
+"""
+Read files straight out of a git object database, without a checkout.
+
+Trees are listed with `git ls-tree -r`, and blobs are read through a single
+long running `git cat-file --batch` process rather than a process per file.
+"""
+
+import subprocess
+import threading
+from typing import Dict
+
+import slack_today_i_did.git_runner as git_runner
+
+
+class GitObjectStore(object):
+    def __init__(self, repo_dir: str):
+        self.repo_dir = repo_dir
+        self._cat_file = None
+        self._lock = threading.Lock()
+
+    def ls_tree(self, ref: str) -> Dict[str, str]:
+        """ every file in a ref, as path: blob sha """
+        result = git_runner.run_git('ls-tree', '-r', '-z', ref, cwd=self.repo_dir)
+        files = {}
+
+        for entry in result.stdout.split('\0'):
+            if not entry:
+                continue
+
+            (info, path) = entry.split('\t', 1)
+            (_, object_type, sha) = info.split()
+
+            if object_type == 'blob':
+                files[path] = sha
+
+        return files
+
+    def resolve(self, ref: str) -> str:
+        """ the commit sha a ref points at, or None if we don't have it """
+        result = git_runner.run_git(
+            'rev-parse', '--verify', '-q', f'{ref}^{{commit}}', cwd=self.repo_dir, check=False
+        )
+
+        if result.returncode != 0:
+            return None
+
+        return git_runner.first_sha(result.stdout)
+
+    def read_blob(self, sha: str) -> bytes:
+        """ read the contents of a blob through the shared cat-file process """
+        with self._lock:
+            process = self._cat_file_process()
+            process.stdin.write(f'{sha}\n'.encode())
+            process.stdin.flush()
+
+            header = process.stdout.readline().decode().split()
+
+            if len(header) < 3 or header[1] == 'missing':
+                raise KeyError(f'No such object {sha}')
+
+            size = int(header[2])
+            contents = process.stdout.read(size)
+
+            # each object is followed by a newline
+            process.stdout.read(1)
+
+        return contents
+
+    def _cat_file_process(self) -> subprocess.Popen:
+        if self._cat_file is None or self._cat_file.poll() is not None:
+            self._cat_file = subprocess.Popen(
+                ['git', 'cat-file', '--batch'],
+                cwd=self.repo_dir,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE
+            )
+
+        return self._cat_file
+
+    def close(self) -> None:
+        with self._lock:
+            if self._cat_file is not None:
+                self._cat_file.stdin.close()
+                self._cat_file.wait()
+                self._cat_file = None
@@ -6,9 +6,29 @@ such as the number of 0.16/0.17 files
 
 import os
 import glob
-from typing import List, Dict
-from enum import Enum
-from contextlib import contextmanager
+import json
+import re
+import asyncio
+import threading
+from typing import Any, Callable, List, Dict, NamedTuple, Tuple
+from concurrent.futures import ThreadPoolExecutor
+
+import slack_today_i_did.elm_files as elm_files
+import slack_today_i_did.git_runner as git_runner
+from slack_today_i_did.elm_files import ElmVersion
+from slack_today_i_did.module_graph import ModuleGraph
+from slack_today_i_did.bounded_cache import BoundedCache
+from slack_today_i_did.worktrees import WorktreePool
+from slack_today_i_did.object_store import GitObjectStore
+from slack_today_i_did.shared_files import write_json
+
+
+_COMMIT_SHA = re.compile(r'[0-9a-f]{7,40}')
+_FULL_COMMIT_SHA = re.compile(r'[0-9a-f]{40}')
+
+
+class RefError(Exception):
+    pass
 
 
 class OurRepo(object):
@@ -17,90 +37,488 @@ class OurRepo(object):
         self.token = token
         self.org = org
         self.repo = repo
+        self._pending_fetches = {}
+        self.git_lock = threading.Lock()
 
     def make_repo_dir(self) -> None:
         os.makedirs(self.folder, exist_ok=True)
 
+    @property
+    def url(self) -> str:
+        return f'https://{self.token}@github.com/{self.org}/{self.repo}.git'
+
+    @property
+    def is_cloned(self) -> bool:
+        return os.path.isdir(f'{self.repo_dir}/.git')
+
     def _git_init(self) -> None:
-        url = f'https://{self.token}@github.com/{self.org}/{self.repo}.git'
-        os.system(f'git clone --depth 1 {url}')
-        os.chdir(self.repo)
-        os.system(f'git remote set-url origin {url}')
+        git_runner.run_git('clone', '--depth', '1', self.url, self.repo, cwd=self.folder)
+        git_runner.run_git('remote', 'set-url', 'origin', self.url, cwd=self.repo_dir)
+
+    async def _git_init_async(self) -> None:
+        await git_runner.run_git_async('clone', '--depth', '1', self.url, self.repo, cwd=self.folder)
+        await git_runner.run_git_async('remote', 'set-url', 'origin', self.url, cwd=self.repo_dir)
+
+    def _refspec(self, branch_name: str) -> str:
+        return f'+refs/heads/{branch_name}:refs/remotes/origin/{branch_name}'
+
+    def fetch(self, branch_name: str = 'master') -> None:
+        """ fetch a branch, unless the remote is still where we left it """
+        with self.git_lock:
+            self._fetch(branch_name)
+
+    def _fetch(self, branch_name: str) -> None:
+        """ like `fetch`, for when `git_lock` is already held """
+        remote = git_runner.run_git('ls-remote', 'origin', f'refs/heads/{branch_name}', cwd=self.repo_dir)
+        local = git_runner.run_git(
+            'rev-parse', '--verify', '-q', f'origin/{branch_name}', cwd=self.repo_dir, check=False
+        )
+
+        if git_runner.first_sha(remote.stdout) != git_runner.first_sha(local.stdout):
+            git_runner.run_git('fetch', '--depth', '1', 'origin', self._refspec(branch_name), cwd=self.repo_dir)
+
+    def fetch_history(self, branch_name: str, depth: int) -> None:
+        """ make sure we have the last `depth` commits of a branch """
+        with self.git_lock:
+            git_runner.run_git(
+                'fetch', '--depth', str(depth), 'origin', self._refspec(branch_name), cwd=self.repo_dir
+            )
+
+    async def _acquire_git_lock(self) -> None:
+        """ wait for `git_lock` in a thread, so the loop keeps going meanwhile """
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, self.git_lock.acquire)
+
+    async def fetch_async(self, branch_name: str = 'master') -> None:
+        await self._acquire_git_lock()
+
+        try:
+            await self._fetch_async(branch_name)
+        finally:
+            self.git_lock.release()
+
+    async def _fetch_async(self, branch_name: str) -> None:
+        remote = await git_runner.run_git_async(
+            'ls-remote', 'origin', f'refs/heads/{branch_name}', cwd=self.repo_dir
+        )
+        local = await git_runner.run_git_async(
+            'rev-parse', '--verify', '-q', f'origin/{branch_name}', cwd=self.repo_dir, check=False
+        )
+
+        # nothing new on the remote, so there's no point fetching
+        if git_runner.first_sha(remote.stdout) != git_runner.first_sha(local.stdout):
+            await git_runner.run_git_async(
+                'fetch', '--depth', '1', 'origin', self._refspec(branch_name), cwd=self.repo_dir
+            )
 
     def _git_clone(self, branch_name: str = 'master') -> None:
-        os.system(f'git remote set-branches origin {branch_name}')
-        os.system(f'git fetch --depth 1 origin {branch_name}')
-        os.system(f'git checkout origin/{branch_name}')
+        # hold the lock until it's all checked out, as other processes share the checkout
+        with self.git_lock:
+            self._fetch(branch_name)
+            git_runner.run_git('checkout', '-q', f'origin/{branch_name}', cwd=self.repo_dir)
+            self.on_checkout()
+
+    async def _git_clone_async(self, branch_name: str = 'master') -> None:
+        await self._acquire_git_lock()
 
-    def get_ready(self, branch_name: str = 'master') -> None:
-        current_dir = os.getcwd()
         try:
+            await self._fetch_async(branch_name)
+            await git_runner.run_git_async('checkout', '-q', f'origin/{branch_name}', cwd=self.repo_dir)
+
+            # on_checkout can run git too
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(None, self.on_checkout)
+        finally:
+            self.git_lock.release()
+
+    def ensure_cloned(self) -> None:
+        with self.git_lock:
             self.make_repo_dir()
-            os.chdir(self.folder)
-            self._git_init()
-        except:
-            pass
+
+            if not self.is_cloned:
+                self._git_init()
+
+    def get_ready(self, branch_name: str = 'master') -> None:
+        self.ensure_cloned()
+        self._git_clone(branch_name)
+
+    def on_checkout(self) -> None:
+        """ called whenever something new has been checked out """
+        pass
+
+    async def get_ready_async(self, branch_name: str = 'master') -> None:
+        """ get a branch checked out without blocking the event loop.
+            If another command is already getting the same branch ready,
+            wait for that instead of fetching again
+        """
+        if branch_name not in self._pending_fetches:
+            self._pending_fetches[branch_name] = asyncio.ensure_future(self._get_ready_async(branch_name))
+
+        pending = self._pending_fetches[branch_name]
+
+        try:
+            await asyncio.shield(pending)
         finally:
-            os.chdir(current_dir)
+            if pending.done() and self._pending_fetches.get(branch_name) is pending:
+                del self._pending_fetches[branch_name]
+
+    async def _get_ready_async(self, branch_name: str) -> None:
+        await self._acquire_git_lock()
 
-        os.chdir(self.repo_dir)
         try:
-            self._git_clone(branch_name)
+            self.make_repo_dir()
+
+            if not self.is_cloned:
+                await self._git_init_async()
         finally:
-            os.chdir(current_dir)
+            self.git_lock.release()
+
+        await self._git_clone_async(branch_name)
 
     @property
     def repo_dir(self):
         return f'{self.folder}/{self.repo}'
 
 
-class ElmVersion(Enum):
-    unknown = -1
-    v_016 = 0
-    v_017 = 1
+ElmFileInfo = NamedTuple(
+    'ElmFileInfo',
+    [('filename', str), ('version', ElmVersion), ('hardness', Dict[str, int])])
+TrendPoint = NamedTuple(
+    'TrendPoint',
+    [('sha', str), ('date', str), ('counts', Dict[ElmVersion, int])])
+
+
+class BlobVersions(object):
+    """ Remember the Elm version of every blob we've looked at, with saving and loading from disk
+    """
+    def __init__(self):
+        self.versions = {}
+
+    def get(self, sha: str) -> ElmVersion:
+        if sha not in self.versions:
+            return None
+
+        return ElmVersion(self.versions[sha])
+
+    def add(self, sha: str, version: ElmVersion) -> None:
+        self.versions[sha] = version.value
+
+    def load_from_file(self, filename: str) -> None:
+        try:
+            with open(filename) as f:
+                as_json = json.load(f)
+        except FileNotFoundError:
+            return
+
+        self.versions.update(as_json['versions'])
+
+    def save_to_file(self, filename: str) -> None:
+        write_json(filename, {'versions': self.versions})
 
 
 class ElmRepo(OurRepo):
+    # how many files each worker handles at a time when analysing in bulk
+    analysis_chunk_size = 32
+    analysis_workers = 8
+
     def __init__(self, *args, **kwargs):
+        cache = kwargs.pop('cache', None)
+        versions_file = kwargs.pop('versions_file', None)
         OurRepo.__init__(self, *args, **kwargs)
-        self._known_files = {ElmVersion.v_016: [], ElmVersion.v_017: []}
-        self._breakdown_cache = {}
-        self._import_cache = {}
-        self._caching_lookups = False
 
-    def get_elm_files(self) -> List[str]:
-        return glob.glob(f'{self.repo_dir}/**/*.elm', recursive=True)
+        self.versions_file = versions_file or f'{self.folder}/elm_blob_versions.json'
+        self._blob_versions = None
+
+        # lookups are keyed on file contents, so they stay valid across checkouts
+        self.cache = BoundedCache() if cache is None else cache
+        self._head = None
+        self._module_graph = None
+        self._content_keys = None
+
+        # both are built once and shared by every thread, taken in this order
+        self._module_graph_lock = threading.Lock()
+        self._content_keys_lock = threading.Lock()
+        self.worktrees = WorktreePool(self, self._worktree_view)
+        self._object_store = None
+
+    def on_checkout(self) -> None:
+        """ forget the old checkout if HEAD has moved """
+        head = self._current_head()
+
+        if head is None or head != self._head:
+            self._head = head
+            self._forget_checkout()
+
+    def _current_head(self) -> str:
+        try:
+            result = git_runner.run_git('rev-parse', 'HEAD', cwd=self.repo_dir, check=False)
+        except OSError:
+            return None
+
+        return git_runner.first_sha(result.stdout) if result.returncode == 0 else None
+
+    def _forget_checkout(self) -> None:
+        """ drop anything that was worked out from the previous checkout """
+        with self._module_graph_lock, self._content_keys_lock:
+            self._module_graph = None
+            self._content_keys = None
+
+    def _worktree_view(self, folder: str) -> 'ElmRepo':
+        """ an ElmRepo rooted at a worktree, sharing our cache """
+        return ElmRepo(folder, self.token, self.org, self.repo, cache=self.cache)
+
+    def _blob_shas(self) -> Dict[str, str]:
+        """ the git blob sha of every tracked file in the checkout """
+        try:
+            result = git_runner.run_git('ls-files', '--stage', cwd=self.repo_dir, check=False)
+        except OSError:
+            return {}
+
+        shas = {}
+
+        for line in result.stdout.splitlines():
+            (info, path) = line.split('\t', 1)
+            shas[f'{self.repo_dir}/{path}'] = info.split()[1]
+
+        return shas
+
+    def _content_key(self, filename: str) -> Tuple:
+        """ something that changes whenever the contents of a file do.
+            Tracked files use their blob sha, anything else falls back to stat
+        """
+        with self._content_keys_lock:
+            if self._content_keys is None:
+                self._content_keys = self._blob_shas()
+
+            content_keys = self._content_keys
+
+        if filename in content_keys:
+            return ('blob', content_keys[filename])
+
+        stat = os.stat(filename)
+        return ('stat', filename, stat.st_mtime_ns, stat.st_size)
+
+    def _cached(self, kind: str, filename: str, compute: Callable[[str], Any]) -> Any:
+        key = (kind, self._content_key(filename))
+        return self.cache.get_or_compute(key, lambda: compute(filename))
+
+    def _cached_blob(self, kind: str, sha: str, compute: Callable[[bytes], Any]) -> Any:
+        """ blobs share cache entries with checked out files that have the same sha,
+            and are only read if there's nothing in the cache
+        """
+        key = (kind, ('blob', sha))
+        return self.cache.get_or_compute(key, lambda: compute(self.object_store.read_blob(sha)))
+
+    def cache_stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
 
     @property
-    def number_of_017_files(self):
-        elm_017_count = 0
+    def module_graph(self) -> ModuleGraph:
+        """ the import graph of the current checkout, built on first use """
+        with self._module_graph_lock:
+            if self._module_graph is None:
+                self._module_graph = ModuleGraph(self.repo_dir, self.get_elm_files(), self.file_import_list)
+
+            return self._module_graph
+
+    @property
+    def object_store(self) -> GitObjectStore:
+        if self._object_store is None:
+            self._object_store = GitObjectStore(self.repo_dir)
+
+        return self._object_store
+
+    def resolve_ref(self, ref: str) -> str:
+        """ find a commit for a ref. Branches are fetched first, so they're
+            up to date, and anything else is looked up as a commit or tag.
+            Commits from further back than the shallow clone are fetched by their sha
+        """
+        ref = ref.strip()
+        self.ensure_cloned()
 
-        for file in self.get_elm_files():
-            if self.what_kinda_file(file) == ElmVersion.v_017:
-                elm_017_count += 1
+        sha = None
 
-        return elm_017_count
+        # the local branches left by the clone never move, so go by the remote's
+        if _COMMIT_SHA.fullmatch(ref) is None:
+            self.fetch(ref)
+            sha = self.object_store.resolve(f'refs/remotes/origin/{ref}')
+
+        if sha is None:
+            sha = self.object_store.resolve(ref)
+
+        if sha is None and _FULL_COMMIT_SHA.fullmatch(ref) is not None:
+            with self.git_lock:
+                git_runner.run_git('fetch', '--depth', '1', 'origin', ref, cwd=self.repo_dir, check=False)
+
+            sha = self.object_store.resolve(ref)
+
+        if sha is None:
+            if _COMMIT_SHA.fullmatch(ref) is not None:
+                raise RefError(f'I couldn\'t find `{ref}`. If it\'s an older commit, give me its full sha')
+
+            raise RefError(f'I couldn\'t find a branch or commit called `{ref}`')
+
+        return sha
+
+    def analyse_ref(self, ref: str, pattern: str = '*') -> Dict[str, ElmFileInfo]:
+        """ classify and score the files matching a pattern in a commit,
+            reading them straight out of the object store
+        """
+        matcher = elm_files.pattern_regex(pattern)
+
+        return {
+            path: self._analyse_blob(path, sha)
+            for (path, sha) in self.object_store.ls_tree(ref).items()
+            if matcher.match(path)
+        }
+
+    def _analyse_blob(self, path: str, sha: str) -> ElmFileInfo:
+        version = self._cached_blob('version', sha, _buffer_version)
+
+        if version == ElmVersion.v_016:
+            hardness = self._cached_blob('hardness', sha, elm_files.how_hard_to_port)
+        else:
+            hardness = {}
+
+        return ElmFileInfo(path, version, hardness)
 
     @property
-    def number_of_016_files(self):
-        elm_016_count = 0
+    def blob_versions(self) -> BlobVersions:
+        if self._blob_versions is None:
+            self._blob_versions = BlobVersions()
+            self._blob_versions.load_from_file(self.versions_file)
 
-        for file in self.get_elm_files():
-            if self.what_kinda_file(file) == ElmVersion.v_016:
-                elm_016_count += 1
+        return self._blob_versions
 
-        return elm_016_count
+    def _remembered_version(self, sha: str) -> ElmVersion:
+        """ the version of a blob, from disk if we've ever seen it before """
+        version = self.blob_versions.get(sha)
 
-    def get_files_for_017(self, pattern: str) -> List[str]:
-        pattern = pattern.replace('.', '/')
-        all_files = glob.glob(
-            f'{self.repo_dir}/**/{pattern}.elm',
-            recursive=True
+        if version is None:
+            version = self._cached_blob('version', sha, _buffer_version)
+            self.blob_versions.add(sha, version)
+
+        return version
+
+    def version_trend(self, branch_name: str, number_of_commits: int) -> List[TrendPoint]:
+        """ version counts for each of the last commits on a branch, oldest first.
+            Only the first commit is scanned in full. After that, just the files
+            changed by each commit are looked at
+        """
+        branch_name = branch_name.strip()
+        self.ensure_cloned()
+        self.fetch_history(branch_name, number_of_commits)
+
+        log = git_runner.run_git(
+            'log', '--first-parent', '-n', str(number_of_commits), '--format=%H %cd', '--date=short',
+            f'origin/{branch_name}', cwd=self.repo_dir
         )
+        commits = [line.split(' ', 1) for line in reversed(log.stdout.splitlines())]
+
+        if len(commits) == 0:
+            return []
+
+        (first_sha, first_date) = commits[0]
+        versions = {
+            path: self._remembered_version(sha)
+            for (path, sha) in self.object_store.ls_tree(first_sha).items()
+            if path.endswith('.elm')
+        }
+        trend = [TrendPoint(first_sha, first_date, _count_versions(versions.values()))]
+
+        for ((previous_sha, _), (sha, date)) in zip(commits, commits[1:]):
+            for (path, blob_sha) in self._changed_elm_files(previous_sha, sha):
+                if blob_sha is None:
+                    versions.pop(path, None)
+                else:
+                    versions[path] = self._remembered_version(blob_sha)
+
+            trend.append(TrendPoint(sha, date, _count_versions(versions.values())))
+
+        self.blob_versions.save_to_file(self.versions_file)
+
+        return trend
+
+    def _changed_elm_files(self, from_ref: str, to_ref: str) -> List[Tuple[str, str]]:
+        """ (path, new blob sha) for every Elm file changed between two commits.
+            Deleted files have a sha of None
+        """
+        diff = git_runner.run_git('diff-tree', '-r', '-z', '--no-renames', from_ref, to_ref, cwd=self.repo_dir)
+        fields = diff.stdout.split('\0')
+        changes = []
+
+        # each change is a `:modes shas status` field followed by a path field
+        for (info, path) in zip(fields[0::2], fields[1::2]):
+            if not path.endswith('.elm'):
+                continue
+
+            (_, _, _, new_sha, status) = info.lstrip(':').split()
+            changes.append((path, None if status == 'D' else new_sha))
+
+        return changes
+
+    def version_counts_at(self, ref: str) -> Dict[ElmVersion, int]:
+        """ count how many files there are of each version in a commit """
+        return _count_versions(info.version for info in self.analyse_ref(ref).values())
+
+    def porting_breakdown_at(self, ref: str, pattern: str) -> Dict[str, Dict[str, int]]:
+        """ like get_017_porting_breakdown, but for any commit """
+        matcher = elm_files.pattern_regex(pattern)
+        blobs = {
+            path: sha for (path, sha) in self.object_store.ls_tree(ref).items()
+            if path.endswith('.elm')
+        }
+        all_files = [path for path in blobs if matcher.match(path)]
+
+        if len(all_files) == 1:
+            graph = ModuleGraph(
+                '',
+                list(blobs),
+                lambda path: self._cached_blob('imports', blobs[path], _buffer_imports)
+            )
+            all_files = graph.transitive_imports(all_files[0])
+
+        breakdown = {}
+
+        for path in all_files:
+            info = self._analyse_blob(path, blobs[path])
+
+            if info.version == ElmVersion.v_016:
+                breakdown[path] = info.hardness
+
+        return breakdown
 
+    def get_dependents(self, pattern: str) -> List[str]:
+        """ all the files that depend on the files matching a pattern """
+        dependents = []
+
+        for filename in self.get_matching_filenames(pattern):
+            dependents.extend(
+                dependent for dependent in self.module_graph.transitive_dependents(filename)
+                if dependent != filename and dependent not in dependents
+            )
+
+        return dependents
+
+    def get_elm_files(self) -> List[str]:
+        return glob.glob(f'{self.repo_dir}/**/*.elm', recursive=True)
+
+    @property
+    def number_of_017_files(self):
+        return self.version_counts()[ElmVersion.v_017]
+
+    @property
+    def number_of_016_files(self):
+        return self.version_counts()[ElmVersion.v_016]
+
+    def version_counts(self, pattern: str = '*') -> Dict[ElmVersion, int]:
+        """ count how many files matching a pattern there are of each version """
+        return _count_versions(info.version for info in self.analyse_pattern(pattern).values())
+
+    def get_files_for_017(self, pattern: str) -> List[str]:
         return [
-            filename for filename in all_files
-            if self.what_kinda_file(filename) == ElmVersion.v_017
+            info.filename for info in self.analyse_pattern(pattern).values()
+            if info.version == ElmVersion.v_017
         ]
 
     def get_matching_filenames(self, pattern: str) -> List[str]:
@@ -111,120 +529,92 @@ class ElmRepo(OurRepo):
         )
         return all_files
 
-    @contextmanager
-    def cached_lookups(self) -> None:
-        self.create_cache()
-        yield
-        self.end_cache()
+    def analyse_pattern(self, pattern: str = '*') -> Dict[str, ElmFileInfo]:
+        """ classify and score every file matching a pattern in one go """
+        return self.analyse_files(self.get_matching_filenames(pattern))
+
+    def analyse_files(self, filenames: List[str]) -> Dict[str, ElmFileInfo]:
+        """ classify and score a batch of files, spreading the reads over a
+            pool of threads in chunks. Only 0.16 files get a hardness breakdown
+        """
+        size = self.analysis_chunk_size
+        chunks = [filenames[i:i + size] for i in range(0, len(filenames), size)]
+
+        if len(chunks) < 2:
+            return {info.filename: info for info in self._analyse_chunk(filenames)}
+
+        analysed = {}
+
+        with ThreadPoolExecutor(max_workers=self.analysis_workers) as executor:
+            for infos in executor.map(self._analyse_chunk, chunks):
+                analysed.update((info.filename, info) for info in infos)
+
+        return analysed
 
-    def create_cache(self) -> None:
-        """ create a cache so they can be used to make some calcs faster """
-        self._caching_lookups = True
-        self._breakdown_cache = {}
-        self._import_cache = {}
+    def _analyse_chunk(self, filenames: List[str]) -> List[ElmFileInfo]:
+        infos = []
 
-    def end_cache(self) -> None:
-        """ removes a lock so caches are no longer used """
-        self._caching_lookups = False
+        for filename in filenames:
+            version = self.what_kinda_file(filename)
+
+            if version == ElmVersion.v_016:
+                hardness = self.how_hard_to_port(filename)
+            else:
+                hardness = {}
+
+            infos.append(ElmFileInfo(filename, version, hardness))
+
+        return infos
 
     def get_017_porting_breakdown(self, pattern: str) -> Dict[str, Dict[str, int]]:  # noqa: E501
+        """ the hardness of each 0.16 file matching a pattern. When just one file
+            matches, everything it imports is included too
+        """
         all_files = self.get_matching_filenames(pattern)
 
-        breakdown = {
-            filename: self.how_hard_to_port(filename) for filename in all_files
-            if self.what_kinda_file(filename) == ElmVersion.v_016
-        }
-
         if len(all_files) == 1:
-            imports = self.file_import_list(all_files[0])
-            for import_ in imports:
-                file_names = self.get_matching_filenames(import_)
-
-                if not any(name in breakdown for name in file_names):
-                    import_breakdown = self.get_017_porting_breakdown(import_)
-                    breakdown.update(import_breakdown)
+            all_files = self.module_graph.transitive_imports(all_files[0])
 
-        return breakdown
+        return {
+            filename: info.hardness for (filename, info) in self.analyse_files(all_files).items()
+            if info.version == ElmVersion.v_016
+        }
 
     def file_import_list(self, filename: str) -> List[str]:
         """ returns the list of modules imported by a file """
-
-        if self._caching_lookups:
-            if filename in self._import_cache:
-                return self._import_cache[filename]
-
-        import_lines = []
-        in_comment = False
-
-        with open(filename) as f:
-            for line in f:
-                if in_comment:
-                    if line.strip().endswith('-}'):
-                        in_comment = False
-                elif line.startswith('import '):
-                    just_the_module = 'import '.join(line.split('import ')[1:])
-                    import_lines.append(just_the_module)
-                elif line.strip().startswith('{-'):
-                    if line.strip().endswith('-}'):
-                        in_comment = False
-                    else:
-                        in_comment = True
-                elif not (line.startswith('module') or line.startswith(' ')):
-                    # we're past the imports
-                    break
-
-        if self._caching_lookups:
-            self._import_cache[filename] = import_lines
-
-        return import_lines
+        return self._cached('imports', filename, _read_imports)
 
     def how_hard_to_port(self, filename: str) -> Dict[str, int]:
         """ returns a breakdown of how hard a file is to port 0.16 -> 0.17 """
+        return self._cached('hardness', filename, elm_files.how_hard_to_port_file)
 
-        if self._caching_lookups:
-            if filename in self._breakdown_cache:
-                return self._breakdown_cache[filename]
+    def what_kinda_file(self, filename: str) -> ElmVersion:
+        """ go through the header of a file to try and find some identifiers
+            that tell us if it's 0.16 or 0.17
+        """
+        return self._cached('version', filename, _read_version)
 
-        breakdown = {}
 
-        with open(filename) as f:
-            text = f.read()
+def _read_imports(filename: str) -> List[str]:
+    return elm_files.imports_from_header(elm_files.read_header(filename))
 
-        if '\nport' in text or 'Signal' in text:
-            port_count = text.count('\nport')
-            signal_count = text.count('Signal')
-            breakdown['Ports and signals'] = (port_count + signal_count) * 3
 
-        if 'import Native' in text:
-            native_modules_count = text.count('import Native')
-            breakdown['Native modules imported'] = (native_modules_count * 2)
+def _read_version(filename: str) -> ElmVersion:
+    return elm_files.version_from_header(elm_files.read_header(filename))
 
-        if ' Html' in text:
-            html_count = text.count(' Html')
-            breakdown['Html stuff'] = html_count
 
-        if self._caching_lookups:
-            self._breakdown_cache[filename] = breakdown
+def _buffer_imports(buffer: bytes) -> List[str]:
+    return elm_files.imports_from_header(elm_files.buffer_header(buffer))
 
-        return breakdown
 
-    def what_kinda_file(self, filename: str) -> ElmVersion:
-        """ if a filename is known to be 0.16 or 0.17, return that const
-            otherwise, go through line by line to try and find some identifiers
-        """
-        if filename in self._known_files[ElmVersion.v_016]:
-            return ElmVersion.v_016
-
-        if filename in self._known_files[ElmVersion.v_017]:
-            return ElmVersion.v_017
-
-        with open(filename) as f:
-            for line in f:
-                if line.strip():
-                    if 'exposing' in line:
-                        self._known_files[ElmVersion.v_017].append(filename)
-                        return ElmVersion.v_017
-                    if 'where' in line:
-                        self._known_files[ElmVersion.v_016].append(filename)
-                        return ElmVersion.v_016
-        return ElmVersion.unknown
+def _buffer_version(buffer: bytes) -> ElmVersion:
+    return elm_files.version_from_header(elm_files.buffer_header(buffer))
+
+
+def _count_versions(versions) -> Dict[ElmVersion, int]:
+    counts = {version: 0 for version in ElmVersion}
+
+    for version in versions:
+        counts[version] += 1
+
+    return counts
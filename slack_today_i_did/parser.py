@@ -1,6 +1,10 @@
 from typing import Any, TypeVar, Callable, Dict, List, Tuple, NamedTuple, Union
+import asyncio
 import copy
 import functools
+import inspect
+
+import slack_today_i_did.text_tools as text_tools
 
 # tokenizer types
 Token = Tuple[int, str]
@@ -35,6 +39,28 @@ def is_metafunc(fn):
     return getattr(fn, 'is_metafunc', False)
 
 
+def worker_safe(fn):
+    """ mark a function that only reads state from disk, so it can be
+        evaluated in a worker process rather than by the bot itself
+    """
+    fn.is_worker_safe = True
+    return fn
+
+
+def is_worker_safe(fn):
+    return getattr(fn, 'is_worker_safe', False)
+
+
+def runs_in_worker(func_call: 'FuncCall', known_functions: FunctionMap) -> bool:
+    """ can the whole of `func_call`, args and all, be evaluated in a worker? """
+    if not is_worker_safe(known_functions[func_call.func_name]):
+        return False
+
+    return all(
+        runs_in_worker(arg, known_functions) for arg in func_call.args if isinstance(arg, FuncCall)
+    )
+
+
 def fill_in_the_gaps(message: str, tokens: List[Token]) -> List[TokenAndRest]:
     """
         take things that look like [(12, FOR)] turn into [(12, FOR, noah)]
@@ -85,11 +111,58 @@ def tokens_with_index(known_tokens: List[str], message: str) -> List[Token]:
     return sorted(build, key=lambda x: x[0])
 
 
-def tokenize(text: str, known_tokens: List[str]) -> List[TokenAndRest]:
-    """ Take text and known tokens
+def typo_distance(word: str) -> int:
+    """ how many typos we'll forgive in a word before we stop guessing """
+    if len(word) <= 2:
+        return 0
+    elif len(word) <= 5:
+        return 1
+
+    return 2
+
+
+def leading_word_candidates(text: str, known_tokens: List[str], fuzzy_index) -> List[str]:
+    """ if the first word isn't a known token, find the closest known tokens to it.
+        `fuzzy_index` is anything with a `search(word, max_distance)` like `text_tools.BKTree`
+    """
+    leading_word = text.split(' ')[0]
+
+    if leading_word == '' or leading_word in known_tokens:
+        return []
+
+    max_distance = typo_distance(leading_word)
+
+    # the index goes by Levenshtein distance, where swapping two letters is two changes
+    # rather than one, so look twice as far and then count the swaps as one
+    matches = sorted(
+        (distance, token) for (distance, token) in (
+            (text_tools.optimal_string_alignment(leading_word, token), token)
+            for (_, token) in fuzzy_index.search(leading_word, max_distance=max_distance * 2)
+        )
+        if distance <= max_distance
+    )
+
+    if len(matches) == 0:
+        return []
+
+    best_distance = matches[0][0]
+    return [token for (distance, token) in matches if distance == best_distance]
+
+
+def tokenize(text: str, known_tokens: List[str], fuzzy_index=None) -> List[TokenAndRest]:
+    """ Take text and known tokens.
+        Given a `fuzzy_index`, a mistyped first word is corrected when there's
+        only one known token it could have been
     """
 
     text = text.strip()
+
+    if fuzzy_index is not None:
+        candidates = leading_word_candidates(text, known_tokens, fuzzy_index)
+
+        if len(candidates) == 1:
+            text = candidates[0] + text[len(text.split(' ')[0]):]
+
     tokens = fill_in_the_gaps(text, tokens_with_index(known_tokens, text))
 
     return tokens
@@ -126,13 +199,44 @@ def parse(tokens: List[TokenAndRest], known_functions: FunctionMap) -> FuncCallB
         evaluator)
 
 
-def evaluate_func_call(
+@functools.lru_cache(maxsize=256)
+def signature(func: Callable) -> Tuple[Dict[str, type], type, int]:
+    """ the argument annotations, return type and number of positional args of `func`.
+        Keyed on the plain function rather than the bound method, so every bot
+        in the process shares them. Nothing should change what this returns
+    """
+    # TODO: simply copy.deepcopy and pop('return', None) after
+    # https://github.com/python/typing/issues/306 is resolved.
+    # `-> ChannelMessages` blows up if you try to copy.deepcopy the annotations.
+    annotations = dict(func.__annotations__)
+    return_type = annotations.pop('return', None)
+    annotations = copy.deepcopy(annotations)
+
+    num_keyword_args = len(func.__defaults__) if func.__defaults__ else 0
+
+    return (annotations, return_type, len(annotations) - num_keyword_args)
+
+
+def is_async(fn) -> bool:
+    """ does `fn` need awaiting? """
+    return inspect.iscoroutinefunction(fn)
+
+
+def needs_await(func_call: FuncCall, known_functions: FunctionMap) -> bool:
+    """ does anything in `func_call`, args and all, need awaiting? """
+    if is_async(known_functions[func_call.func_name]):
+        return True
+
+    return any(
+        needs_await(arg, known_functions) for arg in func_call.args if isinstance(arg, FuncCall)
+    )
+
+
+def call_args(
         known_functions: FunctionMap,
         func_call: FuncCall,
-        default_args: List[FuncArg] = []) -> FuncResult:
-    """ Evaluate `func_call` in the context of `known_functions`
-        after prepending `default_args` to `func_call`'s arguments
-    """
+        default_args: List[FuncArg]) -> Tuple[Callable, List[FuncArg]]:
+    """ the function `func_call` refers to, and what it'll be called with """
     action = known_functions[func_call.func_name]
 
     if is_metafunc(action):
@@ -140,25 +244,21 @@ def evaluate_func_call(
     else:
         args = default_args + func_call.args
 
-    args_result = evaluate_args(known_functions, args)
+    return (action, args)
+
 
+def argument_errors(action: Callable, args_result: ArgsResult) -> List[str]:
+    """ everything wrong with calling `action` with `args_result` """
     if len(args_result.errors) > 0:
-        return FuncResult(None, None, None, [], args_result.errors)
+        return args_result.errors
 
-    argument_errors = []
+    errors = []
 
-    # TODO: simply copy.deepcopy and pop('return', None) after
-    # https://github.com/python/typing/issues/306 is resolved.
-    # `-> ChannelMessages` blows up if you try to copy.deepcopy the annotations.
-    annotations = dict(action.__annotations__)
-    return_type = annotations.pop('return', None)
-    annotations = copy.deepcopy(annotations)
+    (annotations, return_type, num_positional_args) = signature(getattr(action, '__func__', action))
 
     # check arity mismatch
-    num_keyword_args = len(action.__defaults__) if action.__defaults__ else 0
-    num_positional_args = len(annotations) - num_keyword_args
     if num_positional_args > len(args_result.result):
-        argument_errors.append(
+        errors.append(
             mismatching_args_messages(
                 action,
                 annotations,
@@ -175,10 +275,28 @@ def evaluate_func_call(
     )
 
     if len(mismatching_types) > 0:
-        argument_errors.append(mismatching_types)
+        errors.append(mismatching_types)
+
+    return errors
 
-    if len(argument_errors) > 0:
-        return FuncResult(None, None, None, [], argument_errors)
+
+def evaluate_func_call(
+        known_functions: FunctionMap,
+        func_call: FuncCall,
+        default_args: List[FuncArg] = []) -> FuncResult:
+    """ Evaluate `func_call` in the context of `known_functions`
+        after prepending `default_args` to `func_call`'s arguments.
+        Coroutine functions aren't awaited, so their result is the coroutine;
+        use `evaluate_func_call_async` for those
+    """
+    (action, args) = call_args(known_functions, func_call, default_args)
+    args_result = evaluate_args(known_functions, args)
+    errors = argument_errors(action, args_result)
+
+    if len(errors) > 0:
+        return FuncResult(None, None, None, [], errors)
+
+    (_, return_type, _) = signature(getattr(action, '__func__', action))
 
     try:
         return FuncResult(action(*args_result.result), return_type, action, args_result.result, [])
@@ -187,6 +305,35 @@ def evaluate_func_call(
         return FuncResult(None, None, None, [], [error_message])
 
 
+async def evaluate_func_call_async(
+        known_functions: FunctionMap,
+        func_call: FuncCall,
+        default_args: List[FuncArg] = []) -> FuncResult:
+    """ Like `evaluate_func_call`, but awaits anything that needs it,
+        with args that are function calls evaluated concurrently
+    """
+    (action, args) = call_args(known_functions, func_call, default_args)
+    args_result = await evaluate_args_async(known_functions, args)
+    errors = argument_errors(action, args_result)
+
+    if len(errors) > 0:
+        return FuncResult(None, None, None, [], errors)
+
+    (_, return_type, _) = signature(getattr(action, '__func__', action))
+
+    try:
+        result = action(*args_result.result)
+
+        # plain functions can hand back something to await too, like `!!` does
+        if inspect.isawaitable(result):
+            result = await result
+
+        return FuncResult(result, return_type, action, args_result.result, [])
+    except Exception as e:
+        error_message = exception_error_messages([(func_call.func_name, e)])
+        return FuncResult(None, None, None, [], [error_message])
+
+
 def evaluate_args(
         known_functions: FunctionMap,
         args: List[FuncArg]) -> ArgsResult:
@@ -209,6 +356,24 @@ def evaluate_args(
     return ArgsResult(result, return_types, all_errors)
 
 
+async def evaluate_args_async(
+        known_functions: FunctionMap,
+        args: List[FuncArg]) -> ArgsResult:
+    async def evaluate_arg(arg: FuncArg) -> FuncResult:
+        if isinstance(arg, Constant):
+            return FuncResult(arg.value, arg.return_type, None, [], [])
+
+        return await evaluate_func_call_async(known_functions, arg)
+
+    func_results = await asyncio.gather(*(evaluate_arg(arg) for arg in args))
+
+    return ArgsResult(
+        [func_result.result for func_result in func_results],
+        [func_result.return_type for func_result in func_results],
+        [error for func_result in func_results for error in func_result.errors]
+    )
+
+
 def exception_error_messages(errors) -> str:
     message = f'I got the following errors:\n'
     message += '```\n'
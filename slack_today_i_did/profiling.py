@@ -0,0 +1,261 @@
+"""
+Profile a running bot for a while, without restarting it.
+
+A session runs one of three profilers until either a number of seconds have
+passed or a number of messages have been handled:
+
+    - `cpu` uses cProfile, which sees every call but slows things down
+    - `sample` looks at the main thread's stack every few milliseconds
+    - `memory` uses tracemalloc, and compares allocations to when it started
+
+The raw results are written to a file, and a short summary is made for chat.
+"""
+
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Callable, Dict, List, NamedTuple, Set, Tuple
+
+
+PROFILER_KINDS = ('cpu', 'sample', 'memory')
+
+CodeKey = Tuple[str, int, str]
+
+ProfileResult = NamedTuple('ProfileResult', [('path', str), ('summary', str)])
+
+
+def code_key(func: Callable) -> CodeKey:
+    """ the (filename, first line, name) of a function, the same way cProfile names it """
+    code = getattr(func, '__code__', None)
+
+    if code is None:
+        return None
+
+    return (code.co_filename, code.co_firstlineno, code.co_name)
+
+
+def describe(key: CodeKey) -> str:
+    """
+        >>> describe(('/bot/slack_today_i_did/parser.py', 12, 'tokenize'))
+        'parser.py:12(tokenize)'
+    """
+    (filename, line, name) = key
+    return f'{os.path.basename(filename)}:{line}({name})'
+
+
+class Sampler(object):
+    """ every `interval` seconds, note what functions are on a thread's stack """
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = 0
+        self.cumulative = Counter()
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+
+            if frame is not None:
+                self.take_sample(frame)
+
+    def take_sample(self, frame) -> None:
+        stack = []
+
+        while frame is not None:
+            code = frame.f_code
+            stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+            frame = frame.f_back
+
+        if len(stack) == 0:
+            return
+
+        self.samples += 1
+        self.cumulative.update(set(stack))
+        self.stacks[tuple(reversed(stack))] += 1
+
+    def dump(self, path: str) -> None:
+        """ write the stacks in the collapsed format flamegraph tools read """
+        with open(path, 'w') as f:
+            for (stack, count) in self.stacks.most_common():
+                f.write(';'.join(describe(key) for key in stack))
+                f.write(f' {count}\n')
+
+
+class ProfileSession(object):
+    def __init__(
+            self,
+            kind: str,
+            folder: str,
+            seconds: int = None,
+            messages: int = None,
+            highlight: Dict[CodeKey, str] = None,
+            highlight_files: Set[str] = None,
+            top: int = 10):
+        """ `highlight` maps code to a friendly name, and it and `highlight_files`
+            get their own section in the summary
+        """
+        if kind not in PROFILER_KINDS:
+            raise ValueError(f'No such profiler `{kind}`. Try one of {", ".join(PROFILER_KINDS)}')
+
+        self.kind = kind
+        self.folder = folder
+        self.seconds = seconds
+        self.messages = messages
+        self.highlight = highlight or {}
+        self.highlight_files = highlight_files or set()
+        self.top = top
+
+        self.messages_seen = 0
+        self.started_at = None
+        self._profiler = None
+        self._sampler = None
+        self._start_snapshot = None
+        self._started_tracemalloc = False
+
+    def start(self) -> None:
+        self.started_at = time.monotonic()
+
+        if self.kind == 'cpu':
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        elif self.kind == 'sample':
+            self._sampler = Sampler(threading.get_ident())
+            self._sampler.start()
+        else:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracemalloc = True
+
+            self._start_snapshot = tracemalloc.take_snapshot()
+
+    def message_seen(self) -> None:
+        self.messages_seen += 1
+
+    def is_done(self) -> bool:
+        if self.messages is not None and self.messages_seen >= self.messages:
+            return True
+
+        if self.seconds is not None and time.monotonic() - self.started_at >= self.seconds:
+            return True
+
+        return False
+
+    def stop(self) -> ProfileResult:
+        """ stop profiling, write the results to a file and summarise them """
+        os.makedirs(self.folder, exist_ok=True)
+        path = f'{self.folder}/{self.kind}-{time.strftime("%Y%m%d-%H%M%S")}'
+
+        if self.kind == 'cpu':
+            self._profiler.disable()
+            path += '.prof'
+            self._profiler.dump_stats(path)
+            summary = self._summarise_cpu()
+        elif self.kind == 'sample':
+            self._sampler.stop()
+            path += '.folded'
+            self._sampler.dump(path)
+            summary = self._summarise_samples()
+        else:
+            snapshot = tracemalloc.take_snapshot()
+
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+
+            path += '.snapshot'
+            snapshot.dump(path)
+            summary = self._summarise_memory(snapshot)
+
+        elapsed = time.monotonic() - self.started_at
+        header = f'`{self.kind}` profile over {elapsed:.1f}s and {self.messages_seen} messages, saved to `{path}`\n'
+
+        return ProfileResult(path, header + summary)
+
+    def _is_highlighted(self, key: CodeKey) -> bool:
+        return key in self.highlight or key[0] in self.highlight_files
+
+    def _name(self, key: CodeKey) -> str:
+        if key in self.highlight:
+            return f'{self.highlight[key]} ({describe(key)})'
+
+        return describe(key)
+
+    def _table(self, title: str, rows: List[Tuple[str, str]]) -> str:
+        if len(rows) == 0:
+            return f'{title}: nothing recorded\n'
+
+        lines = '\n'.join(f'{value:>12}  {name}' for (name, value) in rows)
+        return f'{title}:\n```\n{lines}\n```\n'
+
+    def _summarise_cpu(self) -> str:
+        stats = pstats.Stats(self._profiler).stats
+        by_cumulative = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)
+
+        def rows(items):
+            return [
+                (self._name(key), f'{cumulative * 1000:.1f}ms')
+                for (key, (_, _, _, cumulative, _)) in items[:self.top]
+            ]
+
+        highlighted = [item for item in by_cumulative if self._is_highlighted(item[0])]
+
+        return (
+            self._table('Top functions by cumulative time', rows(by_cumulative)) +
+            self._table('Bot commands and parser', rows(highlighted))
+        )
+
+    def _summarise_samples(self) -> str:
+        samples = max(self._sampler.samples, 1)
+        by_cumulative = self._sampler.cumulative.most_common()
+
+        def rows(items):
+            return [
+                (self._name(key), f'{count * 100 / samples:.1f}%')
+                for (key, count) in items[:self.top]
+            ]
+
+        highlighted = [item for item in by_cumulative if self._is_highlighted(item[0])]
+
+        return (
+            self._table(f'Top functions by share of {self._sampler.samples} samples', rows(by_cumulative)) +
+            self._table('Bot commands and parser', rows(highlighted))
+        )
+
+    def _summarise_memory(self, snapshot) -> str:
+        differences = snapshot.compare_to(self._start_snapshot, 'lineno')
+        differences = [difference for difference in differences if difference.size_diff > 0]
+
+        def rows(items):
+            return [
+                (
+                    f'{os.path.basename(difference.traceback[0].filename)}:{difference.traceback[0].lineno}',
+                    f'{difference.size_diff / 1024:+.1f}KiB'
+                )
+                for difference in items[:self.top]
+            ]
+
+        # allocations made directly by the parser or the bot's commands
+        files = self.highlight_files | set(filename for (filename, _, _) in self.highlight)
+        highlighted = [
+            difference for difference in differences
+            if difference.traceback[0].filename in files
+        ]
+
+        return (
+            self._table('Top allocation sites', rows(differences)) +
+            self._table('Allocations from the bot', rows(highlighted))
+        )
@@ -0,0 +1,103 @@
+"""
+Replay a recorded RTM log into a bot, without talking to Slack.
+
+The bot's Web API calls are answered by `StubWebApi` using the users from the
+log, and its websocket is swapped for `ReplayWebsocket`, which hands out the
+recorded frames either as fast as the bot can take them or spaced out like
+they originally arrived.
+"""
+
+import asyncio
+import time
+from collections import Counter
+from typing import Any, Dict, Iterator, NamedTuple
+
+from slack_today_i_did.rtm_log import LoggedFrame, read_frames, read_login
+
+
+ReplayResult = NamedTuple(
+    'ReplayResult',
+    [('frames', int), ('sent', int), ('elapsed', float), ('api_calls', Dict[str, int])])
+
+
+class ReplayFinished(Exception):
+    pass
+
+
+class StubWebApi(object):
+    """ answers the Web API calls the bot makes, using the users from a recorded login """
+    def __init__(self, login: Dict[str, Any], bot_name: str):
+        bot_id = login.get('self', {}).get('id', 'UREPLAYBOT')
+
+        self.members = [user for user in login.get('users', []) if user['id'] != bot_id]
+        self.members.append({'id': bot_id, 'name': bot_name})
+        self.calls = Counter()
+
+    def __call__(self, method: str, **kwargs) -> Dict[str, Any]:
+        self.calls[method] += 1
+
+        if method == 'users.list':
+            return {'ok': True, 'members': self.members}
+
+        if method == 'im.open':
+            return {'ok': True, 'channel': {'id': f'D{kwargs.get("user", "")}'}}
+
+        return {'ok': True}
+
+
+class ReplayWebsocket(object):
+    def __init__(self, frames: Iterator[LoggedFrame], speed: float = 0.0):
+        """ `speed` of 1.0 is real time, 2.0 twice as fast, and 0 is as fast as possible """
+        self.frames = iter(frames)
+        self.speed = speed
+        self.received = 0
+        self.sent = 0
+        self._first_frame_time = None
+        self._started = None
+
+    async def recv(self) -> str:
+        try:
+            logged = next(self.frames)
+        except StopIteration:
+            raise ReplayFinished()
+
+        if self.speed > 0:
+            if self._first_frame_time is None:
+                self._first_frame_time = logged.time
+                self._started = time.monotonic()
+
+            due = (logged.time - self._first_frame_time) / self.speed
+            delay = due - (time.monotonic() - self._started)
+
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        self.received += 1
+        return logged.frame
+
+    async def send(self, data: str) -> None:
+        self.sent += 1
+
+
+async def replay(bot, filename: str, speed: float = 0.0) -> ReplayResult:
+    """ run the bot's main loop over a recorded log until it runs out """
+    api = StubWebApi(read_login(filename), bot.name)
+    websocket = ReplayWebsocket(read_frames(filename), speed=speed)
+
+    bot.api_call = api
+    bot.websocket = websocket
+
+    started = time.perf_counter()
+
+    try:
+        await bot.run_loop(parser=bot.parse_messages, on_tick=bot.on_tick)
+    except ReplayFinished:
+        pass
+
+    # send whatever the last frame made the bot want to say
+    while len(bot.message_queue) > 0:
+        await websocket.send(bot.message_queue.pop(0))
+
+    elapsed = time.perf_counter() - started
+
+    return ReplayResult(websocket.received, websocket.sent, elapsed, dict(api.calls))
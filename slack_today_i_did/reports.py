@@ -3,6 +3,8 @@ from typing import Tuple, Dict, Any
 import time
 import datetime
 
+from slack_today_i_did.shared_files import write_json
+
 
 class Report(object):
     def __init__(
@@ -171,5 +173,4 @@ class Sessions(object):
 
     def save_to_file(self, filename: str) -> None:
         """ save people:sessions to a file """
-        with open(filename, 'w') as f:
-            json.dump({'sessions': self.sessions}, f)
+        write_json(filename, {'sessions': self.sessions})
@@ -1,28 +1,144 @@
 """
 A file for dealing with rollbar related things
+
+Items are cached for a while, keyed by both counter and id. Items that don't
+exist are cached too, so asking about a typo over and over doesn't go to
+Rollbar each time. Requests share one pool of connections and give up after
+`timeout` seconds.
 """
-import requests
+
+import asyncio
+from typing import Any, Dict, Hashable, List, Tuple
+
+from slack_today_i_did.bounded_cache import BoundedCache
+
+
+class RollbarError(Exception):
+    pass
 
 
 class Rollbar(object):
-    def __init__(self, token):
+    def __init__(
+            self,
+            token,
+            timeout: float = 10.0,
+            ttl: float = 60.0,
+            not_found_ttl: float = 300.0,
+            max_connections: int = 8,
+            cache: BoundedCache = None):
         self.token = token
         self.base_url = "https://api.rollbar.com"
+        self.timeout = timeout
+        self.ttl = ttl
+        self.not_found_ttl = not_found_ttl
+        self.max_connections = max_connections
+        self.cache = BoundedCache(max_size=1024) if cache is None else cache
+
+        self._session = None
+        self._pending = {}
+
+    @property
+    def session(self):
+        # requests is slow to import, so only pay for it once we use rollbar
+        if self._session is None:
+            import requests
+
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_maxsize=self.max_connections)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
 
-    def request(self, url):
+            self._session = session
+
+        return self._session
+
+    def request(self, url, params: Dict[str, Any] = None, headers: Dict[str, str] = None):
         actual_url = self.base_url + url + f"?access_token={self.token}"
-        return requests.get(actual_url)
+        return self.session.get(actual_url, params=params, headers=headers, timeout=self.timeout)
 
-    def get_item_by_id(self, id):
-        response = self.request(f'/api/1/item/{id}')
+    def _fetch_item(self, url: str) -> Dict[str, Any]:
+        """ an item, or None if Rollbar doesn't have it """
+        response = self.request(url)
+
+        if response.status_code == 404:
+            return None
 
         json = response.json()
 
-        return json
+        if response.status_code != 200 or json.get('err', 0) != 0:
+            raise RollbarError(f'Rollbar said {response.status_code}: {json.get("message", "")}')
+
+        return json['result']
+
+    def _cached_item(self, key: Hashable, url: str) -> Dict[str, Any]:
+        (found, item) = self.cache.lookup(key)
+
+        if found:
+            return item
+
+        item = self._fetch_item(url)
+
+        if item is None:
+            self.cache.put(key, None, ttl=self.not_found_ttl)
+            return None
+
+        self.cache.put(key, item, ttl=self.ttl)
+
+        # so looking it up the other way is free
+        if 'id' in item:
+            self.cache.put(('id', item['id']), item, ttl=self.ttl)
+        if 'counter' in item:
+            self.cache.put(('counter', item['counter']), item, ttl=self.ttl)
+
+        return item
+
+    def get_item_by_id(self, id):
+        return self._cached_item(('id', id), f'/api/1/item/{id}')
 
     def get_item_by_counter(self, counter):
-        response = self.request(f'/api/1/item_by_counter/{counter}')
+        return self._cached_item(('counter', counter), f'/api/1/item_by_counter/{counter}')
+
+    def get_occurrences(self, page: int = 1, etag: str = None) -> Tuple[List[Dict[str, Any]], str]:
+        """ a page of the most recent occurrences of every item, newest first,
+            and the page's etag. The occurrences are None if nothing has
+            changed since `etag`
+        """
+        headers = None if etag is None else {'If-None-Match': etag}
+        response = self.request('/api/1/instances', params={'page': page}, headers=headers)
+
+        if response.status_code == 304:
+            return (None, etag)
 
         json = response.json()
 
-        return json['result']
+        if response.status_code != 200 or json.get('err', 0) != 0:
+            raise RollbarError(f'Rollbar said {response.status_code}: {json.get("message", "")}')
+
+        return (json['result']['instances'], response.headers.get('ETag'))
+
+    async def get_item_by_counter_async(self, counter: int) -> Dict[str, Any]:
+        """ look an item up without blocking the loop. If someone's already
+            asking about the same counter, wait for their answer instead
+        """
+        if counter not in self._pending:
+            loop = asyncio.get_event_loop()
+            self._pending[counter] = loop.run_in_executor(None, self.get_item_by_counter, counter)
+
+        pending = self._pending[counter]
+
+        try:
+            return await asyncio.shield(pending)
+        finally:
+            if pending.done() and self._pending.get(counter) is pending:
+                del self._pending[counter]
+
+    async def get_items_by_counter(self, counters: List[int]) -> Dict[int, Any]:
+        """ look up several items at once. Items that couldn't be fetched
+            are the exception that stopped them
+        """
+        items = await asyncio.gather(
+            *(self.get_item_by_counter_async(counter) for counter in counters),
+            return_exceptions=True
+        )
+
+        return dict(zip(counters, items))
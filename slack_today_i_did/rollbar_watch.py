@@ -0,0 +1,149 @@
+"""
+Watch Rollbar for new occurrences, and sum them up for Slack.
+
+Each poll asks for the newest occurrences, stopping at the last one we saw, so
+a quiet Rollbar costs one request, which is a cheap 304 if nothing changed. A
+busy one costs at most `max_pages` requests. Occurrences of the same item are
+counted up over a window, and when the window is over, the channels watching
+get one digest for the whole of it, however many errors there were.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, NamedTuple
+
+from slack_today_i_did.rollbar import Rollbar
+
+
+Digest = NamedTuple(
+    'Digest',
+    [('item_id', int), ('counter', int), ('title', str), ('count', int), ('first_seen', int), ('last_seen', int)])
+
+
+class OccurrenceWatcher(object):
+    def __init__(
+            self,
+            rollbar: Rollbar,
+            window: float = 60.0,
+            max_pages: int = 5,
+            clock: Callable[[], float] = time.time):
+        self.rollbar = rollbar
+        self.window = window
+        self.max_pages = max_pages
+        self.clock = clock
+
+        self.channels = set()
+        self.last_id = None
+        self.etag = None
+        self.window_started = None
+        self.more_than_we_fetched = False
+
+        # item id: [count, first seen, last seen]
+        self._seen = OrderedDict()
+
+    def _new_occurrences(self) -> List[Dict[str, Any]]:
+        """ every occurrence newer than the last one we saw, newest first """
+        new = []
+        ids = set()
+
+        for page in range(1, self.max_pages + 1):
+            # only the first page changes when something new happens
+            (occurrences, etag) = self.rollbar.get_occurrences(page, etag=self.etag if page == 1 else None)
+
+            if occurrences is None:
+                return []
+
+            if page == 1:
+                self.etag = etag
+
+            fresh = [
+                occurrence for occurrence in occurrences
+                if (self.last_id is None or occurrence['id'] > self.last_id) and occurrence['id'] not in ids
+            ]
+
+            new.extend(fresh)
+            ids.update(occurrence['id'] for occurrence in fresh)
+
+            # the first poll only needs to know where we are
+            if self.last_id is None or len(occurrences) == 0 or len(fresh) < len(occurrences):
+                return new
+
+        # there are more, but we'd rather not spend the whole rate limit on them
+        self.more_than_we_fetched = True
+        return new
+
+    def poll(self) -> int:
+        """ fetch new occurrences and count them up. Blocks, so run it in a thread.
+            Returns how many there were
+        """
+        new = self._new_occurrences()
+
+        if len(new) == 0:
+            return 0
+
+        newest = max(occurrence['id'] for occurrence in new)
+
+        # don't report everything that happened before we started watching
+        if self.last_id is None:
+            self.last_id = newest
+            self.more_than_we_fetched = False
+            return 0
+
+        self.last_id = newest
+
+        if self.window_started is None:
+            self.window_started = self.clock()
+
+        for occurrence in new:
+            timestamp = occurrence.get('timestamp', 0)
+            seen = self._seen.setdefault(occurrence['item_id'], [0, timestamp, timestamp])
+
+            seen[0] += 1
+            seen[1] = min(seen[1], timestamp)
+            seen[2] = max(seen[2], timestamp)
+
+        return len(new)
+
+    @property
+    def is_due(self) -> bool:
+        return self.window_started is not None and self.clock() - self.window_started >= self.window
+
+    def take_digests(self) -> List[Digest]:
+        """ what happened over the window, busiest first, and start a new window.
+            Looks up items, so run it in a thread
+        """
+        digests = []
+
+        for (item_id, (count, first_seen, last_seen)) in self._seen.items():
+            try:
+                item = self.rollbar.get_item_by_id(item_id) or {}
+            except Exception:
+                item = {}
+
+            title = item.get('title', f'item {item_id}')
+            digests.append(Digest(item_id, item.get('counter'), title, count, first_seen, last_seen))
+
+        self._seen.clear()
+        self.window_started = None
+
+        return sorted(digests, key=lambda digest: digest.count, reverse=True)
+
+    def format_digests(self, digests: List[Digest], limit: int = 10) -> str:
+        total = sum(digest.count for digest in digests)
+        at_least = 'at least ' if self.more_than_we_fetched else ''
+
+        items = 'one item' if len(digests) == 1 else f'{len(digests)} items'
+
+        lines = [f'Rollbar saw {at_least}{total} errors from {items}:']
+
+        for digest in digests[:limit]:
+            name = f'#{digest.counter}' if digest.counter is not None else f'id {digest.item_id}'
+            times = 'once' if digest.count == 1 else f'{digest.count} times'
+            lines.append(f'- {name} {digest.title}: {times}')
+
+        if len(digests) > limit:
+            lines.append(f'...and {len(digests) - limit} more items')
+
+        self.more_than_we_fetched = False
+
+        return '\n'.join(lines)
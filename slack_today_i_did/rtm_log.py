@@ -0,0 +1,83 @@
+"""
+Record the raw frames that come in over the RTM websocket, so they can be replayed later.
+
+A log is gzipped JSON lines. The first line describes who we were logged in as
+and which users we knew about, and every line after is a frame along with the
+time it arrived:
+
+    {"t": 1490000000.0, "login": {"self": {...}, "users": [...]}}
+    {"t": 1490000001.5, "frame": "{\"type\": \"message\", ...}"}
+"""
+
+import gzip
+import json
+import time
+from typing import Any, Dict, Iterator, NamedTuple
+
+
+LoggedFrame = NamedTuple('LoggedFrame', [('time', float), ('frame', str)])
+
+
+class RtmRecorder(object):
+    def __init__(self, filename: str, flush_every: int = 50):
+        self.filename = filename
+        self.flush_every = flush_every
+        self._file = gzip.open(filename, 'at')
+        self._unflushed = 0
+
+    def _write(self, entry: Dict[str, Any]) -> None:
+        self._file.write(json.dumps(entry))
+        self._file.write('\n')
+        self._unflushed += 1
+
+        # flushing a gzip stream costs compression, so only do it every so often
+        if self._unflushed >= self.flush_every:
+            self.flush()
+
+    def record_login(self, login_data: Dict[str, Any]) -> None:
+        """ keep just enough of the `rtm.start` reply to pretend to be Slack later """
+        users = [
+            {'id': user['id'], 'name': user['name']}
+            for user in login_data.get('users', [])
+            if 'id' in user and 'name' in user
+        ]
+
+        self._write({'t': time.time(), 'login': {'self': login_data.get('self', {}), 'users': users}})
+
+    def record(self, frame: str) -> None:
+        self._write({'t': time.time(), 'frame': frame})
+
+    def flush(self) -> None:
+        self._file.flush()
+        self._unflushed = 0
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def _entries(filename: str) -> Iterator[Dict[str, Any]]:
+    with gzip.open(filename, 'rt') as f:
+        # the end of a log may be cut off if the bot died while writing it
+        try:
+            for line in f:
+                yield json.loads(line)
+        except (EOFError, ValueError):
+            return
+
+
+def read_login(filename: str) -> Dict[str, Any]:
+    """ the most recent login recorded in a log, or an empty one """
+    login = {'self': {}, 'users': []}
+
+    for entry in _entries(filename):
+        if 'login' in entry:
+            login = entry['login']
+
+    return login
+
+
+def read_frames(filename: str) -> Iterator[LoggedFrame]:
+    """ every frame in a log, in the order they arrived """
+    for entry in _entries(filename):
+        if 'frame' in entry:
+            yield LoggedFrame(entry['t'], entry['frame'])
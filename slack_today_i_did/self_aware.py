@@ -1,13 +1,27 @@
+import importlib
 import os
 import subprocess
 import sys
-import psutil
+import types
 import logging
+from typing import List, Sequence
 
+import slack_today_i_did.git_runner as git_runner
 
-def git_checkout(branch):
-    os.system('git pull')
-    os.system(f'git checkout {branch}')
+
+async def git_checkout_async(branch):
+    await git_runner.run_git_async('pull', check=False)
+    await git_runner.run_git_async('checkout', branch.strip())
+
+
+async def git_head_async() -> str:
+    result = await git_runner.run_git_async('rev-parse', 'HEAD')
+    return git_runner.first_sha(result.stdout)
+
+
+async def git_changed_files_async(old_sha: str, new_sha: str = 'HEAD') -> List[str]:
+    result = await git_runner.run_git_async('diff', '--name-only', old_sha, new_sha)
+    return result.stdout.splitlines()
 
 
 def git_current_version():
@@ -35,11 +49,80 @@ def ruby_version():
     return first_line
 
 
+# in the order they import each other
+HOT_RELOADABLE_MODULES = (
+    'slack_today_i_did.generic_bot',
+    'slack_today_i_did.extensions',
+    'slack_today_i_did.bot_file',
+)
+
+
+def reloadable_modules(bot, module_names: Sequence[str] = HOT_RELOADABLE_MODULES) -> List[str]:
+    """ the modules `hot_reload` reimports for a bot, in the order it does them """
+    bot_module = bot.__class__.__module__
+    module_names = list(module_names)
+
+    # a subclass like the repl bot has to be reloaded after the modules it builds on
+    if bot_module not in module_names and bot_module.startswith('slack_today_i_did.'):
+        module_names.append(bot_module)
+
+    return module_names
+
+
+def can_hot_reload(bot, changed_files: Sequence[str]) -> bool:
+    """ whether `hot_reload` picks up all of the code in `changed_files`.
+        Anything else, like the parser or `main.py`, needs a restart
+    """
+    reloadable = {f'{name.replace(".", "/")}.py' for name in reloadable_modules(bot)}
+
+    return all(
+        filename in reloadable for filename in changed_files
+        if filename.endswith('.py') and not filename.startswith('tests/')
+    )
+
+
+def hot_reload(bot, module_names: Sequence[str] = HOT_RELOADABLE_MODULES) -> List[str]:
+    """ reimport the bot's modules and move a running bot over to the new code,
+        keeping its connection and state. If anything fails to import, the bot
+        keeps running the code it already had
+    """
+    bot_module = bot.__class__.__module__
+    module_names = reloadable_modules(bot, module_names)
+
+    importlib.invalidate_caches()
+
+    for name in module_names:
+        if name in sys.modules:
+            importlib.reload(sys.modules[name])
+        else:
+            importlib.import_module(name)
+
+    new_class = getattr(sys.modules[bot_module], bot.__class__.__qualname__, None)
+
+    if new_class is None:
+        raise ImportError(f'{bot.__class__.__qualname__} is no longer in {bot_module}')
+
+    # forget methods swapped in by `load-ext`, the new class has newer ones
+    for (name, value) in list(vars(bot).items()):
+        if isinstance(value, types.MethodType) and hasattr(new_class, name):
+            delattr(bot, name)
+
+    bot.__class__ = new_class
+
+    command_history = getattr(bot, 'command_history', None)
+    if command_history is not None:
+        command_history.rebind_actions(bot)
+
+    return module_names
+
+
 def restart_program():
     """Restarts the current program, with file objects and descriptors
        cleanup
     """
 
+    import psutil
+
     try:
         p = psutil.Process(os.getpid())
         for handler in p.get_open_files() + p.connections():
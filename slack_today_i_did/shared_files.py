@@ -0,0 +1,36 @@
+"""
+State files that more than one process reads.
+
+Files are written to a temporary file and moved into place, so a reader never
+sees half of one, and readers can tell when a file has changed under them by
+comparing `file_version`s.
+"""
+
+import json
+import os
+import tempfile
+from typing import Any
+
+
+def write_json(filename: str, data: Any) -> None:
+    folder = os.path.dirname(os.path.abspath(filename))
+    (handle, temporary) = tempfile.mkstemp(dir=folder, prefix='.', suffix='.tmp')
+
+    try:
+        with os.fdopen(handle, 'w') as f:
+            json.dump(data, f)
+
+        os.replace(temporary, filename)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def file_version(filename: str) -> int:
+    """ changes whenever the file is replaced. None if it doesn't exist """
+    try:
+        stat = os.stat(filename)
+    except FileNotFoundError:
+        return None
+
+    return stat.st_mtime_ns ^ stat.st_ino
@@ -0,0 +1,129 @@
+"""
+Run the bot for many Slack workspaces in one process.
+
+Each workspace gets its own `TodayIDidBot`, with its own token and its own
+folder for state, but they all run as tasks on the same event loop and share:
+
+- one `requests.Session`, so Web API calls reuse connections
+- the loop's default thread pool, which the bots use for blocking work
+- the command metadata, which is cached per function rather than per bot
+  (see `parser.signature` and `text_tools.suggestion_index`)
+
+A workspace that loses its connection is restarted without bothering the others.
+Workspaces are listed in `priv.json`:
+
+    "workspaces": [
+        {"name": "elm", "token": "xoxb-...", "rollbar-token": "..."},
+        {"name": "other", "token": "xoxb-..."}
+    ]
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, NamedTuple
+
+from slack_today_i_did.bot_file import TodayIDidBot
+
+
+Workspace = NamedTuple('Workspace', [('name', str), ('token', str), ('rollbar_token', str)])
+
+
+def workspaces_from_config(data: Dict[str, Any]) -> List[Workspace]:
+    return [
+        Workspace(workspace['name'], workspace['token'], workspace.get('rollbar-token', None))
+        for workspace in data.get('workspaces', [])
+    ]
+
+
+def state_files(folder: str) -> Dict[str, str]:
+    """ where a bot keeps its state, as keyword args for `TodayIDidBot` """
+    return {
+        'reports_dir': os.path.join(folder, 'reports'),
+        'profiles_dir': os.path.join(folder, 'profiles'),
+        'known_names_file': os.path.join(folder, 'names.json'),
+        'notify_file': os.path.join(folder, 'notify.json'),
+        'session_file': os.path.join(folder, 'sessions.json'),
+        'command_history_file': os.path.join(folder, 'command_history.json'),
+    }
+
+
+class Supervisor(object):
+    def __init__(
+            self,
+            workspaces: List[Workspace],
+            state_root: str = 'workspaces',
+            elm_repo=None,
+            max_workers: int = 8,
+            restart_delay: float = 5.0,
+            max_restart_delay: float = 300.0,
+            api_base_url: str = None):
+        import requests
+
+        self.state_root = state_root
+        self.elm_repo = elm_repo
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self.api_base_url = api_base_url
+        self.restarts = {}
+
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.http_session = requests.Session()
+
+        # enough connections for every thread in the pool to make a request at once
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=max_workers)
+        self.http_session.mount('https://', adapter)
+        self.http_session.mount('http://', adapter)
+
+        self.bots = {workspace.name: self.make_bot(workspace) for workspace in workspaces}
+
+    def make_bot(self, workspace: Workspace) -> TodayIDidBot:
+        folder = os.path.join(self.state_root, workspace.name)
+        files = state_files(folder)
+
+        os.makedirs(files['reports_dir'], exist_ok=True)
+
+        return TodayIDidBot(
+            workspace.token,
+            rollbar_token=workspace.rollbar_token,
+            elm_repo=self.elm_repo,
+            api_base_url=self.api_base_url,
+            http_session=self.http_session,
+            **files
+        )
+
+    async def run(self) -> None:
+        """ run every bot until cancelled """
+        loop = asyncio.get_event_loop()
+        loop.set_default_executor(self.executor)
+
+        try:
+            await asyncio.gather(*(self.run_bot(name, bot) for (name, bot) in self.bots.items()))
+        finally:
+            self.http_session.close()
+
+    async def run_bot(self, name: str, bot: TodayIDidBot) -> None:
+        """ keep a bot connected, waiting longer between each failed attempt """
+        delay = self.restart_delay
+        self.restarts[name] = 0
+
+        while True:
+            started = time.monotonic()
+
+            try:
+                await bot.main_loop()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f'The bot for {name} stopped: {e}')
+
+            # a bot that ran for a good while before stopping gets a fresh start
+            if time.monotonic() - started > self.max_restart_delay:
+                delay = self.restart_delay
+
+            print(f'Restarting the bot for {name} in {delay:.0f}s')
+            await asyncio.sleep(delay)
+
+            delay = min(delay * 2, self.max_restart_delay)
+            self.restarts[name] += 1
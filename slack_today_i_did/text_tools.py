@@ -1,3 +1,7 @@
+import functools
+from typing import Callable, Iterable, List, Tuple
+
+
 def levenshtein(current_word: str, next_word: str) -> int:
     ''' Returns how similar a word is to the next word as a number
 
@@ -22,6 +26,82 @@ def levenshtein(current_word: str, next_word: str) -> int:
         4
     '''
 
+    return bounded_levenshtein(current_word, next_word)
+
+
+def bounded_levenshtein(current_word: str, next_word: str, max_distance: int = None) -> int:
+    ''' Levenshtein distance using Myers' bit-parallel algorithm, where each
+        column of the edit matrix is held as bits of an int.
+        If the distance is going to be more than `max_distance`, stop early
+        and return `max_distance + 1`
+
+        >>> bounded_levenshtein('kitten', 'sitting')
+        3
+        >>> bounded_levenshtein('kitten', 'sitting', max_distance=1)
+        2
+        >>> bounded_levenshtein('abc', 'abcdefgh', max_distance=2)
+        3
+    '''
+
+    if len(current_word) < len(next_word):
+        current_word, next_word = next_word, current_word
+
+    if max_distance is not None and len(current_word) - len(next_word) > max_distance:
+        return max_distance + 1
+
+    if next_word == '':
+        return len(current_word)
+
+    # the shorter word is the pattern, one bit per character
+    pattern_length = len(next_word)
+    mask = (1 << pattern_length) - 1
+    last_bit = 1 << (pattern_length - 1)
+
+    matches = {}
+    for (i, character) in enumerate(next_word):
+        matches[character] = matches.get(character, 0) | (1 << i)
+
+    positive = mask
+    negative = 0
+    score = pattern_length
+    remaining = len(current_word)
+
+    for character in current_word:
+        equal = matches.get(character, 0)
+        vertical = equal | negative
+        horizontal = (((equal & positive) + positive) ^ positive) | equal
+
+        horizontal_positive = negative | ~(horizontal | positive)
+        horizontal_negative = positive & horizontal
+
+        if horizontal_positive & last_bit:
+            score += 1
+        elif horizontal_negative & last_bit:
+            score -= 1
+
+        remaining -= 1
+
+        # each character left can only bring the score down by one
+        if max_distance is not None and score - remaining > max_distance:
+            return max_distance + 1
+
+        horizontal_positive = (horizontal_positive << 1) | 1
+        horizontal_negative = horizontal_negative << 1
+
+        positive = (horizontal_negative | ~(vertical | horizontal_positive)) & mask
+        negative = horizontal_positive & vertical & mask
+
+    return score
+
+
+def dynamic_levenshtein(current_word: str, next_word: str) -> int:
+    ''' The classic row by row dynamic programming Levenshtein distance.
+        Kept around as a reference for `bounded_levenshtein`
+
+        >>> dynamic_levenshtein('kitten', 'sitting')
+        3
+    '''
+
     if current_word == '':
         return len(next_word)
 
@@ -39,12 +119,45 @@ def levenshtein(current_word: str, next_word: str) -> int:
             substitutions = previous_row[j] + (current_character != next_character)
             current_row.append(min(insertions, deletions, substitutions))
 
-        previous_row = current_row[:]
+        previous_row = current_row
     return previous_row[-1]
 
 
-def token_based_levenshtein(current_words: str, next_words: str) -> int:
+def optimal_string_alignment(current_word: str, next_word: str) -> int:
+    ''' Like Levenshtein distance, but swapping two letters next to each other
+        is one change rather than two, which is how most typos go
+
+        >>> optimal_string_alignment('hepl', 'help')
+        1
+        >>> levenshtein('hepl', 'help')
+        2
+        >>> optimal_string_alignment('kitten', 'sitting')
+        3
+    '''
+
+    rows = [list(range(len(next_word) + 1))]
+
+    for (i, current_character) in enumerate(current_word, 1):
+        row = [i]
+
+        for (j, next_character) in enumerate(next_word, 1):
+            row.append(min(
+                rows[i - 1][j] + 1,
+                row[j - 1] + 1,
+                rows[i - 1][j - 1] + (current_character != next_character)
+            ))
+
+            if i > 1 and j > 1 and current_character == next_word[j - 2] and current_word[i - 2] == next_character:
+                row[j] = min(row[j], rows[i - 2][j - 2] + 1)
+
+        rows.append(row)
+
+    return rows[-1][-1]
+
+
+def token_based_levenshtein(current_words: str, next_words: str, max_distance: int = None) -> int:
     ''' Returns how similar a word is to the next word as a number
+        When `max_distance` is given, anything more than that is only known to be more than that
 
         no changes return 0
         >>> token_based_levenshtein('a', 'a')
@@ -78,6 +191,11 @@ def token_based_levenshtein(current_words: str, next_words: str) -> int:
 
         >>> token_based_levenshtein('c-b', 'a-be-c')
         3
+
+        >>> token_based_levenshtein('func-that-return', 'fun-that-return', max_distance=2)
+        1
+        >>> token_based_levenshtein('func-that-return', 'possible-funcs', max_distance=2) > 2
+        True
     '''
 
     words = current_words.split('-')
@@ -98,12 +216,89 @@ def token_based_levenshtein(current_words: str, next_words: str) -> int:
             insertions = previous_row[j + 1] + 1
             deletions = current_row[j] + 1
             substitutions = previous_row[j] + (current_word != coming_word)
-            word_diff = levenshtein(current_word, coming_word)
+            word_diff = bounded_levenshtein(current_word, coming_word, max_distance)
 
             if word_diff > 1:
                 current_row.append(word_diff)
             else:
                 current_row.append(min(insertions, deletions, substitutions))
 
-        previous_row = current_row[:]
+        previous_row = current_row
     return previous_row[-1]
+
+
+class BKTree(object):
+    ''' A Burkhard-Keller tree of words. Each child is filed under its distance
+        from its parent, so a search only needs to look at the children that
+        the triangle inequality says could be close enough
+
+        >>> tree = BKTree(['help', 'list', 'bother', 'house-party'])
+        >>> tree.closest('halp', max_distance=2)
+        ['help']
+        >>> tree.search('lost', max_distance=1)
+        [(1, 'list')]
+    '''
+
+    def __init__(self, words: Iterable[str] = (), distance: Callable[[str, str], int] = levenshtein):
+        self.distance = distance
+        self.root = None
+        self.size = 0
+
+        for word in words:
+            self.add(word)
+
+    def add(self, word: str) -> None:
+        if self.root is None:
+            self.root = (word, {})
+            self.size += 1
+            return
+
+        node = self.root
+
+        while True:
+            (node_word, children) = node
+            distance = self.distance(word, node_word)
+
+            if distance == 0:
+                return
+
+            if distance not in children:
+                children[distance] = (word, {})
+                self.size += 1
+                return
+
+            node = children[distance]
+
+    def search(self, word: str, max_distance: int) -> List[Tuple[int, str]]:
+        ''' every (distance, word) within `max_distance` of a word, closest first '''
+        if self.root is None or max_distance < 0:
+            return []
+
+        found = []
+        to_visit = [self.root]
+
+        while to_visit:
+            (node_word, children) = to_visit.pop()
+            distance = self.distance(word, node_word)
+
+            if distance <= max_distance:
+                found.append((distance, node_word))
+
+            for child_distance in range(distance - max_distance, distance + max_distance + 1):
+                if child_distance in children:
+                    to_visit.append(children[child_distance])
+
+        return sorted(found)
+
+    def closest(self, word: str, max_distance: int, limit: int = 5) -> List[str]:
+        ''' the `limit` closest words within `max_distance` of a word '''
+        return [found_word for (_, found_word) in self.search(word, max_distance)[:limit]]
+
+    def __len__(self) -> int:
+        return self.size
+
+
+@functools.lru_cache(maxsize=32)
+def suggestion_index(words: Tuple[str, ...]) -> BKTree:
+    ''' a BKTree for a set of words, built once and shared for as long as the words stay the same '''
+    return BKTree(words)
@@ -0,0 +1,137 @@
+"""
+Evaluate commands in a pool of worker processes, so that slow ones like
+`how-hard-to-port` can use more than one core.
+
+The bot keeps the websocket, tokenizes and parses as usual, and then sends the
+`FuncCall` from `parser.parse` to a worker instead of evaluating it itself.
+Only commands marked with `parser.worker_safe` are sent, and only when all of
+their args are too. Everything else, including anything that changes the bot's
+state, is still evaluated by the bot, so there is only ever one process writing
+the state files.
+
+Each worker has its own copy of the bot, reading the same state files as the
+main one. Before each command it drops any state whose file has changed since
+it was loaded (see `generic_bot.forget_stale_state`), so any worker can answer
+any command with up to date state. The workers share one lock for git, which
+is held from fetching a branch until it's checked out, so they don't trip over
+each other in the Elm repo.
+
+Workers import the bot's code when they start, so reloading the bot's code
+(`reload-funcs`, `reload` or `load-ext`) restarts them.
+"""
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+import slack_today_i_did.parser as parser
+from slack_today_i_did.generic_bot import ChannelMessage, forget_stale_state
+
+
+# the bot belonging to this worker process, and the loop its commands run on
+_bot = None
+_loop = None
+
+
+def _start_worker(bot_kwargs: Dict[str, Any], repo_args: Tuple[str, str, str, str], git_lock) -> None:
+    global _bot, _loop
+
+    from slack_today_i_did.bot_file import TodayIDidBot
+
+    if repo_args is not None:
+        from slack_today_i_did.our_repo import ElmRepo
+
+        repo = ElmRepo(*repo_args)
+        repo.git_lock = git_lock
+    else:
+        repo = None
+
+    _bot = TodayIDidBot('', elm_repo=repo, **bot_kwargs)
+    _loop = asyncio.new_event_loop()
+
+
+def _evaluate(func_call: parser.FuncCall, channel: str, sender: str) -> parser.FuncResult:
+    """ evaluate a command in this worker. The result leaves out the action and
+        return type, as the bot has its own
+    """
+    forget_stale_state(_bot)
+    _bot._last_sender = sender
+
+    evaluation = _loop.run_until_complete(
+        parser.evaluate_func_call_async(_bot.known_functions(), func_call, [parser.Constant(channel, str)])
+    )
+
+    if isinstance(evaluation.result, ChannelMessage):
+        result = [evaluation.result]
+    else:
+        result = evaluation.result
+
+    return parser.FuncResult(result, None, None, evaluation.args, evaluation.errors)
+
+
+def _process_id() -> int:
+    return os.getpid()
+
+
+def worker_kwargs(bot) -> Dict[str, Any]:
+    """ what a worker needs to make its own copy of `bot` """
+    return {
+        'rollbar_token': None if bot.rollbar is None else bot.rollbar.token,
+        'reports_dir': bot.reports_dir,
+        'profiles_dir': bot.profiles_dir,
+        'known_names_file': bot.known_names_file,
+        'notify_file': bot.notify_file,
+        'session_file': bot.session_file,
+        'command_history_file': bot.command_history_file,
+    }
+
+
+class WorkerPool(object):
+    def __init__(self, bot, processes: int = 2):
+        # workers start from scratch rather than forking the bot and its event loop
+        context = multiprocessing.get_context('spawn')
+        git_lock = context.Lock()
+
+        if bot.repo is None:
+            repo_args = None
+        else:
+            repo_args = (bot.repo.folder, bot.repo.token, bot.repo.org, bot.repo.repo)
+            bot.repo.git_lock = git_lock
+
+        self.processes = processes
+        self._context = context
+        self._initargs = (worker_kwargs(bot), repo_args, git_lock)
+        self.executor = self._start_executor()
+
+    def _start_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=self._context,
+            initializer=_start_worker,
+            initargs=self._initargs
+        )
+
+    def restart(self) -> None:
+        """ swap in new workers, which import the code as it is now. Commands
+            already running in the old ones are left to finish
+        """
+        old_executor = self.executor
+        self.executor = self._start_executor()
+        old_executor.shutdown(wait=False)
+
+    def can_run(self, func_call: parser.FuncCall, known_functions: parser.FunctionMap) -> bool:
+        return parser.runs_in_worker(func_call, known_functions)
+
+    async def evaluate(self, func_call: parser.FuncCall, channel: str, sender: str) -> parser.FuncResult:
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self.executor, _evaluate, func_call, channel, sender)
+
+    def warm_up(self) -> List[int]:
+        """ start every worker now, rather than on the first few commands """
+        futures = [self.executor.submit(_process_id) for _ in range(self.processes)]
+        return [future.result() for future in futures]
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,156 @@
+"""
+A pool of `git worktree` checkouts of a repo, one per branch.
+
+Every worktree shares the object store of the main clone, so checking out
+another branch doesn't download anything twice. Only the most recently used
+branches are kept around, and each branch has its own lock, so different
+branches can be looked at in parallel without racing on one working tree.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable
+
+import slack_today_i_did.git_runner as git_runner
+
+
+def branch_slug(branch_name: str) -> str:
+    """ make a branch name safe to use as a folder name
+
+        >>> branch_slug('feature/cool-stuff')
+        'feature__cool-stuff'
+    """
+    return branch_name.strip().replace('/', '__')
+
+
+class WorktreePool(object):
+    def __init__(self, repo, make_view: Callable[[str], object], size: int = 4):
+        """ `repo` is the main clone, `make_view` turns a folder into a repo
+            object rooted at a worktree inside that folder
+        """
+        self.repo = repo
+        self.make_view = make_view
+        self.size = size
+        self._views = OrderedDict()
+        self._locks = {}
+        self._pool_lock = threading.Lock()
+        self._pruned = False
+
+    @property
+    def folder(self) -> str:
+        return f'{self.repo.folder}/worktrees'
+
+    def folder_for(self, branch_name: str) -> str:
+        return f'{self.folder}/{branch_slug(branch_name)}'
+
+    def _lock_for(self, branch_name: str) -> threading.Lock:
+        """ the lock for a branch. Call `_done_with` once finished with it """
+        with self._pool_lock:
+            if branch_name not in self._locks:
+                self._locks[branch_name] = [threading.Lock(), 0]
+
+            entry = self._locks[branch_name]
+            entry[1] += 1
+
+            return entry[0]
+
+    def _done_with(self, branch_name: str) -> None:
+        with self._pool_lock:
+            entry = self._locks[branch_name]
+            entry[1] -= 1
+
+            # a branch without a worktree doesn't need its lock any more
+            if entry[1] == 0 and branch_name not in self._views:
+                del self._locks[branch_name]
+
+    @contextmanager
+    def branch(self, branch_name: str):
+        """ check out a branch in its own worktree, and hold on to it while it's in use
+
+            with pool.branch('master') as repo:
+                repo.version_counts()
+        """
+        branch_name = branch_name.strip()
+        lock = self._lock_for(branch_name)
+
+        try:
+            with lock:
+                view = self._checkout(branch_name)
+                yield view
+        finally:
+            self._done_with(branch_name)
+            self._evict()
+
+    def _checkout(self, branch_name: str):
+        self.repo.ensure_cloned()
+
+        if not self._pruned:
+            # forget about worktrees whose folders have gone away
+            git_runner.run_git('worktree', 'prune', cwd=self.repo.repo_dir)
+            self._pruned = True
+
+        self.repo.fetch(branch_name)
+
+        with self._pool_lock:
+            view = self._views.get(branch_name)
+
+        if view is None:
+            view = self.make_view(self.folder_for(branch_name))
+
+        ref = f'origin/{branch_name}'
+
+        if os.path.exists(f'{view.repo_dir}/.git'):
+            git_runner.run_git('checkout', '-q', '--detach', ref, cwd=view.repo_dir)
+        else:
+            os.makedirs(self.folder_for(branch_name), exist_ok=True)
+
+            with self.repo.git_lock:
+                git_runner.run_git('worktree', 'add', '--detach', view.repo_dir, ref, cwd=self.repo.repo_dir)
+
+        view.on_checkout()
+
+        with self._pool_lock:
+            self._views[branch_name] = view
+            self._views.move_to_end(branch_name)
+
+        return view
+
+    def _evict(self) -> None:
+        """ remove the least recently used worktrees that aren't being used """
+        with self._pool_lock:
+            excess = len(self._views) - self.size
+            candidates = list(self._views)
+
+        for branch_name in candidates:
+            if excess <= 0:
+                return
+
+            with self._pool_lock:
+                entry = self._locks.get(branch_name)
+
+                # someone is using it or waiting for it, so leave it be
+                if branch_name not in self._views or (entry is not None and entry[1] > 0):
+                    continue
+
+                # hold the branch's lock while it goes, so no one checks it out halfway through
+                entry = self._locks.setdefault(branch_name, [threading.Lock(), 0])
+                entry[1] += 1
+                entry[0].acquire()
+                view = self._views.pop(branch_name)
+
+            try:
+                with self.repo.git_lock:
+                    git_runner.run_git(
+                        'worktree', 'remove', '--force', view.repo_dir, cwd=self.repo.repo_dir, check=False
+                    )
+                excess -= 1
+            finally:
+                entry[0].release()
+                self._done_with(branch_name)
+
+    @property
+    def branches(self):
+        """ the branches with a worktree, least recently used first """
+        return list(self._views)
@@ -1,7 +1,13 @@
+import asyncio
 import contextlib
+import json
+import subprocess
 
 import pytest
 
+# looked up through the module, as the hot reload tests reload it
+import slack_today_i_did.bot_file as bot_file
+
 
 @pytest.fixture
 def message_context(mocker):
@@ -32,3 +38,129 @@ def message_context(mocker):
         mocker.stopall()
 
     return wrapper
+
+
+class RecordingWebsocket(object):
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, data):
+        self.sent.append(json.loads(data))
+
+
+@pytest.fixture
+def recording_websocket():
+    '''A stand in for the bot's websocket, that keeps everything
+    sent to it in `sent`.
+
+        bot.websocket = recording_websocket
+    '''
+    return RecordingWebsocket()
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    '''A clock to hand to anything that takes one, which only
+    moves when you set `now`.
+
+        cache = BoundedCache(clock=clock)
+        clock.now = 61
+    '''
+    return FakeClock()
+
+
+class LocalRemote(object):
+    """ a git repo in a folder, standing in for github """
+    GIT = ['git', '-c', 'user.name=test', '-c', 'user.email=test@test']
+
+    def __init__(self, folder):
+        self.folder = folder
+
+    def git(self, *args):
+        return subprocess.check_output(self.GIT + list(args), cwd=self.folder).decode()
+
+    def write(self, path, text):
+        with open(f'{self.folder}/{path}', 'w') as f:
+            f.write(text)
+
+    def commit(self, message):
+        self.git('add', '-A')
+        self.git('commit', '-q', '-m', message)
+        return self.git('rev-parse', 'HEAD').strip()
+
+
+@pytest.fixture
+def remote(tmpdir):
+    '''A local git repo for repos to clone from instead of github,
+    starting with one commit on master.
+
+        remote.write('Old.elm', 'module Old where\n')
+        remote.commit('second')
+    '''
+    remote = LocalRemote(str(tmpdir.mkdir('remote')))
+    remote.git('init', '-q', '-b', 'master')
+    remote.write('Main.elm', 'module Main exposing (..)\n')
+    remote.commit('first')
+
+    return remote
+
+
+@pytest.fixture
+def make_local_repo(tmpdir, remote):
+    '''Makes a repo of the given class that clones from `remote`,
+    keeping its clone in `tmpdir`.
+
+        repo = make_local_repo(ElmRepo, 'elm-things')
+    '''
+    def wrapper(repo_class, name):
+        local_class = type(f'Local{repo_class.__name__}', (repo_class,), {'url': f'file://{remote.folder}'})
+        return local_class(str(tmpdir.join('repos')), '', 'org', name)
+
+    return wrapper
+
+
+@pytest.fixture
+def make_bot(tmpdir):
+    '''Makes a `TodayIDidBot` that keeps all of its state in `tmpdir`.
+    Keyword args are passed on to the bot.
+
+        bot = make_bot(rollbar_token='')
+    '''
+    def wrapper(**kwargs):
+        files = {
+            'reports_dir': str(tmpdir),
+            'known_names_file': str(tmpdir.join('names.json')),
+            'notify_file': str(tmpdir.join('notify.json')),
+            'session_file': str(tmpdir.join('sessions.json')),
+            'command_history_file': str(tmpdir.join('command_history.json')),
+        }
+
+        return bot_file.TodayIDidBot('', **{**files, **kwargs})
+
+    return wrapper
+
+
+@pytest.fixture
+def run():
+    '''Runs a coroutine to the end on a new event loop, giving up
+    after `timeout` seconds.
+
+        result = run(bot.main_loop(), timeout=30)
+    '''
+    def wrapper(coroutine, timeout=10):
+        loop = asyncio.new_event_loop()
+
+        try:
+            return loop.run_until_complete(asyncio.wait_for(coroutine, timeout))
+        finally:
+            loop.close()
+
+    return wrapper
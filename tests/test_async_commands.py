@@ -0,0 +1,150 @@
+import asyncio
+import json
+import time
+from unittest import mock
+
+import pytest
+
+import slack_today_i_did.parser as parser
+from slack_today_i_did.generic_bot import ChannelMessage, ChannelMessages
+
+
+@pytest.fixture
+def bot(make_bot):
+    bot = make_bot(rollbar_token='')
+    bot._user_id = 'UBOT'
+    bot.rollbar.get_item_by_counter = mock.Mock(return_value={'title': 'it broke'})
+    return bot
+
+
+def message(text):
+    return {'type': 'message', 'channel': 'C1', 'user': 'U1', 'text': text}
+
+
+async def slow_word(text: str) -> str:
+    await asyncio.sleep(0.2)
+    return text
+
+
+async def shout(channel: str, first: str, second: str) -> ChannelMessages:
+    return ChannelMessage(channel, f'{first} {second}'.upper())
+
+
+def test_coroutine_functions_are_awaited_with_args_evaluated_together(run):
+    known_functions = {'shout': shout, 'word': slow_word}
+    func_call = parser.FuncCall(
+        'shout',
+        [parser.FuncCall('word', [parser.Constant('hello', str)], str),
+         parser.FuncCall('word', [parser.Constant('there', str)], str)],
+        ChannelMessages
+    )
+
+    started = time.perf_counter()
+    evaluation = run(parser.evaluate_func_call_async(known_functions, func_call, [parser.Constant('C1', str)]))
+
+    assert evaluation.errors == []
+    assert evaluation.result == ChannelMessage('C1', 'HELLO THERE')
+    assert time.perf_counter() - started < 0.35
+    assert parser.needs_await(func_call, known_functions)
+
+
+def test_coroutine_functions_still_have_their_args_checked(run):
+    func_call = parser.FuncCall('shout', [parser.Constant(5, int)], ChannelMessages)
+
+    evaluation = run(parser.evaluate_func_call_async({'shout': shout}, func_call, [parser.Constant('C1', str)]))
+
+    assert evaluation.result is None
+    assert 'Need some more arguments' in evaluation.errors[0]
+
+
+def test_async_commands_reply_without_holding_up_the_bot(run, bot, recording_websocket):
+    bot.websocket = recording_websocket
+
+    async def ask():
+        bot.parse_message(message('<@UBOT> rollbar-item title NUM 5'))
+
+        assert bot.message_queue == []
+
+        while len(bot.websocket.sent) == 0:
+            await asyncio.sleep(0.01)
+
+    run(ask())
+
+    assert bot.websocket.sent == [{'type': 'message', 'channel': 'C1', 'text': 'it broke'}]
+    bot.rollbar.get_item_by_counter.assert_called_once_with(5)
+
+
+def test_async_commands_finish_straight_away_outside_the_loop(bot):
+
+    bot.parse_message(message('<@UBOT> rollbar-item title NUM 5'))
+    bot.parse_message(message('<@UBOT> !!'))
+
+    texts = [json.loads(message)['text'] for message in bot.message_queue]
+
+    assert texts == ['it broke', 'it broke']
+    assert bot.command_history.last_command('C1')['action'] == bot.rollbar_item
+
+
+def test_help_knows_about_async_commands(bot):
+
+    message = bot.help('C1', [parser.Constant('rollbar-item', str)])
+
+    assert 'takes a counter' in message.text
+    assert '- counter : ' in message.text
+    assert 'rollbar-item' in bot.functions_that_return('C1', str(ChannelMessages)).text
+
+
+def test_rollbar_items_looks_up_every_counter(bot):
+    items = {5: {'title': 'oh no'}, 6: None}
+    bot.rollbar.get_item_by_counter = mock.Mock(side_effect=items.get)
+
+    bot.parse_message(message('<@UBOT> rollbar-items title FOR 5,6'))
+    bot.parse_message(message('<@UBOT> rollbar-items title FOR 5,six'))
+
+    texts = [json.loads(message)['text'] for message in bot.message_queue]
+
+    assert texts == ['#5: oh no\n#6: Rollbar doesn\'t have it', 'These aren\'t counters: six']
+
+
+def test_rollbar_item_projects_paths(bot):
+    item = {'last_occurrence': {'body': {'trace': {'frames': [{'filename': 'a.py'}]}}}}
+    bot.rollbar.get_item_by_counter = mock.Mock(return_value=item)
+
+    bot.parse_message(message('<@UBOT> rollbar-item last_occurrence.body.trace.frames[0].filename NUM 5'))
+    bot.parse_message(message('<@UBOT> rollbar-item last_occurrence.body.trace.frames[1] NUM 5'))
+
+    texts = [json.loads(message)['text'] for message in bot.message_queue]
+
+    assert texts == [
+        'a.py',
+        'Could not find the field last_occurrence.body.trace.frames[1]: '
+        'last_occurrence.body.trace.frames doesn\'t have a [1]'
+    ]
+
+
+def test_rollbar_item_uploads_what_wont_fit(bot):
+    item = {'frames': [{'filename': f'{i}.py'} for i in range(1000)]}
+    bot.rollbar.get_item_by_counter = mock.Mock(return_value=item)
+    bot.upload_snippet = mock.Mock(return_value=True)
+
+    bot.parse_message(message('<@UBOT> rollbar-item all NUM 5'))
+
+    (channel, content, filename, title) = bot.upload_snippet.call_args[0]
+    text = json.loads(bot.message_queue[0])['text']
+
+    assert (channel, filename, title) == ('C1', 'rollbar-5.json', 'Rollbar item #5 all')
+    assert json.loads(content) == item
+    assert len(text) < 1000
+    assert text.endswith('the rest is in the snippet')
+
+
+def test_elm_commands_get_the_repo_ready_without_a_thread(bot):
+    bot.repo = mock.Mock(get_ready_async=mock.AsyncMock(), get_files_for_017=mock.Mock(return_value=['Main.elm']))
+
+    bot.parse_message(message('<@UBOT> find-017-matches Main'))
+
+    texts = [json.loads(message)['text'] for message in bot.message_queue]
+
+    assert texts == ['We have found the following filenames:\nMain.elm']
+    bot.repo.get_ready_async.assert_awaited_once_with()
+    bot.repo.get_ready.assert_not_called()
@@ -0,0 +1,44 @@
+from slack_today_i_did.bounded_cache import BoundedCache
+
+
+def test_get_or_compute_only_computes_once():
+    cache = BoundedCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return 'value'
+
+    assert cache.get_or_compute('key', compute) == 'value'
+    assert cache.get_or_compute('key', compute) == 'value'
+    assert len(calls) == 1
+    assert cache.hits == 1
+    assert cache.misses == 1
+    assert cache.hit_rate == 0.5
+
+
+def test_least_recently_used_is_evicted():
+    cache = BoundedCache(max_size=2)
+
+    cache.get_or_compute('a', lambda: 1)
+    cache.get_or_compute('b', lambda: 2)
+    cache.get_or_compute('a', lambda: 1)
+    cache.get_or_compute('c', lambda: 3)
+
+    assert len(cache) == 2
+    assert cache.get_or_compute('a', lambda: 'recomputed') == 1
+    assert cache.get_or_compute('b', lambda: 'recomputed') == 'recomputed'
+
+
+def test_entries_expire_after_their_ttl():
+    now = [0.0]
+    cache = BoundedCache(clock=lambda: now[0])
+
+    cache.put('a', 1, ttl=10)
+    cache.put('b', 2)
+
+    now[0] = 11
+
+    assert cache.lookup('a') == (False, None)
+    assert cache.lookup('b') == (True, 2)
+    assert len(cache) == 1
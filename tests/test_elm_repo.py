@@ -0,0 +1,143 @@
+import subprocess
+
+import pytest
+
+from slack_today_i_did.our_repo import ElmRepo, ElmVersion
+
+MOCK_REPO = 'elm-things'
+
+ELM_016_FILE = '''module Main (..) where
+
+import Html exposing (div)
+import Native.Thing
+import Signal
+
+
+port outbound : Signal String
+port outbound =
+    Signal.constant ""
+'''
+
+ELM_017_FILE = '''module Helper exposing (..)
+
+import Html exposing (div)
+
+
+helper = div [] []
+'''
+
+
+@pytest.fixture
+def repo(tmpdir):
+    src = tmpdir.mkdir(MOCK_REPO).mkdir('src')
+    src.join('Main.elm').write(ELM_016_FILE)
+    src.join('Helper.elm').write(ELM_017_FILE)
+    src.mkdir('Nested').join('Deep.elm').write(ELM_017_FILE.replace('Helper', 'Nested.Deep'))
+
+    return ElmRepo(str(tmpdir), '', '', MOCK_REPO)
+
+
+def test_version_counts(repo):
+    counts = repo.version_counts()
+
+    assert counts[ElmVersion.v_016] == 1
+    assert counts[ElmVersion.v_017] == 2
+    assert counts[ElmVersion.unknown] == 0
+
+
+def test_analyse_pattern_only_scores_016_files(repo):
+    analysed = repo.analyse_pattern()
+    infos = {info.filename.split('/')[-1]: info for info in analysed.values()}
+
+    assert infos['Main.elm'].version == ElmVersion.v_016
+    assert infos['Main.elm'].hardness['Ports and signals'] == (2 + 3) * 3
+    assert infos['Main.elm'].hardness['Native modules imported'] == 2
+    assert infos['Helper.elm'].hardness == {}
+
+
+def test_analyse_files_in_chunks(repo):
+    repo.analysis_chunk_size = 1
+    analysed = repo.analyse_pattern()
+
+    assert len(analysed) == 3
+    assert analysed == repo.analyse_files(sorted(analysed))
+
+
+def test_get_files_for_017(repo):
+    files = repo.get_files_for_017('Nested.Deep')
+
+    assert len(files) == 1
+    assert files[0].endswith('src/Nested/Deep.elm')
+
+
+def test_file_import_list_reads_past_blank_lines(repo):
+    [main] = repo.get_matching_filenames('Main')
+
+    assert repo.file_import_list(main) == ['Html exposing (div)', 'Native.Thing', 'Signal']
+
+
+def test_empty_file_is_unknown_and_easy(repo, tmpdir):
+    empty = tmpdir.join(MOCK_REPO, 'src', 'Empty.elm')
+    empty.write('')
+
+    assert repo.what_kinda_file(str(empty)) == ElmVersion.unknown
+    assert repo.how_hard_to_port(str(empty)) == {}
+
+
+def test_porting_breakdown_follows_imports(repo, tmpdir):
+    tmpdir.join(MOCK_REPO, 'src', 'Helper.elm').write(ELM_016_FILE.replace('Main', 'Helper'))
+    tmpdir.join(MOCK_REPO, 'src', 'Main.elm').write(ELM_016_FILE.replace('import Signal', 'import Helper'))
+
+    breakdown = repo.get_017_porting_breakdown('Main')
+
+    assert sorted(filename.split('/')[-1] for filename in breakdown) == ['Helper.elm', 'Main.elm']
+
+
+def test_get_dependents(repo, tmpdir):
+    tmpdir.join(MOCK_REPO, 'src', 'Main.elm').write(ELM_016_FILE.replace('import Signal', 'import Nested.Deep'))
+    tmpdir.join(MOCK_REPO, 'src', 'Helper.elm').write(ELM_017_FILE.replace('import Html', 'import Main'))
+
+    dependents = repo.get_dependents('Nested.Deep')
+
+    assert sorted(filename.split('/')[-1] for filename in dependents) == ['Helper.elm', 'Main.elm']
+
+
+def test_repeated_lookups_hit_the_cache(repo):
+    repo.version_counts()
+    misses = repo.cache.misses
+
+    repo.version_counts()
+
+    assert repo.cache.misses == misses
+    assert repo.cache.hits > 0
+
+
+def test_cache_survives_moving_head(repo, tmpdir):
+    repo_dir = str(tmpdir.join(MOCK_REPO))
+    git = ['git', '-c', 'user.name=test', '-c', 'user.email=test@test']
+    subprocess.check_call(git + ['init', '-q'], cwd=repo_dir)
+    subprocess.check_call(git + ['add', '.'], cwd=repo_dir)
+    subprocess.check_call(git + ['commit', '-q', '-m', 'first'], cwd=repo_dir)
+
+    repo.on_checkout()
+    repo.version_counts()
+    misses = repo.cache.misses
+
+    tmpdir.join(MOCK_REPO, 'src', 'Helper.elm').write(ELM_016_FILE.replace('Main', 'Helper'))
+    subprocess.check_call(git + ['commit', '-q', '-am', 'second'], cwd=repo_dir)
+    repo.on_checkout()
+
+    counts = repo.version_counts()
+
+    assert counts[ElmVersion.v_016] == 2
+    # only the changed file needed its version and hardness looking at again
+    assert repo.cache.misses == misses + 2
+
+
+def test_content_keys_are_looked_up_once_across_threads(repo, mocker):
+    repo.analysis_chunk_size = 1
+    blob_shas = mocker.patch.object(repo, '_blob_shas', wraps=repo._blob_shas)
+
+    repo.version_counts()
+
+    assert blob_shas.call_count == 1
@@ -0,0 +1,78 @@
+import asyncio
+import queue
+
+import requests
+
+from slack_today_i_did.fake_slack import FakeSlack
+
+
+def test_web_api():
+    with FakeSlack(users=['dave']) as slack:
+        login = requests.post(f'{slack.api_base_url}/rtm.start', data={'token': ''}).json()
+        members = requests.post(f'{slack.api_base_url}/users.list', data={'token': ''}).json()['members']
+        chat = requests.post(f'{slack.api_base_url}/im.open', data={'token': '', 'user': 'U00000'}).json()
+
+    assert login['url'] == slack.ws_url
+    assert {'id': 'U00000', 'name': 'dave'} in members
+    assert chat['channel']['id'] == 'DU00000'
+    assert slack.api_calls == ['rtm.start', 'users.list', 'im.open']
+
+
+def test_bot_replies_through_the_fake(make_bot, run):
+    replies = queue.Queue()
+
+    with FakeSlack(users=['dave']) as slack:
+        slack.listeners.append(replies.put)
+        bot = make_bot(api_base_url=slack.api_base_url)
+
+        async def drive():
+            bot_task = asyncio.ensure_future(bot.main_loop())
+
+            try:
+                await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(slack.wait_for_bot(), slack.loop))
+                await asyncio.wrap_future(
+                    asyncio.run_coroutine_threadsafe(slack.post('C1', 'dave', f'<@{slack.bot_id}> list'), slack.loop)
+                )
+
+                while replies.empty():
+                    await asyncio.sleep(0.01)
+            finally:
+                bot_task.cancel()
+
+                try:
+                    await bot_task
+                except asyncio.CancelledError:
+                    pass
+
+        run(drive())
+
+    reply = replies.get()
+
+    assert reply['channel'] == 'C1'
+    assert 'Main functions' in reply['text']
+
+
+def test_startup_warms_up_while_connecting(make_bot, run):
+    with FakeSlack(users=['dave']) as slack:
+        bot = make_bot(api_base_url=slack.api_base_url)
+
+        async def connect():
+            async with bot:
+                await bot.warm_up
+
+                bot.send_message('dave', 'hello')
+                bot.send_message('dave', 'hello again')
+
+                return bot.user_id
+
+        user_id = run(connect())
+
+    phases = [name for (name, _, _) in bot.startup.phases]
+
+    assert user_id == slack.bot_id
+    assert bot.known_users['dave'] == slack.user_id('dave')
+    assert 'state warm up' in phases
+    assert 'directory warm up' in phases
+    assert 'notify' in vars(bot)
+    # the login had everyone in it, and the DM channel is only opened once
+    assert slack.api_calls == ['rtm.start', 'im.open']
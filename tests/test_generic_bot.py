@@ -101,3 +101,32 @@ def test_help_on_mispelled_something(mocker, bot, message_context):
     assert MOCK_CHANNEL == mocked_channel_message.call_args[0][0]
     assert "I don't know what you mean and have no suggestions" in mocked_channel_message.call_args[0][1]
     assert mocked_channel_message.call_count == 1
+
+
+@pytest.mark.parametrize('text, meant', [('hepl', 'help'), ('lits', 'list')])
+def test_swapped_letters_are_corrected(mocker, bot, message_context, text, meant):
+    mocked_channel_message = mocker.patch.object(bot, 'send_channel_message')
+
+    with message_context(bot, sender=MOCK_PERSON):
+        bot.parse_direct_message({
+            'user': MOCK_PERSON,
+            'channel': MOCK_CHANNEL,
+            'text': text
+        })
+
+    assert mocked_channel_message.call_args_list[0][0][1] == f'I\'m guessing you meant `{meant}`'
+    assert "Main functions:" in mocked_channel_message.call_args_list[1][0][1]
+
+
+def test_unknown_words_get_suggestions(mocker, bot, message_context):
+    mocked_channel_message = mocker.patch.object(bot, 'send_channel_message')
+
+    with message_context(bot, sender=MOCK_PERSON):
+        bot.parse_direct_message({
+            'user': MOCK_PERSON,
+            'channel': MOCK_CHANNEL,
+            'text': 'reload-func-now'
+        })
+
+    assert "I did find the following functions" in mocked_channel_message.call_args[0][1]
+    assert mocked_channel_message.call_count == 1
@@ -0,0 +1,87 @@
+import importlib
+import sys
+from unittest import mock
+
+import slack_today_i_did.self_aware as self_aware
+
+
+def test_hot_reload_keeps_state(make_bot):
+    bot = make_bot()
+    old_class = bot.__class__
+
+    bot.reports['C1'] = {'daily': 'a report'}
+    bot.notify.add_pattern('dave', 'deploy')
+    bot.known_users['dave'] = 'U1'
+    bot.command_history.add_command('C1', bot.list, ['C1'])
+
+    reloaded = self_aware.hot_reload(bot)
+
+    assert 'slack_today_i_did.bot_file' in reloaded
+    assert bot.__class__ is not old_class
+    assert bot.__class__ is sys.modules['slack_today_i_did.bot_file'].TodayIDidBot
+    assert bot.reports == {'C1': {'daily': 'a report'}}
+    assert bot.notify.who_wants_it('deploy done') == ['dave']
+    assert bot.known_users['dave'] == 'U1'
+
+    # the history now runs the new code
+    action = bot.command_history.last_command('C1')['action']
+    assert action.__func__ is bot.__class__.list
+
+    assert 'Main functions' in bot.known_functions()['list']('C1').text
+
+
+def test_hot_reload_drops_methods_from_load_ext(make_bot):
+    bot = make_bot()
+    bot.party = lambda channel: None
+    bot.list = bot.help
+
+    self_aware.hot_reload(bot)
+
+    assert 'list' not in vars(bot)
+    # not a method, so it's left alone
+    assert 'party' in vars(bot)
+
+
+def test_failed_reload_keeps_the_old_code(make_bot):
+    bot = make_bot()
+    old_class = bot.__class__
+
+    with mock.patch.object(importlib, 'reload', side_effect=SyntaxError('oops')):
+        message = bot.reload_functions('C1')
+
+    assert bot.__class__ is old_class
+    assert 'still running the old code' in message.text
+    assert 'oops' in message.text
+
+
+def test_load_ext_suggests_extensions(make_bot):
+    bot = make_bot()
+
+    assert 'RollbarExtensions' in bot.load_extension('C1', 'RollbarExtension').text
+    assert bot.load_extension('C1', 'Nothing').text == 'No such extension!'
+
+
+def test_can_hot_reload_only_the_bots_modules(make_bot):
+    bot = make_bot()
+
+    assert self_aware.can_hot_reload(bot, ['slack_today_i_did/extensions.py', 'README.md', 'tests/test_parser.py'])
+    assert not self_aware.can_hot_reload(bot, ['slack_today_i_did/extensions.py', 'slack_today_i_did/parser.py'])
+    assert not self_aware.can_hot_reload(bot, ['main.py'])
+
+
+def test_reload_restarts_when_something_else_changed(make_bot, run, mocker):
+    bot = make_bot()
+
+    mocker.patch.object(self_aware, 'git_head_async', mock.AsyncMock(return_value='abc123'))
+    mocker.patch.object(self_aware, 'git_checkout_async', mock.AsyncMock())
+    changed = mocker.patch.object(self_aware, 'git_changed_files_async', mock.AsyncMock())
+    restart = mocker.patch.object(self_aware, 'restart_program')
+
+    changed.return_value = ['slack_today_i_did/bot_file.py']
+    assert run(bot.reload_branch('C1', 'master')).text.startswith('Reloaded')
+    assert not restart.called
+
+    changed.return_value = ['slack_today_i_did/our_repo.py']
+    assert run(bot.reload_branch('C1', 'master')) == []
+    assert restart.called
+    assert 'restarting' in bot.message_queue[-1]
@@ -0,0 +1,125 @@
+import asyncio
+
+from slack_today_i_did.instrumentation import Instrumentation, PhaseTimer, format_summary
+
+
+def test_timer_records_per_stage_and_command():
+    instrumentation = Instrumentation()
+
+    with instrumentation.timer('evaluate', 'help'):
+        pass
+
+    with instrumentation.timer('evaluate', 'help'):
+        pass
+
+    with instrumentation.timer('tokenize'):
+        pass
+
+    summaries = {(summary.stage, summary.command): summary for summary in instrumentation.summary()}
+
+    assert summaries[('evaluate', 'help')].count == 2
+    assert summaries[('tokenize', '')].count == 1
+
+
+def test_percentiles_come_from_recent_samples():
+    instrumentation = Instrumentation(max_samples=100)
+
+    for value in range(1, 201):
+        instrumentation.record('evaluate', 'help', value)
+
+    [summary] = instrumentation.summary()
+
+    assert summary.count == 200
+    assert summary.total == sum(range(1, 201))
+    assert summary.p50 == 150
+    assert summary.p95 == 195
+    assert summary.p99 == 199
+
+
+def test_disabled_records_nothing():
+    instrumentation = Instrumentation(enabled=False)
+
+    with instrumentation.timer('evaluate', 'help'):
+        pass
+
+    instrumentation.increment('messages')
+
+    assert instrumentation.summary() == []
+    assert len(instrumentation.counters) == 0
+
+
+def test_timer_records_even_when_the_block_raises():
+    instrumentation = Instrumentation()
+
+    try:
+        with instrumentation.timer('evaluate', 'broken'):
+            raise ValueError()
+    except ValueError:
+        pass
+
+    assert instrumentation.summary()[0].count == 1
+
+
+def test_prometheus_text():
+    instrumentation = Instrumentation()
+    instrumentation.record('evaluate', 'help', 0.5)
+    instrumentation.increment('messages', 3)
+
+    text = instrumentation.prometheus_text()
+
+    assert 'slack_bot_stage_seconds{stage="evaluate",command="help",quantile="0.99"} 0.5' in text
+    assert 'slack_bot_stage_seconds_count{stage="evaluate",command="help"} 1' in text
+    assert 'slack_bot_events_total{name="messages"} 3' in text
+
+
+def test_format_summary():
+    instrumentation = Instrumentation()
+
+    assert format_summary(instrumentation.summary(), instrumentation.counters) == 'Nothing has been timed yet'
+
+    instrumentation.record('evaluate', 'help', 0.002)
+    instrumentation.increment('messages')
+
+    summary = format_summary(instrumentation.summary(), instrumentation.counters)
+
+    assert 'evaluate help' in summary
+    assert '2.00ms' in summary
+    assert 'messages: 1' in summary
+
+
+def test_serve_metrics(run):
+    instrumentation = Instrumentation()
+    instrumentation.increment('messages')
+
+    async def scrape():
+        server = await instrumentation.serve_metrics(port=0)
+        port = server.sockets[0].getsockname()[1]
+
+        (reader, writer) = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b'GET /metrics HTTP/1.0\r\n\r\n')
+        response = await reader.read()
+
+        writer.close()
+        server.close()
+        await server.wait_closed()
+
+        return response.decode()
+
+    response = run(scrape())
+
+    assert response.startswith('HTTP/1.0 200 OK')
+    assert 'slack_bot_events_total{name="messages"} 1' in response
+
+
+def test_phase_timer_keeps_phases_in_order():
+    startup = PhaseTimer()
+
+    with startup.phase('import bot'):
+        pass
+
+    with startup.phase('create bot'):
+        pass
+
+    assert [name for (name, _, _) in startup.phases] == ['import bot', 'create bot']
+    assert startup.phases[0][1] <= startup.phases[1][1]
+    assert 'create bot' in startup.report()
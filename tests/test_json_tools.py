@@ -0,0 +1,46 @@
+import json
+
+import pytest
+
+import slack_today_i_did.json_tools as json_tools
+
+
+ITEM = {
+    'title': 'it broke',
+    'last_occurrence': {'body': {'trace': {'frames': [{'filename': 'a.py'}, {'filename': 'b.py'}]}}},
+}
+
+
+def test_project_follows_keys_and_indexes():
+    assert json_tools.project(ITEM, 'last_occurrence.body.trace.frames[0]') == {'filename': 'a.py'}
+    assert json_tools.project(ITEM, 'last_occurrence.body.trace.frames[-1].filename') == 'b.py'
+    assert json_tools.project(ITEM, 'title') == 'it broke'
+
+
+def test_project_says_where_the_path_went_wrong():
+    with pytest.raises(json_tools.PathError) as e:
+        json_tools.project(ITEM, 'last_occurrence.body.trace.frames[2]')
+
+    assert str(e.value) == 'last_occurrence.body.trace.frames doesn\'t have a [2]'
+
+    with pytest.raises(json_tools.PathError) as e:
+        json_tools.project(ITEM, 'last_occurrence.body.exception')
+
+    assert str(e.value) == 'last_occurrence.body doesn\'t have a field exception'
+
+    with pytest.raises(json_tools.PathError):
+        json_tools.parse_path('frames..filename')
+
+
+def test_render_small_values_whole():
+    assert json_tools.render('it broke') == ('it broke', False)
+    assert json_tools.render(ITEM) == (json.dumps(ITEM, indent=2), False)
+
+
+def test_render_stops_at_the_limit():
+    big = {'frames': [{'filename': f'{i}.py'} for i in range(10000)]}
+
+    (text, truncated) = json_tools.render(big, limit=100)
+
+    assert truncated
+    assert text == json_tools.full_text(big)[:100]
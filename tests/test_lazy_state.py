@@ -0,0 +1,84 @@
+import threading
+import time
+from unittest import mock
+
+from slack_today_i_did.notify import Notification
+
+
+def test_state_is_loaded_when_first_used(make_bot):
+    with mock.patch.object(Notification, 'load_from_file') as load_from_file:
+        bot = make_bot()
+
+        assert load_from_file.call_count == 0
+
+        bot.notify.who_wants_it('hello')
+        bot.notify.who_wants_it('hello')
+
+    assert load_from_file.call_count == 1
+    assert 'notify' in vars(bot)
+    assert 'notify (lazy)' in [name for (name, _, _) in bot.startup.phases]
+
+
+def test_lazy_state_can_be_replaced(make_bot):
+    bot = make_bot()
+    notify = Notification()
+
+    bot.notify = notify
+
+    assert bot.notify is notify
+    assert 'notify (lazy)' not in [name for (name, _, _) in bot.startup.phases]
+
+
+def test_command_history_is_loaded_with_the_bots_functions(make_bot):
+    bot = make_bot()
+    bot.command_history.add_command('C1', bot.list, ['C1'])
+    bot.command_history.save_to_file(bot.command_history_file)
+
+    second_bot = make_bot()
+
+    assert second_bot.command_history.last_command('C1')['action'] == second_bot.list
+
+
+def test_state_is_loaded_once_across_threads(make_bot):
+    bot = make_bot()
+    loaded = threading.Event()
+
+    def slow_load(self, filename):
+        loaded.set()
+        time.sleep(0.05)
+
+    with mock.patch.object(Notification, 'load_from_file', autospec=True, side_effect=slow_load) as load_from_file:
+        warm_up = threading.Thread(target=bot.warm_up_state)
+        warm_up.start()
+        loaded.wait()
+
+        # waits for the warm up instead of loading a second time
+        notify = bot.notify
+        warm_up.join()
+
+    assert load_from_file.call_count == 1
+    assert bot.notify is notify
+
+
+def test_bots_load_state_without_waiting_for_each_other(make_bot, tmpdir):
+    bot = make_bot()
+    other_bot = make_bot(notify_file=str(tmpdir.join('other_notify.json')))
+    loading = threading.Event()
+    other_loaded = threading.Event()
+
+    def slow_load(self, filename):
+        if filename == bot.notify_file:
+            loading.set()
+            assert other_loaded.wait(5)
+
+    with mock.patch.object(Notification, 'load_from_file', autospec=True, side_effect=slow_load):
+        warm_up = threading.Thread(target=bot.warm_up_state)
+        warm_up.start()
+        loading.wait()
+
+        # the other bot's notify loads while the first is still loading
+        other_bot.notify
+        other_loaded.set()
+        warm_up.join()
+
+    assert 'notify' in vars(bot)
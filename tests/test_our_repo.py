@@ -0,0 +1,77 @@
+import asyncio
+from unittest import mock
+
+import pytest
+
+import slack_today_i_did.git_runner as git_runner
+from slack_today_i_did.our_repo import OurRepo
+
+MOCK_REPO = 'thing'
+
+
+@pytest.fixture
+def repo(make_local_repo):
+    return make_local_repo(OurRepo, MOCK_REPO)
+
+
+def test_get_ready_clones_and_checks_out(repo):
+    repo.get_ready()
+
+    assert repo.is_cloned
+    assert open(f'{repo.repo_dir}/Main.elm').read() == 'module Main exposing (..)\n'
+
+
+def test_get_ready_async_skips_fetch_when_remote_unchanged(repo, run):
+    repo.get_ready()
+
+    with mock.patch.object(git_runner, 'run_git_async', wraps=git_runner.run_git_async) as spy:
+        run(repo.get_ready_async())
+
+    commands = [call[0][0] for call in spy.call_args_list]
+    assert 'ls-remote' in commands
+    assert 'fetch' not in commands
+
+
+def test_get_ready_async_coalesces_concurrent_calls(repo, run):
+    calls = []
+    real = type(repo)._get_ready_async
+
+    async def counting(self, branch_name):
+        calls.append(branch_name)
+        await real(self, branch_name)
+
+    async def get_ready_together():
+        await asyncio.gather(*(repo.get_ready_async() for _ in range(5)))
+
+    with mock.patch.object(type(repo), '_get_ready_async', counting):
+        run(get_ready_together())
+
+    assert calls == ['master']
+    assert repo.is_cloned
+
+
+def test_get_ready_async_waits_for_the_git_lock(repo, run):
+    repo.get_ready()
+
+    async def get_ready_while_locked():
+        repo.git_lock.acquire()
+        getting_ready = asyncio.ensure_future(repo.get_ready_async())
+
+        await asyncio.sleep(0.2)
+        assert not getting_ready.done()
+
+        repo.git_lock.release()
+        await asyncio.wait_for(getting_ready, 10)
+
+    run(get_ready_while_locked())
+
+
+def test_git_lock_is_held_until_the_checkout_is_done(repo, run):
+    # other processes share the checkout, so they mustn't get in halfway through
+    held = []
+    repo.on_checkout = lambda: held.append(repo.git_lock.locked())
+
+    repo.get_ready()
+    run(repo.get_ready_async())
+
+    assert held == [True, True]
@@ -1,5 +1,6 @@
 import pytest
 import slack_today_i_did.parser as parser
+import slack_today_i_did.text_tools as text_tools
 
 MOCK_TOKENS = {
     'hello': lambda x:x,
@@ -176,3 +177,34 @@ def test_eval_arg_mismtach():
     result = stuff.evaluate(stuff.func_call)
     assert 'I wanted things to look like' in result.errors[0]
     assert 'Need some more' in result.errors[0]
+
+
+def test_tokenize_corrects_mistyped_first_word():
+    fuzzy_index = text_tools.BKTree(MOCK_TOKENS)
+    tokens = parser.tokenize('hrllo dave NOW', MOCK_TOKENS, fuzzy_index=fuzzy_index)
+
+    assert tokens[0] == (0, 'hello', 'dave ')
+    assert tokens[1][1] == 'NOW'
+
+
+def test_tokenize_does_not_guess_when_too_far_away():
+    fuzzy_index = text_tools.BKTree(MOCK_TOKENS)
+    tokens = parser.tokenize(TEXT_WITHOUT_TOKENS, MOCK_TOKENS, fuzzy_index=fuzzy_index)
+
+    assert len(tokens) == 0
+
+
+def test_tokenize_does_not_guess_between_equally_close_tokens():
+    known_tokens = ['hello', 'jello']
+    fuzzy_index = text_tools.BKTree(known_tokens)
+
+    assert parser.leading_word_candidates('cello dave', known_tokens, fuzzy_index) == ['hello', 'jello']
+    assert parser.tokenize('cello dave', known_tokens, fuzzy_index=fuzzy_index) == []
+
+
+def test_swapping_two_letters_is_one_typo():
+    known_tokens = ['help', 'list', 'stats']
+    fuzzy_index = text_tools.BKTree(known_tokens)
+
+    assert parser.leading_word_candidates('hepl', known_tokens, fuzzy_index) == ['help']
+    assert parser.leading_word_candidates('lits', known_tokens, fuzzy_index) == ['list']
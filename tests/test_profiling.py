@@ -0,0 +1,106 @@
+import asyncio
+import os
+
+import pytest
+
+import slack_today_i_did.parser as parser
+from slack_today_i_did.profiling import ProfileSession, code_key
+
+
+def busy_work():
+    return sorted(str(i) for i in range(20000))
+
+
+def test_unknown_kind_is_an_error(tmpdir):
+    with pytest.raises(ValueError):
+        ProfileSession('orange', str(tmpdir))
+
+
+def test_stops_after_some_messages(tmpdir):
+    session = ProfileSession('cpu', str(tmpdir), messages=2)
+    session.start()
+
+    session.message_seen()
+    assert not session.is_done()
+
+    session.message_seen()
+    assert session.is_done()
+
+    session.stop()
+
+
+def test_stops_after_some_seconds(tmpdir):
+    session = ProfileSession('cpu', str(tmpdir), seconds=0)
+    session.start()
+
+    assert session.is_done()
+
+    session.stop()
+
+
+def test_cpu_profile_highlights_known_functions(tmpdir):
+    session = ProfileSession(
+        'cpu',
+        str(tmpdir),
+        messages=1,
+        highlight={code_key(busy_work): 'busy-work'},
+        highlight_files={parser.__file__}
+    )
+    session.start()
+    busy_work()
+    parser.tokenize('hello world', ['hello'])
+    result = session.stop()
+
+    assert result.path.endswith('.prof')
+    assert os.path.exists(result.path)
+    assert 'Top functions by cumulative time' in result.summary
+    assert 'busy-work (test_profiling.py' in result.summary
+    assert 'parser.py' in result.summary
+
+
+def test_sample_profile_writes_folded_stacks(tmpdir):
+    session = ProfileSession('sample', str(tmpdir), messages=1)
+    session.start()
+
+    while session._sampler.samples < 5:
+        busy_work()
+
+    result = session.stop()
+
+    with open(result.path) as f:
+        lines = f.readlines()
+
+    assert result.path.endswith('.folded')
+    assert len(lines) > 0
+    assert 'busy_work' in ''.join(lines)
+    assert 'samples' in result.summary
+
+
+def test_memory_profile_finds_allocation_sites(tmpdir):
+    session = ProfileSession('memory', str(tmpdir), messages=1, highlight={code_key(busy_work): 'busy-work'})
+    session.start()
+    kept = busy_work()
+    result = session.stop()
+
+    assert len(kept) > 0
+    assert result.path.endswith('.snapshot')
+    assert os.path.exists(result.path)
+    assert 'Top allocation sites' in result.summary
+    assert 'test_profiling.py' in result.summary
+
+
+def test_timed_profiles_report_without_waiting_for_a_message(tmpdir, make_bot, run, recording_websocket):
+    bot = make_bot(profiles_dir=str(tmpdir.join('profiles')))
+    bot.websocket = recording_websocket
+
+    async def profile():
+        bot._start_profiling('C1', 'cpu', seconds=0.1)
+        busy_work()
+
+        while len(bot.websocket.sent) == 0:
+            await asyncio.sleep(0.01)
+
+    run(profile())
+
+    assert bot._profile_session is None
+    assert bot.websocket.sent[0]['channel'] == 'C1'
@@ -0,0 +1,47 @@
+import json
+import time
+
+from slack_today_i_did.replay import ReplayWebsocket, StubWebApi, replay
+from slack_today_i_did.rtm_log import LoggedFrame, RtmRecorder
+
+
+def test_stub_web_api_knows_the_recorded_users():
+    api = StubWebApi({'self': {'id': 'UBOT'}, 'users': [{'id': 'U1', 'name': 'dave'}]}, 'today-i-did')
+
+    members = api('users.list')['members']
+
+    assert {'id': 'U1', 'name': 'dave'} in members
+    assert {'id': 'UBOT', 'name': 'today-i-did'} in members
+    assert api('im.open', user='U1')['channel']['id'] == 'DU1'
+    assert api.calls['users.list'] == 1
+
+
+def test_real_time_replay_keeps_the_gaps(run):
+    frames = [LoggedFrame(100.0, 'a'), LoggedFrame(100.2, 'b')]
+    websocket = ReplayWebsocket(frames, speed=2.0)
+
+    started = time.monotonic()
+    run(websocket.recv())
+    run(websocket.recv())
+
+    assert time.monotonic() - started >= 0.09
+
+
+def test_replay_runs_the_bot(tmpdir, run, make_bot):
+    filename = str(tmpdir.join('rtm.log.gz'))
+
+    recorder = RtmRecorder(filename)
+    recorder.record_login({'self': {'id': 'UBOT', 'name': 'today-i-did'}, 'users': [{'id': 'U1', 'name': 'dave'}]})
+
+    for text in ('<@UBOT> list', 'just chatting', '<@UBOT> help'):
+        recorder.record(json.dumps({'type': 'message', 'user': 'U1', 'channel': 'C1', 'text': text}))
+
+    recorder.close()
+
+    bot = make_bot()
+    result = run(replay(bot, filename))
+
+    assert result.frames == 3
+    assert result.sent == 2
+    assert result.api_calls['users.list'] >= 1
+    assert bot.instrumentation.counters['commands'] == 2
@@ -0,0 +1,106 @@
+import asyncio
+import threading
+import time
+from unittest import mock
+
+from slack_today_i_did.bounded_cache import BoundedCache
+from slack_today_i_did.rollbar import Rollbar
+
+
+def response(status_code, json):
+    return mock.Mock(status_code=status_code, json=mock.Mock(return_value=json))
+
+
+def make_rollbar(responses, clock):
+    """ a Rollbar that answers requests from `responses`, keyed by url """
+    rollbar = Rollbar('token', ttl=60, not_found_ttl=300, cache=BoundedCache(clock=clock))
+    rollbar.requests = []
+
+    def request(url):
+        rollbar.requests.append(url)
+        return responses[url]
+
+    rollbar.request = request
+    return rollbar
+
+
+def item(counter, title):
+    return response(200, {'err': 0, 'result': {'id': counter * 100, 'counter': counter, 'title': title}})
+
+
+def test_items_are_cached_by_counter_and_id(clock):
+    rollbar = make_rollbar({'/api/1/item_by_counter/5': item(5, 'it broke')}, clock)
+
+    assert rollbar.get_item_by_counter(5)['title'] == 'it broke'
+    assert rollbar.get_item_by_counter(5)['title'] == 'it broke'
+    assert rollbar.get_item_by_id(500)['title'] == 'it broke'
+    assert rollbar.requests == ['/api/1/item_by_counter/5']
+
+    clock.now = 61
+
+    rollbar.get_item_by_counter(5)
+    assert len(rollbar.requests) == 2
+
+
+def test_missing_items_are_cached_for_longer(clock):
+    rollbar = make_rollbar({'/api/1/item_by_counter/9': response(404, {'err': 1, 'message': 'Not found'})}, clock)
+
+    assert rollbar.get_item_by_counter(9) is None
+
+    clock.now = 120
+
+    assert rollbar.get_item_by_counter(9) is None
+    assert len(rollbar.requests) == 1
+
+
+def test_errors_are_not_cached(run, clock):
+    rollbar = make_rollbar({'/api/1/item_by_counter/1': response(500, {'err': 1, 'message': 'oops'})}, clock)
+
+    items = run(rollbar.get_items_by_counter([1]))
+    run(rollbar.get_items_by_counter([1]))
+
+    assert 'oops' in str(items[1])
+    assert len(rollbar.requests) == 2
+
+
+def test_items_are_fetched_concurrently(run):
+    rollbar = Rollbar('token')
+    running = []
+    most_at_once = []
+
+    def get_item_by_counter(counter):
+        running.append(counter)
+        most_at_once.append(len(running))
+        time.sleep(0.1)
+        running.remove(counter)
+        return None if counter == 3 else {'title': f'item {counter}'}
+
+    rollbar.get_item_by_counter = get_item_by_counter
+
+    items = run(rollbar.get_items_by_counter([1, 2, 3]))
+
+    assert items == {1: {'title': 'item 1'}, 2: {'title': 'item 2'}, 3: None}
+    assert max(most_at_once) > 1
+
+
+def test_the_same_counter_is_only_fetched_once_at_a_time(run):
+    rollbar = Rollbar('token')
+    calls = []
+    release = threading.Event()
+
+    def get_item_by_counter(counter):
+        calls.append(counter)
+        release.wait(5)
+        return {'title': 'it broke'}
+
+    rollbar.get_item_by_counter = get_item_by_counter
+
+    async def ask_twice():
+        first = asyncio.ensure_future(rollbar.get_item_by_counter_async(5))
+        second = asyncio.ensure_future(rollbar.get_item_by_counter_async(5))
+        await asyncio.sleep(0.05)
+        release.set()
+        return await asyncio.gather(first, second)
+
+    assert run(ask_twice()) == [{'title': 'it broke'}, {'title': 'it broke'}]
+    assert calls == [5]
@@ -0,0 +1,142 @@
+import asyncio
+
+from slack_today_i_did.rollbar_watch import OccurrenceWatcher
+
+
+class FakeRollbar(object):
+    """ serves occurrences newest first, two to a page, with an etag that changes when they do """
+    def __init__(self):
+        self.occurrences = []
+        self.requests = []
+        self.items = {1: {'id': 1, 'counter': 11, 'title': 'it broke'}, 2: {'id': 2, 'counter': 12, 'title': 'oh no'}}
+
+    def happen(self, item_id, how_many=1):
+        for _ in range(how_many):
+            next_id = len(self.occurrences) + 1
+            self.occurrences.insert(0, {'id': next_id, 'item_id': item_id, 'timestamp': 1000 + next_id})
+
+    def get_occurrences(self, page=1, etag=None):
+        self.requests.append((page, etag))
+        current_etag = f'"{len(self.occurrences)}"'
+
+        if etag == current_etag:
+            return (None, etag)
+
+        return (self.occurrences[(page - 1) * 2:page * 2], current_etag)
+
+    def get_item_by_id(self, id):
+        return self.items.get(id)
+
+
+def make_watcher(clock, max_pages=5):
+    rollbar = FakeRollbar()
+    return (rollbar, OccurrenceWatcher(rollbar, window=60, max_pages=max_pages, clock=clock))
+
+
+def test_first_poll_only_finds_where_we_are(clock):
+    (rollbar, watcher) = make_watcher(clock)
+    rollbar.happen(1, 3)
+
+    assert watcher.poll() == 0
+    assert watcher.last_id == 3
+    assert rollbar.requests == [(1, None)]
+    assert not watcher.is_due
+
+
+def test_nothing_new_is_one_conditional_request(clock):
+    (rollbar, watcher) = make_watcher(clock)
+    rollbar.happen(1)
+    watcher.poll()
+
+    assert watcher.poll() == 0
+    assert rollbar.requests == [(1, None), (1, '"1"')]
+
+
+def test_polls_page_until_it_reaches_what_it_has_seen(clock):
+    (rollbar, watcher) = make_watcher(clock)
+    rollbar.happen(1)
+    watcher.poll()
+
+    rollbar.happen(1, 3)
+    rollbar.happen(2, 2)
+
+    assert watcher.poll() == 5
+    assert [page for (page, etag) in rollbar.requests[1:]] == [1, 2, 3]
+    assert watcher.last_id == 6
+
+
+def test_storms_are_summed_up_once_per_window(clock):
+    (rollbar, watcher) = make_watcher(clock)
+    rollbar.happen(1)
+    watcher.poll()
+
+    rollbar.happen(1, 3)
+    watcher.poll()
+    clock.now = 30
+    rollbar.happen(2)
+    rollbar.happen(1)
+    watcher.poll()
+
+    assert not watcher.is_due
+    clock.now = 60
+    assert watcher.is_due
+
+    digests = watcher.take_digests()
+
+    assert [(digest.counter, digest.count) for digest in digests] == [(11, 4), (12, 1)]
+    assert digests[0].first_seen == 1002 and digests[0].last_seen == 1006
+    assert watcher.format_digests(digests) == (
+        'Rollbar saw 5 errors from 2 items:\n'
+        '- #11 it broke: 4 times\n'
+        '- #12 oh no: once'
+    )
+    assert not watcher.is_due
+    assert watcher.take_digests() == []
+
+
+def test_storms_bigger_than_max_pages_say_so(clock):
+    (rollbar, watcher) = make_watcher(clock, max_pages=2)
+    rollbar.happen(1)
+    watcher.poll()
+
+    rollbar.happen(1, 10)
+
+    assert watcher.poll() == 4
+    assert len(rollbar.requests) == 3
+    assert watcher.format_digests(watcher.take_digests()).startswith('Rollbar saw at least 4 errors')
+
+
+def test_bot_posts_digests_to_watching_channels(make_bot, run, recording_websocket):
+    bot = make_bot(rollbar_token='')
+    rollbar = FakeRollbar()
+    bot.rollbar = rollbar
+    bot.rollbar_poll_every = 0.01
+    bot.websocket = recording_websocket
+
+    assert bot.rollbar_watch('C1').text == 'I\'ll let you know when Rollbar sees new errors'
+    bot.rollbar_watch('C2')
+    bot.rollbar_unwatch('C2')
+
+    watcher = bot._rollbar_watcher
+    watcher.window = 0
+
+    rollbar.happen(1)
+
+    async def watch_until_posted():
+        # nothing comes in from Slack, so only the timer can drive the polling
+        watching = asyncio.ensure_future(bot.background_tasks()[0])
+
+        while watcher.last_id is None:
+            await asyncio.sleep(0.01)
+
+        rollbar.happen(2, 2)
+
+        while recording_websocket.sent == []:
+            await asyncio.sleep(0.01)
+
+        watching.cancel()
+
+    run(watch_until_posted())
+
+    assert [message['channel'] for message in recording_websocket.sent] == ['C1']
+    assert recording_websocket.sent[0]['text'] == 'Rollbar saw 2 errors from one item:\n- #12 oh no: 2 times'
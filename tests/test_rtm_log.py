@@ -0,0 +1,58 @@
+import gzip
+import json
+
+from slack_today_i_did.rtm_log import RtmRecorder, read_frames, read_login
+
+
+def test_frames_round_trip(tmpdir):
+    filename = str(tmpdir.join('rtm.log.gz'))
+
+    recorder = RtmRecorder(filename)
+    recorder.record_login({
+        'ok': True,
+        'url': 'wss://secret',
+        'self': {'id': 'UBOT', 'name': 'today-i-did'},
+        'users': [{'id': 'U1', 'name': 'dave', 'profile': {}}]
+    })
+    recorder.record('{"type": "hello"}')
+    recorder.record('{"type": "message", "text": "hi"}')
+    recorder.close()
+
+    frames = list(read_frames(filename))
+
+    assert [frame.frame for frame in frames] == ['{"type": "hello"}', '{"type": "message", "text": "hi"}']
+    assert frames[0].time <= frames[1].time
+    assert read_login(filename) == {
+        'self': {'id': 'UBOT', 'name': 'today-i-did'},
+        'users': [{'id': 'U1', 'name': 'dave'}]
+    }
+
+
+def test_recording_appends(tmpdir):
+    filename = str(tmpdir.join('rtm.log.gz'))
+
+    for text in ('first', 'second'):
+        recorder = RtmRecorder(filename)
+        recorder.record(text)
+        recorder.close()
+
+    assert [frame.frame for frame in read_frames(filename)] == ['first', 'second']
+
+
+def test_cut_off_logs_can_still_be_read(tmpdir):
+    filename = str(tmpdir.join('rtm.log.gz'))
+
+    with gzip.open(filename, 'wt') as f:
+        for index in range(100):
+            f.write(json.dumps({'t': index, 'frame': str(index)}) + '\n')
+
+    with open(filename, 'rb') as f:
+        contents = f.read()
+
+    with open(filename, 'wb') as f:
+        f.write(contents[:len(contents) // 2])
+
+    frames = list(read_frames(filename))
+
+    assert 0 < len(frames) < 100
+    assert frames[0].frame == '0'
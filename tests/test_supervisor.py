@@ -0,0 +1,97 @@
+import asyncio
+import os
+import queue
+
+from slack_today_i_did.fake_slack import FakeSlack
+from slack_today_i_did.supervisor import Supervisor, Workspace, workspaces_from_config
+
+
+def test_workspaces_from_config():
+    data = {'workspaces': [{'name': 'elm', 'token': 'a', 'rollbar-token': 'b'}, {'name': 'other', 'token': 'c'}]}
+
+    assert workspaces_from_config(data) == [Workspace('elm', 'a', 'b'), Workspace('other', 'c', None)]
+
+
+def test_bots_share_a_session_but_not_state(tmpdir):
+    supervisor = Supervisor(
+        [Workspace('elm', 'a', None), Workspace('other', 'b', None)],
+        state_root=str(tmpdir)
+    )
+
+    (elm, other) = (supervisor.bots['elm'], supervisor.bots['other'])
+
+    assert elm.server.api_requester.session is other.server.api_requester.session
+    assert elm.notify_file != other.notify_file
+    assert os.path.isdir(str(tmpdir.join('elm', 'reports')))
+
+
+def test_every_workspace_answers(tmpdir, run):
+    replies = queue.Queue()
+
+    with FakeSlack(users=['dave']) as slack:
+        slack.listeners.append(replies.put)
+
+        supervisor = Supervisor(
+            [Workspace('elm', 'a', None), Workspace('other', 'b', None)],
+            state_root=str(tmpdir),
+            api_base_url=slack.api_base_url
+        )
+
+        async def drive():
+            task = asyncio.ensure_future(supervisor.run())
+
+            try:
+                while len(slack._sockets) < 2:
+                    await asyncio.sleep(0.01)
+
+                # both bots are connected to the one fake, so both answer
+                await asyncio.wrap_future(
+                    asyncio.run_coroutine_threadsafe(slack.post('C1', 'dave', f'<@{slack.bot_id}> list'), slack.loop)
+                )
+
+                while replies.qsize() < 2:
+                    await asyncio.sleep(0.01)
+            finally:
+                task.cancel()
+
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+
+        run(drive())
+
+    assert [replies.get()['channel'] for _ in range(2)] == ['C1', 'C1']
+
+
+def test_a_failing_bot_is_restarted(tmpdir, run):
+    supervisor = Supervisor([Workspace('elm', 'a', None)], state_root=str(tmpdir), restart_delay=0)
+    bot = supervisor.bots['elm']
+    attempts = []
+
+    async def main_loop():
+        attempts.append(1)
+
+        if len(attempts) < 3:
+            raise ConnectionError('no network')
+
+        await asyncio.Event().wait()
+
+    bot.main_loop = main_loop
+
+    async def drive():
+        task = asyncio.ensure_future(supervisor.run())
+
+        while len(attempts) < 3:
+            await asyncio.sleep(0.01)
+
+        task.cancel()
+
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    run(drive())
+
+    assert supervisor.restarts['elm'] == 2
@@ -0,0 +1,75 @@
+import random
+
+import pytest
+
+import slack_today_i_did.text_tools as text_tools
+
+ALPHABET = 'abc-'
+
+
+def random_word(rng, max_length=12):
+    return ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(0, max_length)))
+
+
+@pytest.fixture
+def word_pairs():
+    rng = random.Random(306)
+    return [(random_word(rng), random_word(rng)) for _ in range(2000)]
+
+
+def test_bounded_levenshtein_matches_dynamic(word_pairs):
+    for (current_word, next_word) in word_pairs:
+        expected = text_tools.dynamic_levenshtein(current_word, next_word)
+
+        assert text_tools.bounded_levenshtein(current_word, next_word) == expected
+
+
+def test_bounded_levenshtein_stops_past_max_distance(word_pairs):
+    for (current_word, next_word) in word_pairs:
+        expected = text_tools.dynamic_levenshtein(current_word, next_word)
+
+        for max_distance in range(4):
+            distance = text_tools.bounded_levenshtein(current_word, next_word, max_distance)
+
+            if expected <= max_distance:
+                assert distance == expected
+            else:
+                assert distance == max_distance + 1
+
+
+def test_bounded_levenshtein_on_long_words():
+    current_word = 'a' * 100 + 'b' * 100
+    next_word = 'a' * 100 + 'c' * 100
+
+    assert text_tools.bounded_levenshtein(current_word, next_word) == 100
+
+
+def test_token_based_levenshtein_with_max_distance(word_pairs):
+    for (current_words, next_words) in word_pairs:
+        expected = text_tools.token_based_levenshtein(current_words, next_words)
+        distance = text_tools.token_based_levenshtein(current_words, next_words, max_distance=2)
+
+        if expected <= 2:
+            assert distance == expected
+        else:
+            assert distance > 2
+
+
+def test_bk_tree_search_matches_a_full_scan(word_pairs):
+    words = sorted(set(word for pair in word_pairs for word in pair))
+    tree = text_tools.BKTree(words)
+
+    for query in words[:50]:
+        expected = sorted(
+            (text_tools.levenshtein(query, word), word) for word in words
+            if text_tools.levenshtein(query, word) <= 2
+        )
+
+        assert tree.search(query, max_distance=2) == expected
+
+
+def test_suggestion_index_is_shared():
+    words = ('help', 'list', 'bother')
+
+    assert text_tools.suggestion_index(words) is text_tools.suggestion_index(words)
+    assert len(text_tools.suggestion_index(words)) == 3
@@ -4,6 +4,7 @@ import inspect
 import typing
 import functools
 import datetime
+from unittest import mock
 from slack_today_i_did import parser
 from slack_today_i_did.bot_file import TodayIDidBot
 
@@ -66,7 +67,7 @@ def test_save_and_load_known_user_func_history(mocker, bot, message_context):
         with message_context(bot, sender=MOCK_PERSON):
             spy = mocker.spy(bot, func.__name__)
             mocker.patch.object(bot.rollbar, 'get_item_by_counter', return_value={})
-            mocker.patch.object(bot, 'repo')
+            mocker.patch.object(bot, 'repo', get_ready_async=mock.AsyncMock())
 
             # preserve important attributes on the spy
             functools.update_wrapper(spy, func)
@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+# looked up through its module, as the hot reload tests reload it
+import slack_today_i_did.generic_bot as generic_bot
+import slack_today_i_did.parser as parser
+from slack_today_i_did.workers import WorkerPool
+
+
+@pytest.fixture
+def pool_and_bot(make_bot):
+    bot = make_bot()
+    bot.workers = WorkerPool(bot, processes=2)
+
+    yield (bot.workers, bot)
+
+    bot.workers.close()
+
+
+def test_only_worker_safe_calls_run_in_workers(make_bot):
+    bot = make_bot()
+    known_functions = bot.known_functions()
+
+    who = parser.FuncCall('who-do-you-know', [], None)
+    progress = parser.FuncCall('elm-progress-at', [parser.FuncCall('NUM', [parser.Constant('5', str)], int)], None)
+    progress_of_last = parser.FuncCall('elm-progress-at', [parser.FuncCall('!!', [], None)], None)
+    trend = parser.FuncCall('elm-trend', [parser.FuncCall('NUM', [parser.Constant('5', str)], int)], None)
+
+    assert parser.runs_in_worker(who, known_functions)
+    assert parser.runs_in_worker(progress, known_functions)
+    assert not parser.runs_in_worker(progress_of_last, known_functions)
+    assert not parser.runs_in_worker(parser.FuncCall('know-me', [], None), known_functions)
+
+    # it saves what it learns about blobs, and only the bot writes state
+    assert not parser.runs_in_worker(trend, known_functions)
+
+
+def test_state_changed_by_another_process_is_forgotten(make_bot):
+    bot = make_bot()
+    other_bot = make_bot()
+
+    assert bot.known_names.people == {}
+    assert generic_bot.forget_stale_state(bot) == []
+
+    other_bot.known_names.add_name('U1', 'dave')
+    other_bot.known_names.save_to_file(other_bot.known_names_file)
+
+    assert generic_bot.forget_stale_state(bot) == ['known_names']
+    assert bot.known_names.people == {'U1': ['dave']}
+
+
+def test_workers_see_state_written_by_the_bot(pool_and_bot, run):
+    (pool, bot) = pool_and_bot
+    who = parser.FuncCall('who-do-you-know', [], bot.known_functions()['who-do-you-know'].__annotations__['return'])
+
+    bot._last_sender = 'U1'
+    bot.add_known_name('C1', 'dave')
+
+    [first] = run(pool.evaluate(who, 'C1', 'U1'), timeout=30).result
+
+    bot.add_known_name('C1', 'david')
+
+    # whichever worker gets it
+    results = [run(pool.evaluate(who, 'C1', 'U1'), timeout=30).result[0] for _ in range(4)]
+
+    assert first.text == '<@U1> goes by the names dave'
+    assert all(result.text == '<@U1> goes by the names dave | david' for result in results)
+
+
+def test_the_bot_replies_with_what_the_worker_worked_out(pool_and_bot, run, recording_websocket):
+    (pool, bot) = pool_and_bot
+    bot._user_id = 'UBOT'
+    bot.websocket = recording_websocket
+
+    bot._last_sender = 'U1'
+    bot.add_known_name('C1', 'dave')
+
+    async def ask():
+        bot.parse_message({'type': 'message', 'channel': 'C1', 'user': 'U1', 'text': '<@UBOT> who-do-you-know'})
+
+        # nothing is said until the worker is done
+        assert bot.message_queue == []
+
+        while len(bot.websocket.sent) == 0:
+            await asyncio.sleep(0.01)
+
+    run(ask(), timeout=30)
+
+    assert bot.websocket.sent == [{'type': 'message', 'channel': 'C1', 'text': '<@U1> goes by the names dave'}]
+    assert bot.command_history.last_command('C1')['action'] == bot.get_known_names
+
+
+def test_reloading_the_code_restarts_the_workers(pool_and_bot, run):
+    (pool, bot) = pool_and_bot
+    who = parser.FuncCall('who-do-you-know', [], bot.known_functions()['who-do-you-know'].__annotations__['return'])
+    started = set(pool.warm_up())
+
+    assert bot.reload_functions('C1').text.startswith('Reloaded')
+    reloaded = set(pool.warm_up())
+
+    bot.load_extension('C1', 'KnownNamesExtensions')
+    loaded = set(pool.warm_up())
+
+    assert started.isdisjoint(reloaded)
+    assert reloaded.isdisjoint(loaded)
+    assert run(pool.evaluate(who, 'C1', 'U1'), timeout=30).errors == []
@@ -0,0 +1,166 @@
+import os
+import threading
+
+import pytest
+
+from slack_today_i_did.our_repo import ElmRepo, ElmVersion, RefError
+
+MOCK_REPO = 'elm-things'
+
+
+@pytest.fixture
+def repo(make_local_repo, remote):
+    remote.git('checkout', '-q', '-b', 'old-stuff')
+    remote.write('Old.elm', 'module Old where\n')
+    remote.commit('second')
+    remote.git('checkout', '-q', 'master')
+
+    return make_local_repo(ElmRepo, MOCK_REPO)
+
+
+def test_branches_get_their_own_worktrees(repo):
+    with repo.worktrees.branch('master') as master:
+        master_counts = master.version_counts()
+
+    with repo.worktrees.branch('old-stuff') as old_stuff:
+        old_counts = old_stuff.version_counts()
+
+    assert master_counts[ElmVersion.v_016] == 0
+    assert old_counts[ElmVersion.v_016] == 1
+    assert master.repo_dir != old_stuff.repo_dir
+    assert repo.worktrees.branches == ['master', 'old-stuff']
+
+
+def test_least_recently_used_worktrees_are_removed(repo):
+    repo.worktrees.size = 1
+
+    with repo.worktrees.branch('master') as master:
+        pass
+
+    with repo.worktrees.branch('old-stuff'):
+        pass
+
+    assert repo.worktrees.branches == ['old-stuff']
+    assert not os.path.exists(master.repo_dir)
+
+
+def test_worktrees_are_removed_even_when_the_caller_fails(repo):
+    repo.worktrees.size = 1
+
+    with repo.worktrees.branch('master') as master:
+        pass
+
+    with pytest.raises(ValueError):
+        with repo.worktrees.branch('old-stuff'):
+            raise ValueError('oops')
+
+    assert repo.worktrees.branches == ['old-stuff']
+    assert not os.path.exists(master.repo_dir)
+    assert list(repo.worktrees._locks) == ['old-stuff']
+
+
+def test_different_branches_at_once(repo):
+    results = {}
+
+    def count(branch_name):
+        with repo.worktrees.branch(branch_name) as branch_repo:
+            results[branch_name] = branch_repo.version_counts()[ElmVersion.v_017]
+
+    threads = [threading.Thread(target=count, args=(name,)) for name in ('master', 'old-stuff')]
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    assert results == {'master': 1, 'old-stuff': 1}
+
+
+def test_analyse_ref_without_a_checkout(repo):
+    repo.ensure_cloned()
+    sha = repo.resolve_ref('old-stuff')
+
+    counts = repo.version_counts_at(sha)
+
+    assert counts[ElmVersion.v_016] == 1
+    assert counts[ElmVersion.v_017] == 1
+    assert not os.path.exists(f'{repo.repo_dir}/Old.elm')
+
+
+def test_resolve_ref_follows_the_remote_branch(repo, remote):
+    repo.get_ready()
+    first = repo.resolve_ref('master')
+
+    remote.write('Older.elm', 'module Older where\n')
+    remote.commit('third')
+
+    sha = repo.resolve_ref('master')
+
+    assert sha != first
+    assert repo.version_counts_at(sha)[ElmVersion.v_016] == 1
+    assert repo.resolve_ref(sha[:10]) == sha
+
+
+def test_blob_lookups_are_shared_across_refs(repo):
+    repo.ensure_cloned()
+    repo.version_counts_at(repo.resolve_ref('master'))
+    misses = repo.cache.misses
+
+    repo.version_counts_at(repo.resolve_ref('old-stuff'))
+
+    # Main.elm is the same blob on both branches, so only Old.elm is new
+    assert repo.cache.misses == misses + 2
+
+
+def test_porting_breakdown_at(repo):
+    repo.ensure_cloned()
+
+    breakdown = repo.porting_breakdown_at(repo.resolve_ref('old-stuff'), 'Old')
+
+    assert list(breakdown) == ['Old.elm']
+
+
+def test_version_trend_only_looks_at_changed_files(repo, remote):
+    remote.git('checkout', '-q', 'old-stuff')
+    remote.write('Old.elm', 'module Old exposing (..)\n')
+    remote.commit('port Old')
+    remote.git('rm', '-q', 'Old.elm')
+    remote.commit('remove Old')
+
+    repo.ensure_cloned()
+    trend = repo.version_trend('old-stuff', 4)
+
+    assert [(point.counts[ElmVersion.v_016], point.counts[ElmVersion.v_017]) for point in trend] == [
+        (0, 1), (1, 1), (0, 2), (0, 1)
+    ]
+    assert os.path.exists(repo.versions_file)
+    # the first commit is scanned in full, then each new blob is looked at once
+    assert len(repo.blob_versions.versions) == 3
+
+
+def test_resolve_ref_fetches_commits_older_than_the_clone(repo, remote):
+    first = remote.git('rev-parse', 'HEAD').strip()
+    remote.write('Older.elm', 'module Older where\n')
+    remote.commit('third')
+
+    # only the newest commit comes with the clone
+    repo.get_ready()
+    assert repo.object_store.resolve(first) is None
+
+    assert repo.resolve_ref(first) == first
+    assert repo.version_counts_at(first)[ElmVersion.v_016] == 0
+
+    with pytest.raises(RefError) as error:
+        repo.resolve_ref('no-such-branch')
+
+    assert str(error.value) == 'I couldn\'t find a branch or commit called `no-such-branch`'
+
+
+def test_elm_trend_needs_at_least_one_commit(repo, make_bot, run):
+    bot = make_bot(elm_repo=repo)
+
+    message = run(bot.elm_trend('C1', 'master', 0))
+
+    assert message.text == 'Give me a number of commits that\'s at least 1'
+    assert not repo.is_cloned